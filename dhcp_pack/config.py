@@ -5,6 +5,13 @@ FEATURE_PACK_CONFIG = {
     'version': '1.0.0',
     'applies_to_labels': ['DHCP_Scope', 'DHCP_Lease'],
     'dependencies': ['ipam_pack'],
+    'hooks': {
+        'audit': 'dhcp_pack.hooks.register_hooks'
+    },
+    'urls': {
+        'prefix': '',
+        'module': 'dhcp_pack.urls'
+    },
     'tabs': [
         {
             'id': 'dhcp_scope_details',
@@ -20,5 +27,19 @@ FEATURE_PACK_CONFIG = {
             'custom_view': 'dhcp_pack.views.dhcp_lease_details_tab',
             'for_labels': ['DHCP_Lease']
         },
+    ],
+    'modals': [
+        {
+            'type': 'create',
+            'for_labels': ['DHCP_Scope'],
+            'custom_view': 'dhcp_pack.views.dhcp_scope_create_modal',
+            'template': 'dhcp_scope_create_modal.html'
+        },
+        {
+            'type': 'edit',
+            'for_labels': ['DHCP_Scope'],
+            'custom_view': 'dhcp_pack.views.dhcp_scope_edit_modal',
+            'template': 'dhcp_scope_edit_modal.html'
+        }
     ]
 }
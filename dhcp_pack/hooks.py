@@ -0,0 +1,39 @@
+from .ingest import refresh_lease_key
+from .ranges import invalidate_scope_index
+from .sweeper import refresh_lease_expiry, start_background_sweeper
+from .utilization import invalidate_all_scope_utilization, invalidate_lease_scopes, invalidate_scope_utilization
+
+
+def track_dhcp_changes(action, node_label, node_id, node_name=None, user=None, changes=None,
+                       relationship_type=None, target_label=None, target_id=None, **kwargs):
+    """
+    Invalidate cached scope utilization when a scope or one of its leases changes
+    (every scope when a lease is deleted, since its scope edge is gone by then),
+    rebuild the scope range index when a scope changes, and keep the indexed
+    lease expiry and client-id key in step with edited leases.
+    """
+    try:
+        scope_ids = []
+        if node_label == 'DHCP_Scope':
+            scope_ids.append(node_id)
+        if target_label == 'DHCP_Scope':
+            scope_ids.append(target_id)
+        invalidate_scope_utilization(scope_ids)
+        if node_label == 'DHCP_Scope' and relationship_type is None:
+            invalidate_scope_index()
+
+        if node_label == 'DHCP_Lease' and relationship_type is None and action == 'delete':
+            invalidate_all_scope_utilization()
+        elif node_label == 'DHCP_Lease' and node_id and action != 'delete':
+            invalidate_lease_scopes(node_id)
+            if action in ('create', 'update', 'revert'):
+                refresh_lease_expiry(node_id)
+                refresh_lease_key(node_id)
+    except Exception as exc:
+        print(f"Error tracking DHCP change: {exc}")
+
+
+def register_hooks(register_audit_hook):
+    register_audit_hook(track_dhcp_changes)
+    # Packs have no scheduler of their own; hook registration runs once per process at startup
+    start_background_sweeper()
@@ -0,0 +1,388 @@
+# feature_packs/dhcp_pack/ingest.py
+
+import csv
+import hashlib
+import re
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from neomodel import db
+
+from .ranges import ScopeIntervalTree, parse_ip
+from .sweeper import active_until, ensure_expiry_index
+from .utilization import invalidate_scope_utilization
+
+
+INGEST_BATCH_SIZE = 1000
+LEASE_KEYS_READY_KEY = 'dhcp_lease_keys:ready'
+
+ISC_STATE_MAP = {
+    'active': 'active',
+    'free': 'expired',
+    'expired': 'expired',
+    'released': 'released',
+    'abandoned': 'abandoned',
+    'backup': 'backup',
+    'reset': 'expired',
+}
+
+# Kea memfile lease states: 0 = default, 1 = declined, 2 = expired-reclaimed
+KEA_STATE_MAP = {
+    '0': 'active',
+    '1': 'declined',
+    '2': 'expired',
+}
+
+_ISC_LEASE_START = re.compile(r'^\s*lease\s+(\S+)\s*\{')
+_ISC_TIME = re.compile(r'^\s*(starts|ends)\s+(.+?);')
+_ISC_BINDING = re.compile(r'^\s*binding\s+state\s+(\S+);')
+_ISC_HARDWARE = re.compile(r'^\s*hardware\s+\S+\s+([0-9A-Fa-f:]+);')
+_ISC_UID = re.compile(r'^\s*uid\s+(.+?);')
+_ISC_HOSTNAME = re.compile(r'^\s*client-hostname\s+"([^"]*)";')
+
+
+def _iso(dt):
+    return dt.astimezone(timezone.utc).isoformat() if dt else ''
+
+
+def _parse_isc_time(value):
+    """
+    Parse ISC times: "4 2024/01/15 10:00:00", "epoch 1705312800", or "never".
+    """
+    value = value.split('#', 1)[0].strip()
+    if not value or value == 'never':
+        return None
+    parts = value.split()
+    if parts[0] == 'epoch' and len(parts) > 1:
+        return datetime.fromtimestamp(int(parts[1]), timezone.utc)
+    if len(parts) >= 3:
+        return datetime.strptime(f'{parts[1]} {parts[2]}', '%Y/%m/%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    return None
+
+
+def _normalize_mac(value):
+    return (value or '').strip().lower()
+
+
+def parse_isc_leases(lines):
+    """
+    Stream lease dicts from an ISC dhcpd.leases file.
+    The file is append-only, so a later block for the same address supersedes earlier ones;
+    callers apply rows in order and the last one wins.
+    """
+    current = None
+    for line in lines:
+        if current is None:
+            match = _ISC_LEASE_START.match(line)
+            if match:
+                current = {'ip': match.group(1), 'state': None, 'mac': '', 'uid': '',
+                           'starts': None, 'ends': None, 'hostname': ''}
+            continue
+
+        if line.strip().startswith('}'):
+            client_id = current['uid'] or current['mac']
+            if client_id:
+                status = ISC_STATE_MAP.get(current['state'] or '', current['state'] or 'unknown')
+                # dhcpd only rewrites the binding state when it reclaims the address
+                if status == 'active' and current['ends'] and current['ends'] < datetime.now(timezone.utc):
+                    status = 'expired'
+                yield {
+                    'client_id': client_id,
+                    'ip': current['ip'],
+                    'mac': current['mac'],
+                    'status': status,
+                    'lease_start': _iso(current['starts']),
+                    'lease_end': _iso(current['ends']),
+                    'hostname': current['hostname'],
+                }
+            current = None
+            continue
+
+        match = _ISC_TIME.match(line)
+        if match:
+            try:
+                current[match.group(1)] = _parse_isc_time(match.group(2))
+            except ValueError:
+                pass
+            continue
+        match = _ISC_BINDING.match(line)
+        if match:
+            current['state'] = match.group(1)
+            continue
+        match = _ISC_HARDWARE.match(line)
+        if match:
+            current['mac'] = _normalize_mac(match.group(1))
+            continue
+        match = _ISC_UID.match(line)
+        if match:
+            current['uid'] = match.group(1).strip().strip('"')
+            continue
+        match = _ISC_HOSTNAME.match(line)
+        if match:
+            current['hostname'] = match.group(1)
+
+
+def parse_kea_csv(lines):
+    """
+    Stream lease dicts from a Kea memfile CSV (lease4/lease6).
+    """
+    reader = csv.DictReader(lines)
+    for row in reader:
+        address = (row.get('address') or '').strip()
+        mac = _normalize_mac(row.get('hwaddr'))
+        client_id = (row.get('client_id') or row.get('duid') or '').strip() or mac
+        if not address or not client_id:
+            continue
+        try:
+            expire = int(row.get('expire') or 0)
+            valid_lifetime = int(row.get('valid_lifetime') or 0)
+        except ValueError:
+            expire, valid_lifetime = 0, 0
+        ends = datetime.fromtimestamp(expire, timezone.utc) if expire else None
+        starts = datetime.fromtimestamp(expire - valid_lifetime, timezone.utc) if expire else None
+        status = KEA_STATE_MAP.get((row.get('state') or '0').strip(), 'unknown')
+        if status == 'active' and ends and ends < datetime.now(timezone.utc):
+            status = 'expired'
+        yield {
+            'client_id': client_id,
+            'ip': address,
+            'mac': mac,
+            'status': status,
+            'lease_start': _iso(starts),
+            'lease_end': _iso(ends),
+            'hostname': (row.get('hostname') or '').strip(),
+        }
+
+
+LEASE_PARSERS = {
+    'isc': parse_isc_leases,
+    'kea': parse_kea_csv,
+}
+
+
+def _fingerprint(row):
+    payload = '|'.join(str(row.get(k) or '') for k in (
+        'status', 'lease_start', 'lease_end', 'ip', 'mac', 'hostname', 'scope_id', 'ip_id', 'mac_id',
+    ))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def ensure_lease_keys():
+    """
+    Backfill the native ``client_id`` key on leases created through the UI and
+    make it unique, so concurrent or retried imports MERGE onto one lease per client.
+    Runs once per cache lifetime; the audit hook keys leases edited afterwards.
+    """
+    if cache.get(LEASE_KEYS_READY_KEY):
+        return
+    # A plain index on the same property would block the constraint
+    db.cypher_query("DROP INDEX dhcp_lease_client_id IF EXISTS")
+    # Leases hand-entered with the same client-id keep a NULL key except the oldest,
+    # so the constraint can be created; ingestion then updates that one
+    db.cypher_query("""
+        MATCH (lease:DHCP_Lease) WHERE lease.client_id IS NULL
+        WITH lease, apoc.convert.fromJsonMap(lease.custom_properties) AS lease_props
+        WHERE lease_props['client-id'] IS NOT NULL
+        WITH lease, toString(lease_props['client-id']) AS client_id
+        WHERE NOT EXISTS { MATCH (keyed:DHCP_Lease) WHERE keyed.client_id = client_id }
+        WITH client_id, lease ORDER BY elementId(lease)
+        WITH client_id, collect(lease)[0] AS lease
+        SET lease.client_id = client_id
+    """)
+    db.cypher_query(
+        "CREATE CONSTRAINT dhcp_lease_client_id_unique IF NOT EXISTS "
+        "FOR (l:DHCP_Lease) REQUIRE l.client_id IS UNIQUE"
+    )
+    cache.set(LEASE_KEYS_READY_KEY, True, None)
+
+
+def refresh_lease_key(lease_id):
+    """
+    Re-derive the native ``client_id`` key of one lease after a UI edit, unless
+    another lease already holds that client-id.
+    """
+    db.cypher_query("""
+        MATCH (lease:DHCP_Lease) WHERE elementId(lease) = $eid
+        WITH lease, toString(apoc.convert.fromJsonMap(lease.custom_properties)['client-id']) AS client_id
+        WHERE client_id IS NOT NULL AND COALESCE(lease.client_id, '') <> client_id
+          AND NOT EXISTS { MATCH (keyed:DHCP_Lease) WHERE keyed.client_id = client_id }
+        SET lease.client_id = client_id
+    """, {'eid': lease_id})
+
+
+class _AddressLookup:
+    """
+    In-memory address -> elementId maps for IP_Address and Mac_Address.
+    Each label is scanned once per run, so lease rows resolve with dict lookups
+    instead of a property-decoding query per address.
+    """
+
+    def __init__(self):
+        result, _ = db.cypher_query("""
+            MATCH (ip:IP_Address)
+            WITH ip, apoc.convert.fromJsonMap(ip.custom_properties).address AS address
+            WHERE address IS NOT NULL
+            RETURN address, elementId(ip)
+        """)
+        self.ips = {}
+        for row in result:
+            parsed = parse_ip(row[0])
+            self.ips[parsed if parsed else row[0]] = row[1]
+
+        result, _ = db.cypher_query("""
+            MATCH (mac:Mac_Address)
+            WITH mac, apoc.convert.fromJsonMap(mac.custom_properties).address AS address
+            WHERE address IS NOT NULL
+            RETURN toLower(address), elementId(mac)
+        """)
+        self.macs = {row[0]: row[1] for row in result}
+
+    def ip_id(self, address):
+        parsed = parse_ip(address)
+        return self.ips.get(parsed if parsed else address)
+
+    def mac_id(self, address):
+        return self.macs.get(address) if address else None
+
+
+def _existing_fingerprints(client_ids):
+    result, _ = db.cypher_query("""
+        UNWIND $client_ids AS cid
+        MATCH (lease:DHCP_Lease {client_id: cid})
+        RETURN cid, lease.lease_fingerprint
+    """, {'client_ids': client_ids})
+    return {row[0]: row[1] for row in result}
+
+
+def _write_batch(rows):
+    """
+    Upsert a batch of changed leases and re-point their relationships in one transaction.
+    Returns the elementIds of every scope gaining or losing a lease.
+    """
+    query = """
+        UNWIND $rows AS row
+        MERGE (lease:DHCP_Lease {client_id: row.client_id})
+        SET lease.custom_properties = apoc.convert.toJson(apoc.map.merge(
+                COALESCE(apoc.convert.fromJsonMap(lease.custom_properties), {}), row.props)),
+            lease.lease_fingerprint = row.fingerprint,
+            lease.lease_active_until = row.active_until,
+            lease.lease_expiry_indexed = true
+        WITH lease, row
+        OPTIONAL MATCH (lease)-[:ASSIGNED_FROM]->(prev_scope:DHCP_Scope)
+        WITH lease, row, collect(elementId(prev_scope)) AS prev_scopes
+        OPTIONAL MATCH (lease)-[old:ASSIGNED_FROM|ASSIGNED_TO|ASSIGNED_FOR]->()
+        DELETE old
+        WITH DISTINCT lease, row, prev_scopes
+        OPTIONAL MATCH (scope:DHCP_Scope) WHERE elementId(scope) = row.scope_id
+        OPTIONAL MATCH (ip:IP_Address) WHERE elementId(ip) = row.ip_id
+        OPTIONAL MATCH (mac:Mac_Address) WHERE elementId(mac) = row.mac_id
+        FOREACH (_ IN CASE WHEN scope IS NULL THEN [] ELSE [1] END | MERGE (lease)-[:ASSIGNED_FROM]->(scope))
+        FOREACH (_ IN CASE WHEN ip IS NULL THEN [] ELSE [1] END | MERGE (lease)-[:ASSIGNED_TO]->(ip))
+        FOREACH (_ IN CASE WHEN mac IS NULL THEN [] ELSE [1] END | MERGE (lease)-[:ASSIGNED_FOR]->(mac))
+        RETURN prev_scopes, row.scope_id
+    """
+    result, _ = db.cypher_query(query, {'rows': rows})
+    touched = set()
+    for prev_scopes, scope_id in result:
+        touched.update(prev_scopes)
+        touched.add(scope_id)
+    touched.discard(None)
+    return touched
+
+
+def _process_batch(batch, scopes, lookup, stats):
+    # Within a batch the last row for a client wins (append-only lease files)
+    latest = {}
+    for lease in batch:
+        latest[lease['client_id']] = lease
+    leases = list(latest.values())
+
+    existing = _existing_fingerprints(list(latest))
+
+    changed = []
+    for lease in leases:
+        lease['scope_id'] = scopes.find(lease['ip'])
+        lease['ip_id'] = lookup.ip_id(lease['ip'])
+        lease['mac_id'] = lookup.mac_id(lease['mac'])
+        if not lease['scope_id']:
+            stats['unresolved_scope'] += 1
+        if not lease['ip_id']:
+            stats['unresolved_ip'] += 1
+        if lease['mac'] and not lease['mac_id']:
+            stats['unresolved_mac'] += 1
+
+        fingerprint = _fingerprint(lease)
+        previous = existing.get(lease['client_id'])
+        if previous == fingerprint:
+            stats['unchanged'] += 1
+            continue
+        if lease['client_id'] in existing:
+            stats['updated'] += 1
+        else:
+            stats['created'] += 1
+
+        props = {
+            'client-id': lease['client_id'],
+            'status': lease['status'],
+            'lease_start': lease['lease_start'],
+            'lease_end': lease['lease_end'],
+        }
+        if lease['hostname']:
+            props['hostname'] = lease['hostname']
+        changed.append({
+            'client_id': lease['client_id'],
+            'props': props,
+            'fingerprint': fingerprint,
+            'active_until': active_until(lease['status'], lease['lease_end']),
+            'scope_id': lease['scope_id'],
+            'ip_id': lease['ip_id'],
+            'mac_id': lease['mac_id'],
+        })
+
+    if changed:
+        invalidate_scope_utilization(_write_batch(changed))
+        stats['batches_written'] += 1
+
+
+def ingest_leases(leases, batch_size=INGEST_BATCH_SIZE):
+    """
+    Upsert parsed leases keyed by client-id, linking each to its DHCP_Scope
+    (by range containment), IP_Address and Mac_Address.
+    Only leases whose fingerprint changed since the previous run are written.
+    """
+    ensure_lease_keys()
+    ensure_expiry_index()
+    scopes = ScopeIntervalTree.load()
+    lookup = _AddressLookup()
+    stats = {
+        'parsed': 0,
+        'created': 0,
+        'updated': 0,
+        'unchanged': 0,
+        'unresolved_scope': 0,
+        'unresolved_ip': 0,
+        'unresolved_mac': 0,
+        'batches_written': 0,
+    }
+
+    batch = []
+    for lease in leases:
+        stats['parsed'] += 1
+        batch.append(lease)
+        if len(batch) >= batch_size:
+            _process_batch(batch, scopes, lookup, stats)
+            batch = []
+    if batch:
+        _process_batch(batch, scopes, lookup, stats)
+    return stats
+
+
+def ingest_lease_file(lines, fmt, batch_size=INGEST_BATCH_SIZE):
+    """
+    Parse and ingest a lease file given as an iterable of text lines.
+    ``fmt`` is ``isc`` (dhcpd.leases) or ``kea`` (memfile CSV).
+    """
+    parser = LEASE_PARSERS.get(fmt)
+    if not parser:
+        raise ValueError(f"Unsupported lease file format: {fmt}")
+    return ingest_leases(parser(lines), batch_size=batch_size)
@@ -0,0 +1,140 @@
+# feature_packs/dhcp_pack/overlaps.py
+
+import heapq
+import ipaddress
+
+from neomodel import db
+
+from .ranges import get_scope_index, scope_bounds
+
+
+def network_bounds(cidr):
+    """
+    Convert a Network cidr into (version, first_int, last_int), or None if invalid.
+    """
+    if not cidr:
+        return None
+    try:
+        network = ipaddress.ip_network(str(cidr).strip(), strict=False)
+    except ValueError:
+        return None
+    return network.version, int(network.network_address), int(network.broadcast_address)
+
+
+def _format_ip(value):
+    return str(ipaddress.ip_address(value))
+
+
+def _fetch_network_cidr(network_id):
+    result, _ = db.cypher_query("""
+        MATCH (network:Network) WHERE elementId(network) = $eid
+        RETURN apoc.convert.fromJsonMap(network.custom_properties).cidr
+    """, {'eid': network_id})
+    return result[0][0] if result else None
+
+
+def validate_scope_range(range_start, range_end, network_id=None, exclude_id=None):
+    """
+    Check a scope's range before it is saved.
+    Returns a list of error messages; empty when the range is acceptable.
+    """
+    bounds = scope_bounds(range_start, range_end)
+    if not bounds:
+        return [f"Invalid scope range: {range_start} - {range_end}"]
+
+    errors = []
+    for other in get_scope_index().overlapping(range_start, range_end, exclude_id=exclude_id):
+        errors.append(
+            f"Range overlaps scope '{other['name']}' ({other['range_start']} - {other['range_end']})"
+        )
+
+    if network_id:
+        cidr = _fetch_network_cidr(network_id)
+        net = network_bounds(cidr)
+        if not net:
+            errors.append(f"Network has no valid CIDR: {cidr}")
+        elif net[0] != bounds[0] or bounds[1] < net[1] or bounds[2] > net[2]:
+            errors.append(f"Range extends outside network {cidr}")
+    return errors
+
+
+def _fetch_scopes_with_networks():
+    query = """
+        MATCH (scope:DHCP_Scope)
+        OPTIONAL MATCH (scope)-[:PART_OF]->(network:Network)
+        WITH scope, apoc.convert.fromJsonMap(scope.custom_properties) AS scope_props,
+             collect([elementId(network), apoc.convert.fromJsonMap(network.custom_properties).name,
+                      apoc.convert.fromJsonMap(network.custom_properties).cidr]) AS networks
+        RETURN
+            elementId(scope) AS scope_id,
+            COALESCE(scope_props.name, 'Unnamed') AS name,
+            scope_props.range_start AS range_start,
+            scope_props.range_end AS range_end,
+            [n IN networks WHERE n[0] IS NOT NULL] AS networks
+    """
+    result, _ = db.cypher_query(query)
+    return result
+
+
+def find_overlapping_pairs(scopes):
+    """
+    Sweep ranges in start order, keeping a min-heap of ranges still open,
+    so all k overlapping pairs are found in O(n log n + k).
+    """
+    pairs = []
+    for version in (4, 6):
+        ranges = sorted(
+            (s for s in scopes if s['version'] == version),
+            key=lambda s: (s['start'], -s['end']),
+        )
+        active = []
+        for idx, scope in enumerate(ranges):
+            while active and active[0][0] < scope['start']:
+                heapq.heappop(active)
+            for end, other_idx in active:
+                other = ranges[other_idx]
+                pairs.append({
+                    'scope_a': {'id': other['id'], 'name': other['name']},
+                    'scope_b': {'id': scope['id'], 'name': scope['name']},
+                    'overlap_start': _format_ip(scope['start']),
+                    'overlap_end': _format_ip(min(end, scope['end'])),
+                    'overlap_size': min(end, scope['end']) - scope['start'] + 1,
+                })
+            heapq.heappush(active, (scope['end'], idx))
+    return pairs
+
+
+def audit_scope_ranges():
+    """
+    Report every overlapping scope pair, every scope extending past its PART_OF
+    Network CIDR, and scopes whose bounds cannot be parsed, from a single read.
+    """
+    scopes = []
+    invalid = []
+    out_of_network = []
+    for scope_id, name, range_start, range_end, networks in _fetch_scopes_with_networks():
+        bounds = scope_bounds(range_start, range_end)
+        if not bounds:
+            invalid.append({'id': scope_id, 'name': name, 'range_start': range_start, 'range_end': range_end})
+            continue
+        version, low, high = bounds
+        scopes.append({'id': scope_id, 'name': name, 'version': version, 'start': low, 'end': high})
+
+        for network_id, network_name, cidr in networks:
+            net = network_bounds(cidr)
+            if net and net[0] == version and net[1] <= low and high <= net[2]:
+                continue
+            out_of_network.append({
+                'id': scope_id,
+                'name': name,
+                'range_start': range_start,
+                'range_end': range_end,
+                'network': {'id': network_id, 'name': network_name or 'Unnamed', 'cidr': cidr},
+            })
+
+    return {
+        'scopes_checked': len(scopes) + len(invalid),
+        'overlaps': find_overlapping_pairs(scopes),
+        'out_of_network': out_of_network,
+        'invalid_ranges': invalid,
+    }
@@ -0,0 +1,197 @@
+# feature_packs/dhcp_pack/ranges.py
+
+import ipaddress
+
+from django.core.cache import cache
+from neomodel import db
+
+
+INDEX_GENERATION_KEY = 'dhcp_scope_index:generation'
+
+_scope_index = None
+
+
+def parse_ip(value):
+    """
+    Parse an IPv4/IPv6 address string into (version, integer).
+    A trailing prefix length ("10.0.0.5/24") is ignored.
+    Returns None for empty or invalid values.
+    """
+    if value is None:
+        return None
+    try:
+        addr = ipaddress.ip_address(str(value).strip().split('/', 1)[0])
+    except ValueError:
+        return None
+    return addr.version, int(addr)
+
+
+def scope_bounds(range_start, range_end):
+    """
+    Convert a scope's range_start/range_end into (version, start_int, end_int).
+    Returns None when the bounds are missing, invalid, or of mixed families.
+    """
+    start = parse_ip(range_start)
+    end = parse_ip(range_end)
+    if not start or not end or start[0] != end[0]:
+        return None
+    low, high = sorted((start[1], end[1]))
+    return start[0], low, high
+
+
+def fetch_scope_ranges():
+    """
+    Load every DHCP_Scope with its parsed address range.
+    Returns a list of dicts with id, name, version, start, end and the raw bounds.
+    """
+    query = """
+        MATCH (scope:DHCP_Scope)
+        WITH scope, apoc.convert.fromJsonMap(scope.custom_properties) AS scope_props
+        RETURN
+            elementId(scope) AS scope_id,
+            COALESCE(scope_props.name, 'Unnamed') AS name,
+            scope_props.range_start AS range_start,
+            scope_props.range_end AS range_end
+    """
+    result, _ = db.cypher_query(query)
+    scopes = []
+    for row in result:
+        bounds = scope_bounds(row[2], row[3])
+        if not bounds:
+            continue
+        scopes.append({
+            'id': row[0],
+            'name': row[1],
+            'version': bounds[0],
+            'start': bounds[1],
+            'end': bounds[2],
+            'range_start': row[2],
+            'range_end': row[3],
+        })
+    return scopes
+
+
+class ScopeIntervalTree:
+    """
+    Augmented interval tree over DHCP scope ranges, one tree per IP version.
+
+    Ranges are kept sorted by start in an implicit balanced tree (the middle
+    element of each slice is the subtree root) and every node carries the
+    maximum end of its subtree, so overlap and containment queries cost
+    O(log n + k) for k matches.
+    """
+
+    def __init__(self, scopes):
+        self._entries = {}
+        self._max_ends = {}
+        for version in (4, 6):
+            entries = sorted(
+                (s['start'], s['end'], s['id'], s.get('name')) for s in scopes if s['version'] == version
+            )
+            max_ends = [0] * len(entries)
+            self._augment(entries, max_ends, 0, len(entries))
+            self._entries[version] = entries
+            self._max_ends[version] = max_ends
+
+    @classmethod
+    def load(cls):
+        return cls(fetch_scope_ranges())
+
+    @staticmethod
+    def _augment(entries, max_ends, lo, hi):
+        if lo >= hi:
+            return -1
+        mid = (lo + hi) // 2
+        max_ends[mid] = max(
+            entries[mid][1],
+            ScopeIntervalTree._augment(entries, max_ends, lo, mid),
+            ScopeIntervalTree._augment(entries, max_ends, mid + 1, hi),
+        )
+        return max_ends[mid]
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def search(self, version, low, high):
+        """
+        Return (start, end, scope_id, name) for every range intersecting [low, high].
+        """
+        entries = self._entries.get(version, [])
+        max_ends = self._max_ends.get(version, [])
+        matches = []
+        stack = [(0, len(entries))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if max_ends[mid] < low:
+                continue  # nothing in this subtree reaches the query range
+            stack.append((lo, mid))
+            start, end = entries[mid][0], entries[mid][1]
+            if start <= high:
+                if end >= low:
+                    matches.append(entries[mid])
+                stack.append((mid + 1, hi))
+        return matches
+
+    def overlapping(self, range_start, range_end, exclude_id=None):
+        """
+        Scopes whose range intersects range_start..range_end, as dicts.
+        ``exclude_id`` skips the scope being edited.
+        """
+        bounds = scope_bounds(range_start, range_end)
+        if not bounds:
+            return []
+        version, low, high = bounds
+        return [
+            {
+                'id': scope_id,
+                'name': name,
+                'range_start': str(ipaddress.ip_address(start)),
+                'range_end': str(ipaddress.ip_address(end)),
+            }
+            for start, end, scope_id, name in sorted(self.search(version, low, high))
+            if scope_id != exclude_id
+        ]
+
+    def find(self, address):
+        """
+        Return the elementId of the narrowest scope containing ``address``, or None.
+        """
+        parsed = parse_ip(address)
+        if not parsed:
+            return None
+        version, value = parsed
+        matches = self.search(version, value, value)
+        if not matches:
+            return None
+        return min(matches, key=lambda entry: entry[1] - entry[0])[2]
+
+
+def _index_generation():
+    return cache.get(INDEX_GENERATION_KEY) or 0
+
+
+def get_scope_index():
+    """
+    Process-wide interval tree over all scopes, rebuilt lazily after any
+    worker bumps the shared generation counter.
+    """
+    global _scope_index
+    generation = _index_generation()
+    if _scope_index is None or _scope_index[0] != generation:
+        _scope_index = (generation, ScopeIntervalTree.load())
+    return _scope_index[1]
+
+
+def invalidate_scope_index():
+    """
+    Force every worker to rebuild its scope index on next use.
+    """
+    global _scope_index
+    _scope_index = None
+    try:
+        cache.incr(INDEX_GENERATION_KEY)
+    except ValueError:
+        cache.set(INDEX_GENERATION_KEY, 1, None)
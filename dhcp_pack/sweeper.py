@@ -0,0 +1,290 @@
+# feature_packs/dhcp_pack/sweeper.py
+
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from neomodel import db
+from cmdb.audit_hooks import emit_audit
+
+from .utilization import invalidate_scope_utilization
+
+
+SWEEP_BATCH_SIZE = 500
+BACKFILL_BATCH_SIZE = 1000
+LAST_RUN_CACHE_KEY = 'dhcp_lease_sweeper:last_run'
+SWEEP_LOCK_KEY = 'dhcp_lease_sweeper:lock'
+SWEEP_LOCK_TIMEOUT = 6 * 3600  # outlives any sweep; only matters if a worker dies mid-sweep
+SWEEP_RECENT_KEY = 'dhcp_lease_sweeper:recent'
+# Overridden by settings.DHCP_LEASE_SWEEP_INTERVAL (seconds); 0 disables the background sweeper.
+DEFAULT_SWEEP_INTERVAL = 300
+
+_LEASE_TIME_FORMATS = (
+    '%Y-%m-%d %H:%M:%S',
+    '%Y/%m/%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y',
+)
+
+
+def parse_lease_time(value):
+    """
+    Parse a free-text lease timestamp into epoch milliseconds (UTC).
+    Accepts ISO 8601, a few common date layouts and raw epoch seconds.
+    Returns None when the value cannot be parsed.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value * 1000) if value < 10 ** 11 else int(value)
+    text = str(value).strip()
+    if not text:
+        return None
+    if text.isdigit():
+        return parse_lease_time(int(text))
+
+    parsed = None
+    try:
+        parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        for fmt in _LEASE_TIME_FORMATS:
+            try:
+                parsed = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def active_until(status, lease_end):
+    """
+    Value for the indexed ``lease_active_until`` property: the parsed lease end
+    while the lease is active, otherwise None (property removed).
+    """
+    if str(status or '').lower() != 'active':
+        return None
+    return parse_lease_time(lease_end)
+
+
+def ensure_expiry_index():
+    db.cypher_query(
+        "CREATE INDEX dhcp_lease_active_until IF NOT EXISTS FOR (l:DHCP_Lease) ON (l.lease_active_until)"
+    )
+
+
+def _apply_expiry(rows):
+    db.cypher_query("""
+        UNWIND $rows AS row
+        MATCH (lease:DHCP_Lease) WHERE elementId(lease) = row.id
+        SET lease.lease_active_until = row.active_until,
+            lease.lease_expiry_indexed = true
+    """, {'rows': rows})
+
+
+def backfill_lease_expiry(batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Parse lease_end for leases that have never been indexed.
+    Runs in bounded batches; returns the number of leases processed.
+    """
+    ensure_expiry_index()
+    processed = 0
+    while True:
+        result, _ = db.cypher_query("""
+            MATCH (lease:DHCP_Lease) WHERE lease.lease_expiry_indexed IS NULL
+            WITH lease LIMIT $limit
+            WITH lease, apoc.convert.fromJsonMap(lease.custom_properties) AS lease_props
+            RETURN elementId(lease), lease_props.status, lease_props.lease_end
+        """, {'limit': batch_size})
+        if not result:
+            break
+        _apply_expiry([
+            {'id': row[0], 'active_until': active_until(row[1], row[2])} for row in result
+        ])
+        processed += len(result)
+    return processed
+
+
+def refresh_lease_expiry(lease_id):
+    """
+    Re-derive the indexed expiry for one lease after it was edited.
+    """
+    result, _ = db.cypher_query("""
+        MATCH (lease:DHCP_Lease) WHERE elementId(lease) = $eid
+        WITH lease, apoc.convert.fromJsonMap(lease.custom_properties) AS lease_props
+        RETURN lease_props.status, lease_props.lease_end
+    """, {'eid': lease_id})
+    if result:
+        _apply_expiry([{'id': lease_id, 'active_until': active_until(result[0][0], result[0][1])}])
+
+
+def _count_due(now_ms):
+    result, _ = db.cypher_query("""
+        MATCH (lease:DHCP_Lease) WHERE lease.lease_active_until < $now
+        RETURN count(lease)
+    """, {'now': now_ms})
+    return result[0][0] if result else 0
+
+
+def _preview_batch(now_ms, after_ts, after_id, batch_size):
+    result, _ = db.cypher_query("""
+        MATCH (lease:DHCP_Lease)
+        WHERE lease.lease_active_until < $now
+          AND (lease.lease_active_until > $after_ts
+               OR (lease.lease_active_until = $after_ts AND elementId(lease) > $after_id))
+        WITH lease ORDER BY lease.lease_active_until, elementId(lease) LIMIT $limit
+        OPTIONAL MATCH (lease)-[:ASSIGNED_FROM]->(scope:DHCP_Scope)
+        RETURN elementId(lease), lease.lease_active_until,
+               apoc.convert.fromJsonMap(lease.custom_properties)['client-id'],
+               collect(elementId(scope))
+    """, {'now': now_ms, 'after_ts': after_ts, 'after_id': after_id, 'limit': batch_size})
+    return result
+
+
+def _expire_batch(now_ms, batch_size):
+    result, _ = db.cypher_query("""
+        MATCH (lease:DHCP_Lease) WHERE lease.lease_active_until < $now
+        WITH lease ORDER BY lease.lease_active_until LIMIT $limit
+        WITH lease, apoc.convert.fromJsonMap(lease.custom_properties) AS lease_props
+        SET lease.custom_properties = apoc.convert.toJson(apoc.map.merge(lease_props, {status: 'expired'}))
+        REMOVE lease.lease_active_until
+        WITH lease, lease_props
+        OPTIONAL MATCH (lease)-[:ASSIGNED_FROM]->(scope:DHCP_Scope)
+        RETURN elementId(lease), lease_props['client-id'], collect(elementId(scope))
+    """, {'now': now_ms, 'limit': batch_size})
+    return result
+
+
+def sweep_expired_leases(batch_size=SWEEP_BATCH_SIZE, max_batches=None, dry_run=False,
+                         progress=None, user='System'):
+    """
+    Flip active leases whose lease_end has passed to ``expired``.
+
+    Leases are selected through the indexed ``lease_active_until`` property and
+    updated ``batch_size`` at a time, one transaction per batch, with one summarized
+    audit event per batch. With ``dry_run=True`` nothing is written; ``expired``
+    then counts the leases that would be flipped and ``preview`` samples them.
+    ``progress`` is called with the stats after every batch.
+    """
+    backfill_lease_expiry()
+    started = time.time()
+    now_ms = int(started * 1000)
+    stats = {
+        'dry_run': dry_run,
+        'due': _count_due(now_ms),
+        'expired': 0,
+        'batches': 0,
+        'scopes_touched': 0,
+        'elapsed_ms': 0,
+        'rate_per_sec': 0.0,
+        'preview': [],
+    }
+    scopes_touched = set()
+    after_ts, after_id = -1, ''
+
+    while max_batches is None or stats['batches'] < max_batches:
+        if dry_run:
+            rows = _preview_batch(now_ms, after_ts, after_id, batch_size)
+            if rows:
+                after_ts, after_id = rows[-1][1], rows[-1][0]
+                stats['preview'].extend(
+                    {'id': row[0], 'client_id': row[2]} for row in rows[:max(0, 100 - len(stats['preview']))]
+                )
+        else:
+            rows = _expire_batch(now_ms, batch_size)
+        if not rows:
+            break
+
+        batch_scopes = set()
+        for row in rows:
+            batch_scopes.update(row[-1])
+        scopes_touched |= batch_scopes
+
+        if not dry_run:
+            invalidate_scope_utilization(batch_scopes)
+            # A batch summary, not an edit of one lease: no node_id, so it neither shows
+            # in a single lease's history nor offers a revert
+            client_ids = [str(row[1] or '') for row in rows]
+            emit_audit(
+                action='update',
+                node_label='DHCP_Lease',
+                node_id='',
+                node_name=f"{len(rows)} leases",
+                user=user,
+                changes=(f"Lease sweeper expired {len(rows)} leases "
+                         f"(client-ids: {', '.join(client_ids[:20])}{', ...' if len(client_ids) > 20 else ''}; "
+                         f"lease ids: {', '.join(row[0] for row in rows)})"),
+            )
+
+        stats['expired'] += len(rows)
+        stats['batches'] += 1
+        stats['scopes_touched'] = len(scopes_touched)
+        stats['elapsed_ms'] = int((time.time() - started) * 1000)
+        stats['rate_per_sec'] = round(stats['expired'] / max(time.time() - started, 0.001), 1)
+        if progress:
+            progress(stats)
+
+    stats['elapsed_ms'] = int((time.time() - started) * 1000)
+    if not dry_run:
+        cache.set(LAST_RUN_CACHE_KEY, dict(stats, finished_at=datetime.now(timezone.utc).isoformat()), None)
+    return stats
+
+
+def last_sweep():
+    """
+    Stats from the most recent non-dry-run sweep, if any.
+    """
+    return cache.get(LAST_RUN_CACHE_KEY)
+
+
+def sweep_interval():
+    return int(getattr(settings, 'DHCP_LEASE_SWEEP_INTERVAL', DEFAULT_SWEEP_INTERVAL) or 0)
+
+
+def sweep_if_due(interval=None):
+    """
+    Run a sweep unless one is still running or already started within ``interval``
+    seconds in any process sharing the cache. Returns the sweep stats, or None when skipped.
+    """
+    interval = interval or sweep_interval()
+    if not cache.add(SWEEP_LOCK_KEY, True, SWEEP_LOCK_TIMEOUT):
+        return None
+    try:
+        if not cache.add(SWEEP_RECENT_KEY, True, interval):
+            return None
+        return sweep_expired_leases()
+    finally:
+        cache.delete(SWEEP_LOCK_KEY)
+
+
+_sweeper_thread = None
+
+
+def _sweep_forever(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            sweep_if_due(interval)
+        except Exception as exc:
+            print(f"Error sweeping DHCP leases: {exc}")
+
+
+def start_background_sweeper():
+    """
+    Start the periodic lease sweeper in a daemon thread, once per process.
+    Every worker runs one; the cache lock lets only one of them sweep per interval.
+    """
+    global _sweeper_thread
+    interval = sweep_interval()
+    if interval <= 0 or (_sweeper_thread is not None and _sweeper_thread.is_alive()):
+        return
+    _sweeper_thread = threading.Thread(target=_sweep_forever, args=(interval,),
+                                       name='dhcp-lease-sweeper', daemon=True)
+    _sweeper_thread.start()
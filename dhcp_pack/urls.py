@@ -0,0 +1,12 @@
+from django.urls import path
+from . import views
+
+app_name = 'dhcp_pack'
+
+urlpatterns = [
+    path('dhcp/leases/import/', views.dhcp_lease_import, name='dhcp_lease_import'),
+    path('dhcp/leases/sweep/', views.dhcp_lease_sweep, name='dhcp_lease_sweep'),
+    path('dhcp/scopes/overlaps/', views.dhcp_scope_overlaps, name='dhcp_scope_overlaps'),
+    path('dhcp/scopes/exhausted/', views.dhcp_exhausted_scopes, name='dhcp_exhausted_scopes'),
+    path('dhcp/scopes/<str:element_id>/utilization/', views.dhcp_scope_utilization, name='dhcp_scope_utilization'),
+]
@@ -0,0 +1,190 @@
+# feature_packs/dhcp_pack/utilization.py
+
+import time
+
+from django.core.cache import cache
+from neomodel import db
+
+from .ranges import scope_bounds
+
+
+CACHE_PREFIX = 'dhcp_scope_util'
+CACHE_GENERATION_KEY = 'dhcp_scope_util:generation'
+CACHE_TIMEOUT = 900  # Dropped earlier when a lease in the scope changes
+HISTORY_PREFIX = 'dhcp_scope_util_history'
+HISTORY_MAX_SAMPLES = 48
+HISTORY_MIN_INTERVAL = 3600  # seconds between forecast samples
+
+# Lease states that keep an address out of the free pool
+IN_USE_STATUSES = ('active', 'abandoned', 'declined')
+
+
+def _cache_key(scope_id):
+    generation = cache.get(CACHE_GENERATION_KEY) or 0
+    return f'{CACHE_PREFIX}:{generation}:{scope_id}'
+
+
+def _history_key(scope_id):
+    return f'{HISTORY_PREFIX}:{scope_id}'
+
+
+def _build_utilization(scope_id, name, range_start, range_end, counts):
+    bounds = scope_bounds(range_start, range_end)
+    pool_size = bounds[2] - bounds[1] + 1 if bounds else 0
+    active = counts.get('active', 0)
+    expired = counts.get('expired', 0)
+    in_use = sum(counts.get(status, 0) for status in IN_USE_STATUSES)
+    free = max(pool_size - in_use, 0)
+    return {
+        'scope_id': scope_id,
+        'name': name,
+        'range_start': range_start,
+        'range_end': range_end,
+        'pool_size': pool_size,
+        'active': active,
+        'expired': expired,
+        'in_use': in_use,
+        'free': free,
+        'other': sum(counts.values()) - active - expired,
+        'percent_used': round(in_use * 100.0 / pool_size, 1) if pool_size else 0.0,
+    }
+
+
+def _fetch_scope_utilization(scope_id):
+    query = """
+        MATCH (scope:DHCP_Scope) WHERE elementId(scope) = $eid
+        OPTIONAL MATCH (lease:DHCP_Lease)-[:ASSIGNED_FROM]->(scope)
+        WITH scope, toLower(COALESCE(apoc.convert.fromJsonMap(lease.custom_properties).status, 'unknown')) AS status,
+             count(lease) AS lease_count
+        WITH scope, apoc.convert.fromJsonMap(scope.custom_properties) AS scope_props,
+             collect([status, lease_count]) AS status_counts
+        RETURN
+            COALESCE(scope_props.name, 'Unnamed') AS name,
+            scope_props.range_start AS range_start,
+            scope_props.range_end AS range_end,
+            status_counts
+    """
+    result, _ = db.cypher_query(query, {'eid': scope_id})
+    if not result:
+        return None
+    name, range_start, range_end, status_counts = result[0]
+    counts = {status: n for status, n in status_counts if n}
+    return _build_utilization(scope_id, name, range_start, range_end, counts)
+
+
+def _record_history(scope_id, utilization):
+    """
+    Keep a bounded, time-spaced series of in-use counts for forecasting.
+    """
+    now = time.time()
+    history = cache.get(_history_key(scope_id)) or []
+    if history and now - history[-1][0] < HISTORY_MIN_INTERVAL:
+        return history
+    history.append((now, utilization['in_use']))
+    history = history[-HISTORY_MAX_SAMPLES:]
+    cache.set(_history_key(scope_id), history, None)
+    return history
+
+
+def forecast_exhaustion(history, pool_size):
+    """
+    Least-squares growth rate of in-use addresses; returns days until the pool is full,
+    or None when usage is flat/shrinking or there are too few samples.
+    """
+    if len(history) < 2 or not pool_size:
+        return None
+    n = len(history)
+    mean_t = sum(t for t, _ in history) / n
+    mean_u = sum(u for _, u in history) / n
+    var_t = sum((t - mean_t) ** 2 for t, _ in history)
+    if not var_t:
+        return None
+    slope = sum((t - mean_t) * (u - mean_u) for t, u in history) / var_t  # addresses per second
+    if slope <= 0:
+        return None
+    remaining = pool_size - history[-1][1]
+    if remaining <= 0:
+        return 0.0
+    return round(remaining / slope / 86400, 1)
+
+
+def get_scope_utilization(scope_id):
+    """
+    Utilization for one scope, served from cache until a lease in the scope changes.
+    Reads also feed the forecast history, at most once per HISTORY_MIN_INTERVAL,
+    so a scope whose leases do not change still gets samples.
+    """
+    key = _cache_key(scope_id)
+    utilization = cache.get(key)
+    if utilization is None:
+        utilization = _fetch_scope_utilization(scope_id)
+        if utilization is None:
+            return None
+    elif time.time() - utilization.get('sampled_at', 0) < HISTORY_MIN_INTERVAL:
+        return utilization
+    history = _record_history(scope_id, utilization)
+    utilization['sampled_at'] = history[-1][0]
+    utilization['days_to_exhaustion'] = forecast_exhaustion(history, utilization['pool_size'])
+    cache.set(key, utilization, CACHE_TIMEOUT)
+    return utilization
+
+
+def invalidate_scope_utilization(scope_ids):
+    """
+    Drop cached utilization for the given scopes.
+    """
+    keys = [_cache_key(scope_id) for scope_id in scope_ids if scope_id]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_all_scope_utilization():
+    """
+    Drop cached utilization for every scope, e.g. after a lease was deleted and
+    its ASSIGNED_FROM edge can no longer tell which scope it belonged to.
+    """
+    try:
+        cache.incr(CACHE_GENERATION_KEY)
+    except ValueError:
+        cache.set(CACHE_GENERATION_KEY, 1, None)
+
+
+def invalidate_lease_scopes(lease_id):
+    """
+    Drop cached utilization for the scope(s) a lease is assigned from.
+    """
+    result, _ = db.cypher_query("""
+        MATCH (lease:DHCP_Lease) WHERE elementId(lease) = $eid
+        MATCH (lease)-[:ASSIGNED_FROM]->(scope:DHCP_Scope)
+        RETURN elementId(scope)
+    """, {'eid': lease_id})
+    invalidate_scope_utilization([row[0] for row in result])
+
+
+def top_exhausted_scopes(limit=10):
+    """
+    Rank every scope by utilization using one aggregate query over all leases.
+    """
+    query = """
+        MATCH (scope:DHCP_Scope)
+        OPTIONAL MATCH (lease:DHCP_Lease)-[:ASSIGNED_FROM]->(scope)
+        WITH scope, toLower(COALESCE(apoc.convert.fromJsonMap(lease.custom_properties).status, 'unknown')) AS status,
+             count(lease) AS lease_count
+        WITH scope, apoc.convert.fromJsonMap(scope.custom_properties) AS scope_props,
+             collect([status, lease_count]) AS status_counts
+        RETURN
+            elementId(scope) AS scope_id,
+            COALESCE(scope_props.name, 'Unnamed') AS name,
+            scope_props.range_start AS range_start,
+            scope_props.range_end AS range_end,
+            status_counts
+    """
+    result, _ = db.cypher_query(query)
+    scopes = []
+    for scope_id, name, range_start, range_end, status_counts in result:
+        counts = {status: n for status, n in status_counts if n}
+        utilization = _build_utilization(scope_id, name, range_start, range_end, counts)
+        if utilization['pool_size']:
+            scopes.append(utilization)
+    scopes.sort(key=lambda s: (-s['percent_used'], s['free'], s['name']))
+    return scopes[:limit]
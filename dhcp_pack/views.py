@@ -1,20 +1,33 @@
 # feature_packs/dhcp_pack/views.py
 
+import io
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import render
+from django.views.decorators.http import require_http_methods
 from neomodel import db
 from cmdb.models import DynamicNode
+from cmdb.registry import TypeRegistry
+from cmdb.audit_helpers import audit_update_node, audit_create_node
+from .ingest import LEASE_PARSERS, ingest_lease_file
+from .overlaps import audit_scope_ranges, validate_scope_range
+from .sweeper import last_sweep, sweep_expired_leases
+from .utilization import get_scope_utilization, top_exhausted_scopes
 
 
 def dhcp_scope_details_tab(request, label, element_id):
     """
     Custom view for DHCP Scope Details tab.
-    Shows DHCP leases assigned from this scope.
+    Shows pool utilization and DHCP leases assigned from this scope.
     """
     context = {
         'label': label,
         'element_id': element_id,
         'node': None,
         'custom_data': {
+            'utilization': None,
             'leases': [],
             'network': None
         },
@@ -37,6 +50,9 @@ def dhcp_scope_details_tab(request, label, element_id):
         node = node_class.inflate(raw_node)
         context['node'] = node
 
+        # Pool utilization (cached until a lease in this scope changes)
+        context['custom_data']['utilization'] = get_scope_utilization(element_id)
+
         # Fetch DHCP leases assigned from this scope
         leases_query = """
             MATCH (scope:DHCP_Scope) WHERE elementId(scope) = $eid
@@ -206,3 +222,265 @@ def dhcp_lease_details_tab(request, label, element_id):
         context['error'] = str(e)
 
     return context
+
+
+@require_http_methods(["POST"])
+@login_required
+def dhcp_lease_import(request):
+    """
+    Ingest an uploaded ISC dhcpd.leases (format=isc) or Kea memfile CSV (format=kea).
+    The upload is parsed as a stream and written in batches; returns ingestion counters.
+    """
+    fmt = request.POST.get('format', request.GET.get('format', 'isc')).lower()
+    if fmt not in LEASE_PARSERS:
+        return JsonResponse({'error': f"Unsupported lease file format: {fmt}"}, status=400)
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'No lease file uploaded.'}, status=400)
+
+    try:
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8', errors='replace')
+        stats = ingest_lease_file(lines, fmt)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+
+    return JsonResponse(stats)
+
+
+@require_http_methods(["GET"])
+def dhcp_scope_utilization(request, element_id):
+    """
+    Pool utilization and exhaustion forecast for one DHCP scope.
+    """
+    try:
+        utilization = get_scope_utilization(element_id)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    if utilization is None:
+        return JsonResponse({'error': f"DHCP Scope node not found: {element_id}"}, status=404)
+    return JsonResponse(utilization)
+
+
+@require_http_methods(["GET"])
+def dhcp_exhausted_scopes(request):
+    """
+    Top N most exhausted DHCP scopes across the CMDB (?limit=N, default 10).
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 500)
+    except ValueError:
+        limit = 10
+    try:
+        scopes = top_exhausted_scopes(limit=limit)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse({'scopes': scopes})
+
+
+@require_http_methods(["GET", "POST"])
+@login_required
+def dhcp_lease_sweep(request):
+    """
+    GET returns the last sweep's metrics; POST runs the lease-expiry sweeper.
+    POST params: dry_run=1, batch_size, max_batches.
+    """
+    if request.method == 'GET':
+        return JsonResponse({'last_run': last_sweep()})
+
+    dry_run = request.POST.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    try:
+        batch_size = min(max(int(request.POST.get('batch_size', 500)), 1), 5000)
+        max_batches = request.POST.get('max_batches')
+        max_batches = int(max_batches) if max_batches else None
+    except ValueError:
+        return JsonResponse({'error': 'batch_size and max_batches must be integers.'}, status=400)
+
+    try:
+        stats = sweep_expired_leases(
+            batch_size=batch_size,
+            max_batches=max_batches,
+            dry_run=dry_run,
+            user=request.user.username if request.user.is_authenticated else 'System',
+        )
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse(stats)
+
+
+def _scope_form_fields(label, current_props=None):
+    meta = TypeRegistry.get_metadata(label)
+    required_props = meta.get('required', [])
+    current_props = current_props or {}
+    form_fields = []
+    for prop_def in meta.get('properties', []):
+        prop_name = prop_def if isinstance(prop_def, str) else prop_def.get('name', '')
+        choices = prop_def.get('choices') if isinstance(prop_def, dict) else None
+        if not prop_name:
+            continue
+
+        field_data = {
+            'key': prop_name,
+            'value': current_props.get(prop_name, ''),
+            'type': 'select' if choices else 'text',
+            'input_name': f'prop_{prop_name}',
+            'required': prop_name in required_props,
+        }
+        if choices:
+            field_data['choices'] = choices
+        form_fields.append(field_data)
+    return form_fields, required_props
+
+
+def _scope_props_from_post(request):
+    new_props = {}
+    for key, value in request.POST.items():
+        if key.startswith('prop_'):
+            prop_key = key[5:]
+            if value.lower() in ('true', 'false'):
+                new_props[prop_key] = value.lower() == 'true'
+            elif prop_key == 'lease_time_days' and value.replace('.', '', 1).isdigit():
+                new_props[prop_key] = float(value) if '.' in value else int(value)
+            else:
+                new_props[prop_key] = value.strip()
+    return new_props
+
+
+def dhcp_scope_create_modal(request, label):
+    """
+    Custom create modal for DHCP_Scope: picks the parent Network and rejects
+    ranges that overlap another scope or fall outside the network's CIDR.
+    """
+    form_fields, required_props = _scope_form_fields(label)
+    context = {
+        'label': label,
+        'csrf_token': get_token(request),
+        'form_fields': form_fields,
+        'name_field': next((field for field in form_fields if field['key'] == 'name'), None),
+        'other_fields': [field for field in form_fields if field['key'] != 'name'],
+    }
+
+    if request.method == 'GET':
+        return render(request, 'dhcp_scope_create_modal.html', context)
+
+    try:
+        new_props = _scope_props_from_post(request)
+        for field in form_fields:
+            field['value'] = new_props.get(field['key'], '')
+
+        missing = [r for r in required_props if r not in new_props or new_props[r] == '']
+        if missing:
+            context['error'] = f"Missing required properties: {', '.join(missing)}"
+            return render(request, 'dhcp_scope_create_modal.html', context)
+
+        network_id = request.POST.get('network_id', '').strip()
+        errors = validate_scope_range(new_props.get('range_start'), new_props.get('range_end'), network_id)
+        if errors:
+            context['error'] = '; '.join(errors)
+            return render(request, 'dhcp_scope_create_modal.html', context)
+
+        node_class = DynamicNode.get_or_create_label(label)
+        node = node_class(custom_properties=new_props).save()
+        if network_id:
+            node_class.connect_nodes(node.element_id, label, 'PART_OF', network_id, 'Network')
+
+        audit_create_node(
+            label=label,
+            element_id=node.element_id,
+            props=new_props,
+            user=request.user,
+        )
+
+        return render(request, 'cmdb/partials/create_success.html', {
+            'message': f"{label} created with ID {node.element_id}"
+        })
+    except Exception as e:
+        context['error'] = str(e)
+        return render(request, 'dhcp_scope_create_modal.html', context)
+
+
+def dhcp_scope_edit_modal(request, label, element_id):
+    """
+    Custom edit modal for DHCP_Scope with the same overlap and CIDR checks as create.
+    """
+    node_class = DynamicNode.get_or_create_label(label)
+    node = node_class.get_by_element_id(element_id)
+    if not node:
+        return render(request, 'dhcp_scope_edit_modal.html', {
+            'label': label,
+            'element_id': element_id,
+            'error': 'DHCP Scope not found.'
+        })
+
+    form_fields, required_props = _scope_form_fields(label, node.custom_properties)
+    out_rels = node.get_outgoing_relationships()
+    current_network = (out_rels.get('PART_OF') or [None])[0]
+    context = {
+        'label': label,
+        'element_id': element_id,
+        'csrf_token': get_token(request),
+        'form_fields': form_fields,
+        'name_field': next((field for field in form_fields if field['key'] == 'name'), None),
+        'other_fields': [field for field in form_fields if field['key'] != 'name'],
+        'current_network': current_network,
+    }
+
+    if request.method == 'GET':
+        return render(request, 'dhcp_scope_edit_modal.html', context)
+
+    try:
+        new_props = _scope_props_from_post(request)
+        for field in form_fields:
+            field['value'] = new_props.get(field['key'], '')
+
+        missing = [r for r in required_props if r not in new_props or new_props[r] == '']
+        if missing:
+            context['error'] = f"Missing required properties: {', '.join(missing)}"
+            return render(request, 'dhcp_scope_edit_modal.html', context)
+
+        network_id = request.POST.get('network_id', '').strip()
+        errors = validate_scope_range(
+            new_props.get('range_start'), new_props.get('range_end'), network_id, exclude_id=element_id
+        )
+        if errors:
+            context['error'] = '; '.join(errors)
+            return render(request, 'dhcp_scope_edit_modal.html', context)
+
+        old_props = node.custom_properties or {}
+        node.custom_properties = new_props
+        node.save()
+
+        current_network_id = current_network['target_id'] if current_network else ''
+        if network_id != current_network_id:
+            for target in out_rels.get('PART_OF', []):
+                node_class.disconnect_nodes(element_id, label, 'PART_OF', target['target_id'], target['target_label'])
+            if network_id:
+                node_class.connect_nodes(element_id, label, 'PART_OF', network_id, 'Network')
+
+        audit_update_node(
+            label=label,
+            element_id=element_id,
+            old_props=old_props,
+            new_props=new_props,
+            user=request.user,
+        )
+
+        return render(request, 'cmdb/partials/edit_success.html', {
+            'message': 'Node updated successfully'
+        })
+    except Exception as e:
+        context['error'] = str(e)
+        return render(request, 'dhcp_scope_edit_modal.html', context)
+
+
+@require_http_methods(["GET"])
+def dhcp_scope_overlaps(request):
+    """
+    Bulk range audit: overlapping scope pairs, scopes outside their network's
+    CIDR, and scopes with unparseable bounds.
+    """
+    try:
+        report = audit_scope_ranges()
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse(report)
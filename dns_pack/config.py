@@ -5,6 +5,13 @@ FEATURE_PACK_CONFIG = {
     'version': '1.0.0',
     'applies_to_labels': ['DNS_Zone', 'DNS_Record', 'DNS_View'],
     'dependencies': ['inventory_pack', 'ipam_pack'],
+    'hooks': {
+        'audit': 'dns_pack.hooks.register_hooks'
+    },
+    'urls': {
+        'prefix': '',
+        'module': 'dns_pack.urls'
+    },
     'tabs': [
         {
             'id': 'dns_zone_details',
@@ -0,0 +1,422 @@
+# feature_packs/dns_pack/consistency.py
+
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from neomodel import db
+from cmdb.models import DynamicNode
+from cmdb.registry import TypeRegistry
+
+
+REPORT_LABEL = 'DNS_Consistency_Report'
+ZONE_BATCH_SIZE = 200
+MAX_SAMPLES_PER_ZONE = 50
+NO_ZONE_KEY = '__no_zone__'
+
+VIOLATION_TYPES = (
+    'dangling_target',
+    'cross_view_cname',
+    'missing_zone',
+    'duplicate_record',
+)
+
+ADDRESS_TYPES = ('A', 'AAAA')
+
+# Record types that may legitimately repeat a name as long as the value differs
+# (round-robin A records, multiple MX/NS/TXT entries). Only CNAME is unique per name.
+UNIQUE_NAME_TYPES = ('CNAME',)
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _fetch_zones():
+    """
+    Load every zone with its DNS view memberships and last-touched marker.
+    Zones are few compared to records, so this is the driving table for batching.
+    """
+    query = """
+        MATCH (zone:DNS_Zone)
+        OPTIONAL MATCH (view:DNS_View)-[:CONTAINS]->(zone)
+        WITH zone, apoc.convert.fromJsonMap(zone.custom_properties) AS zone_props,
+             collect(elementId(view)) AS view_ids
+        RETURN
+            elementId(zone) AS zone_id,
+            COALESCE(zone_props.name, 'Unnamed') AS name,
+            view_ids,
+            COALESCE(zone.dns_touched_at, 0) AS touched_at
+        ORDER BY zone_id
+    """
+    result, _ = db.cypher_query(query)
+    zones = {}
+    for row in result:
+        zones[row[0]] = {
+            'name': row[1],
+            'views': frozenset(row[2] or []),
+            'touched_at': row[3] or 0,
+        }
+    return zones
+
+
+def _fetch_zone_records(zone_ids):
+    """
+    Fetch all records for a batch of zones in one round trip.
+    Membership is accepted in either direction (record PART_OF zone, zone HAS_RECORD record).
+    """
+    query = """
+        UNWIND $zone_ids AS zid
+        MATCH (zone:DNS_Zone) WHERE elementId(zone) = zid
+        CALL {
+            WITH zone
+            MATCH (record:DNS_Record)-[:PART_OF]->(zone)
+            RETURN record
+            UNION
+            WITH zone
+            MATCH (zone)-[:HAS_RECORD]->(record:DNS_Record)
+            RETURN record
+        }
+        OPTIONAL MATCH (record)-[:RESOLVES_TO]->(target)
+        WITH zone, record, target,
+            apoc.convert.fromJsonMap(record.custom_properties) AS rec_props,
+            apoc.convert.fromJsonMap(target.custom_properties) AS target_props
+        RETURN
+            elementId(zone) AS zone_id,
+            elementId(record) AS record_id,
+            COALESCE(rec_props.name, '') AS name,
+            toUpper(COALESCE(rec_props.type, '')) AS type,
+            COALESCE(toString(rec_props.value), '') AS value,
+            EXISTS { (record)-[:PART_OF]->(:DNS_Zone) } AS has_part_of,
+            labels(target)[0] AS target_label,
+            elementId(target) AS target_id,
+            target_props.address AS target_address
+    """
+    result, _ = db.cypher_query(query, {'zone_ids': list(zone_ids)})
+    return result
+
+
+def _fetch_record_zones(record_ids):
+    """
+    Map CNAME target records to the zones that contain them (hash-join input).
+    """
+    if not record_ids:
+        return {}
+    query = """
+        UNWIND $record_ids AS rid
+        MATCH (record:DNS_Record) WHERE elementId(record) = rid
+        OPTIONAL MATCH (record)-[:PART_OF]->(z1:DNS_Zone)
+        OPTIONAL MATCH (z2:DNS_Zone)-[:HAS_RECORD]->(record)
+        WITH rid, collect(DISTINCT elementId(z1)) + collect(DISTINCT elementId(z2)) AS zone_ids
+        RETURN rid, zone_ids
+    """
+    result, _ = db.cypher_query(query, {'record_ids': list(record_ids)})
+    return {row[0]: set(z for z in row[1] if z) for row in result}
+
+
+def _fetch_orphan_records(limit=MAX_SAMPLES_PER_ZONE):
+    """
+    Records that are not attached to any zone in either direction.
+    Returns the total count and a bounded sample.
+    """
+    query = """
+        MATCH (record:DNS_Record)
+        WHERE NOT (record)-[:PART_OF]->(:DNS_Zone)
+          AND NOT (:DNS_Zone)-[:HAS_RECORD]->(record)
+        WITH record, apoc.convert.fromJsonMap(record.custom_properties) AS rec_props
+        WITH collect({
+            record_id: elementId(record),
+            name: COALESCE(rec_props.name, ''),
+            type: toUpper(COALESCE(rec_props.type, ''))
+        }) AS orphans
+        RETURN size(orphans) AS total, orphans[0..$limit] AS sample
+    """
+    result, _ = db.cypher_query(query, {'limit': limit})
+    if not result:
+        return 0, []
+    return result[0][0], result[0][1]
+
+
+def _zones_with_dangling_records():
+    """
+    Zones holding address/CNAME records with no RESOLVES_TO target.
+    Deleting an IP detaches the edge without touching the zone, so incremental
+    runs pick these up explicitly.
+    """
+    query = """
+        MATCH (record:DNS_Record)
+        WHERE NOT (record)-[:RESOLVES_TO]->()
+        WITH record, toUpper(COALESCE(apoc.convert.fromJsonMap(record.custom_properties).type, '')) AS rtype
+        WHERE rtype IN ['A', 'AAAA', 'CNAME']
+        OPTIONAL MATCH (record)-[:PART_OF]->(z1:DNS_Zone)
+        OPTIONAL MATCH (z2:DNS_Zone)-[:HAS_RECORD]->(record)
+        WITH collect(DISTINCT elementId(z1)) + collect(DISTINCT elementId(z2)) AS zone_ids
+        RETURN zone_ids
+    """
+    result, _ = db.cypher_query(query)
+    if not result:
+        return set()
+    return set(z for z in result[0][0] if z)
+
+
+def _new_zone_entry(zone):
+    return {
+        'name': zone['name'],
+        'records': 0,
+        'counts': {vt: 0 for vt in VIOLATION_TYPES},
+        'violations': [],
+    }
+
+
+def _add_violation(entry, violation_type, record_id, name, detail):
+    entry['counts'][violation_type] += 1
+    if len(entry['violations']) < MAX_SAMPLES_PER_ZONE:
+        entry['violations'].append({
+            'type': violation_type,
+            'record_id': record_id,
+            'name': name,
+            'detail': detail,
+        })
+
+
+def check_zones(zone_ids, zones, batch_size=ZONE_BATCH_SIZE):
+    """
+    Compute violations for the given zones in batches.
+    Each batch costs two queries: records (with targets) and CNAME target zones.
+    All comparisons are set/dict lookups, so each record is visited once.
+    """
+    results = {}
+    records_checked = 0
+    zone_ids = list(zone_ids)
+
+    for start in range(0, len(zone_ids), batch_size):
+        batch = zone_ids[start:start + batch_size]
+        for zid in batch:
+            results[zid] = _new_zone_entry(zones[zid])
+
+        rows = _fetch_zone_records(batch)
+
+        # A record can appear under more than one zone; evaluate it per zone.
+        seen = set()
+        by_zone = defaultdict(list)
+        cname_targets = set()
+        for row in rows:
+            zone_id, record_id = row[0], row[1]
+            if (zone_id, record_id) in seen:
+                continue
+            seen.add((zone_id, record_id))
+            by_zone[zone_id].append(row)
+            if row[3] == 'CNAME' and row[6] == 'DNS_Record' and row[7]:
+                cname_targets.add(row[7])
+
+        target_zones = _fetch_record_zones(cname_targets)
+
+        for zone_id, zone_rows in by_zone.items():
+            entry = results[zone_id]
+            source_views = zones[zone_id]['views'] or frozenset([None])
+            keys = {}
+            for (_, record_id, name, rtype, value, has_part_of,
+                 target_label, target_id, target_address) in zone_rows:
+                entry['records'] += 1
+                records_checked += 1
+
+                if not has_part_of:
+                    _add_violation(entry, 'missing_zone', record_id, name,
+                                   'Record is listed in the zone but has no PART_OF relationship')
+
+                if rtype in ADDRESS_TYPES and target_label != 'IP_Address':
+                    _add_violation(entry, 'dangling_target', record_id, name,
+                                   f'{rtype} record does not resolve to an IP_Address')
+                elif rtype == 'CNAME':
+                    if target_label != 'DNS_Record':
+                        _add_violation(entry, 'dangling_target', record_id, name,
+                                       'CNAME record does not resolve to a DNS_Record')
+                    else:
+                        target_views = set()
+                        for tz in target_zones.get(target_id, ()):
+                            target_views |= zones[tz]['views'] if tz in zones else set()
+                        target_views = target_views or {None}
+                        if not (set(source_views) & target_views):
+                            _add_violation(entry, 'cross_view_cname', record_id, name,
+                                           'CNAME target lives in a zone outside this DNS view')
+
+                key_name = name.strip().lower().rstrip('.')
+                key = (key_name, rtype) if rtype in UNIQUE_NAME_TYPES else (key_name, rtype, value)
+                if key in keys:
+                    _add_violation(entry, 'duplicate_record', record_id, name,
+                                   f'Duplicate {rtype} record (first seen: {keys[key]})')
+                else:
+                    keys[key] = record_id
+
+    return results, records_checked
+
+
+def get_latest_report():
+    """
+    Return the most recent consistency report as a dict, or None.
+    """
+    query = f"""
+        MATCH (r:`{REPORT_LABEL}`)
+        WITH r, apoc.convert.fromJsonMap(r.custom_properties) AS props
+        RETURN elementId(r) AS report_id, props
+        ORDER BY COALESCE(props.generated_at_ms, 0) DESC
+        LIMIT 1
+    """
+    result, _ = db.cypher_query(query)
+    if not result:
+        return None
+    props = result[0][1] or {}
+    report = props.get('report') or {}
+    if isinstance(report, str):
+        try:
+            report = json.loads(report)
+        except json.JSONDecodeError:
+            report = {}
+    report['report_id'] = result[0][0]
+    return report
+
+
+def _save_report(report):
+    if REPORT_LABEL not in TypeRegistry.known_labels():
+        return None
+    report_class = DynamicNode.get_or_create_label(REPORT_LABEL)
+    properties = {
+        'generated_at': report['generated_at'],
+        'generated_at_ms': report['generated_at_ms'],
+        'mode': report['mode'],
+        'zones_checked': report['zones_checked'],
+        'records_checked': report['records_checked'],
+        'total_violations': sum(report['totals'].values()),
+        'report': json.dumps(report),
+    }
+    return report_class(custom_properties=properties).save()
+
+
+def run_consistency_check(incremental=False, batch_size=ZONE_BATCH_SIZE, save=True):
+    """
+    Scan DNS zones and records for consistency violations and store a report.
+
+    With ``incremental=True`` only zones touched since the previous report
+    (plus new zones and zones with dangling records) are re-checked; results for
+    untouched zones are carried over from the previous report.
+    """
+    started_ms = _now_ms()
+    zones = _fetch_zones()
+    previous = get_latest_report() if incremental else None
+
+    if previous:
+        since = previous.get('generated_at_ms', 0)
+        previous_zones = previous.get('zones', {})
+        dirty = {
+            zid for zid, zone in zones.items()
+            if zone['touched_at'] > since or zid not in previous_zones
+        }
+        dirty |= _zones_with_dangling_records() & set(zones)
+        mode = 'incremental'
+    else:
+        previous_zones = {}
+        dirty = set(zones)
+        mode = 'full'
+
+    checked, records_checked = check_zones(sorted(dirty), zones, batch_size=batch_size)
+
+    zone_results = {}
+    for zid in zones:
+        if zid in checked:
+            zone_results[zid] = checked[zid]
+        elif zid in previous_zones:
+            zone_results[zid] = previous_zones[zid]
+
+    orphan_total, orphan_sample = _fetch_orphan_records()
+    if orphan_total:
+        orphan_entry = {
+            'name': '(no zone)',
+            'records': orphan_total,
+            'counts': {vt: 0 for vt in VIOLATION_TYPES},
+            'violations': [],
+        }
+        orphan_entry['counts']['missing_zone'] = orphan_total
+        for orphan in orphan_sample:
+            orphan_entry['violations'].append({
+                'type': 'missing_zone',
+                'record_id': orphan['record_id'],
+                'name': orphan['name'],
+                'detail': f"{orphan['type']} record is not attached to any zone",
+            })
+        zone_results[NO_ZONE_KEY] = orphan_entry
+
+    totals = {vt: 0 for vt in VIOLATION_TYPES}
+    for entry in zone_results.values():
+        for vt in VIOLATION_TYPES:
+            totals[vt] += entry['counts'].get(vt, 0)
+
+    report = {
+        'generated_at': datetime.fromtimestamp(started_ms / 1000, timezone.utc).isoformat(),
+        'generated_at_ms': started_ms,
+        'mode': mode,
+        'zones_checked': len(checked),
+        'records_checked': records_checked,
+        'duration_ms': _now_ms() - started_ms,
+        'totals': totals,
+        'zones': zone_results,
+    }
+
+    if save:
+        _save_report(report)
+    return report
+
+
+def mark_zones_touched(zone_ids):
+    """
+    Stamp zones so the next incremental run re-checks them.
+    """
+    zone_ids = [z for z in zone_ids if z]
+    if not zone_ids:
+        return
+    db.cypher_query("""
+        UNWIND $zone_ids AS zid
+        MATCH (zone:DNS_Zone) WHERE elementId(zone) = zid
+        SET zone.dns_touched_at = timestamp()
+    """, {'zone_ids': zone_ids})
+
+
+def mark_record_zones_touched(record_id):
+    """
+    Stamp every zone holding the given record, or resolving through it.
+    """
+    db.cypher_query("""
+        MATCH (record) WHERE elementId(record) = $eid
+        OPTIONAL MATCH (record)-[:PART_OF]->(z1:DNS_Zone)
+        OPTIONAL MATCH (z2:DNS_Zone)-[:HAS_RECORD]->(record)
+        OPTIONAL MATCH (alias:DNS_Record)-[:RESOLVES_TO]->(record)
+        OPTIONAL MATCH (alias)-[:PART_OF]->(z3:DNS_Zone)
+        WITH [z IN collect(z1) + collect(z2) + collect(z3) WHERE z IS NOT NULL] AS zones
+        UNWIND zones AS zone
+        WITH DISTINCT zone
+        SET zone.dns_touched_at = timestamp()
+    """, {'eid': record_id})
+
+
+def mark_all_zones_touched():
+    """
+    Stamp every zone, for changes whose zones can no longer be looked up, such as
+    a deleted record whose PART_OF / HAS_RECORD edges are already gone.
+    """
+    db.cypher_query("""
+        MATCH (zone:DNS_Zone)
+        SET zone.dns_touched_at = timestamp()
+    """)
+
+
+def mark_ip_zones_touched(ip_id):
+    """
+    Stamp zones with records resolving to the given IP address.
+    """
+    db.cypher_query("""
+        MATCH (ip:IP_Address) WHERE elementId(ip) = $eid
+        MATCH (record:DNS_Record)-[:RESOLVES_TO]->(ip)
+        MATCH (record)-[:PART_OF]->(zone:DNS_Zone)
+        WITH DISTINCT zone
+        SET zone.dns_touched_at = timestamp()
+    """, {'eid': ip_id})
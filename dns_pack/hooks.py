@@ -0,0 +1,36 @@
+from .consistency import (
+    mark_all_zones_touched, mark_ip_zones_touched, mark_record_zones_touched, mark_zones_touched,
+)
+from .records import refresh_record_sort_keys
+
+
+def track_dns_changes(action, node_label, node_id, node_name=None, user=None, changes=None,
+                      relationship_type=None, target_label=None, target_id=None, **kwargs):
+    """
+    Mark DNS zones dirty when they, their records, or resolved IPs change,
+    so incremental consistency runs only re-check what was touched. A deleted
+    record's zones cannot be traced any more, so that marks every zone.
+    Record edits also refresh the record's native sort keys.
+    """
+    try:
+        zone_ids = []
+        if node_label == 'DNS_Zone':
+            zone_ids.append(node_id)
+        if target_label == 'DNS_Zone':
+            zone_ids.append(target_id)
+        mark_zones_touched(zone_ids)
+
+        if node_label == 'DNS_Record' and relationship_type is None and action == 'delete':
+            mark_all_zones_touched()
+        elif node_label == 'DNS_Record' and action != 'delete':
+            if relationship_type is None:
+                refresh_record_sort_keys(node_id)
+            mark_record_zones_touched(node_id)
+        elif node_label == 'IP_Address':
+            mark_ip_zones_touched(node_id)
+    except Exception as exc:
+        print(f"Error tracking DNS change: {exc}")
+
+
+def register_hooks(register_audit_hook):
+    register_audit_hook(track_dns_changes)
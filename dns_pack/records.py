@@ -0,0 +1,40 @@
+# feature_packs/dns_pack/records.py
+
+from django.core.cache import cache
+from neomodel import db
+
+
+SORT_KEYS_READY_KEY = 'dns_record_sort_keys:ready'
+
+# Records carry their type and name as native properties (dns_type, dns_name),
+# mirrored from custom_properties, so zone listings filter and order on indexed
+# values instead of decoding every record's JSON.
+_SET_SORT_KEYS = """
+    WITH record, apoc.convert.fromJsonMap(record.custom_properties) AS rec_props
+    SET record.dns_type = toUpper(toString(COALESCE(rec_props.type, 'Unknown'))),
+        record.dns_name = toString(COALESCE(rec_props.name, ''))
+"""
+
+
+def ensure_record_sort_keys():
+    """
+    Index the native sort keys and backfill records that predate them.
+    Runs once per cache lifetime; the audit hook keeps keys current afterwards.
+    """
+    if cache.get(SORT_KEYS_READY_KEY):
+        return
+    db.cypher_query(
+        "CREATE INDEX dns_record_sort_key IF NOT EXISTS FOR (r:DNS_Record) ON (r.dns_type, r.dns_name)"
+    )
+    db.cypher_query("MATCH (record:DNS_Record) WHERE record.dns_type IS NULL" + _SET_SORT_KEYS)
+    cache.set(SORT_KEYS_READY_KEY, True, None)
+
+
+def refresh_record_sort_keys(record_id):
+    """
+    Re-derive the native sort keys of one record after it was created or edited.
+    """
+    db.cypher_query(
+        "MATCH (record:DNS_Record) WHERE elementId(record) = $eid" + _SET_SORT_KEYS,
+        {'eid': record_id},
+    )
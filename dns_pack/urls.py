@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = 'dns_pack'
+
+urlpatterns = [
+    path('dns/consistency/', views.dns_consistency_report, name='dns_consistency_report'),
+    path('dns/consistency/report.json', views.dns_consistency_report_json, name='dns_consistency_report_json'),
+    path('dns/consistency/run/', views.dns_consistency_run, name='dns_consistency_run'),
+    path('dns/zone/<str:element_id>/records/', views.dns_zone_records, name='dns_zone_records'),
+]
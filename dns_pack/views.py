@@ -1,17 +1,137 @@
 # feature_packs/dns_pack/views.py
 
-from django.shortcuts import render
+from django.shortcuts import render, redirect
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse
 from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_http_methods
 from neomodel import db
 from cmdb.models import DynamicNode
 from cmdb.registry import TypeRegistry
 from cmdb.audit_helpers import audit_update_node, audit_create_node
+from .consistency import NO_ZONE_KEY, VIOLATION_TYPES, get_latest_report, run_consistency_check
+from .records import ensure_record_sort_keys
+
+
+RECORD_PAGE_SIZE = 100
+
+# Records attached to a zone, in either direction (zone HAS_RECORD record or record PART_OF zone),
+# narrowed by the optional type / name prefix / TTL filters. Type and name come from the
+# native dns_type / dns_name keys; only the TTL filter has to decode custom_properties.
+ZONE_RECORDS_MATCH = """
+    MATCH (zone:DNS_Zone) WHERE elementId(zone) = $eid
+    CALL {
+        WITH zone
+        MATCH (zone)-[:HAS_RECORD]->(record:DNS_Record)
+        RETURN record
+        UNION
+        WITH zone
+        MATCH (record:DNS_Record)-[:PART_OF]->(zone)
+        RETURN record
+    }
+    WITH record, COALESCE(record.dns_type, 'UNKNOWN') AS rtype
+    WHERE ($name_prefix IS NULL OR toLower(COALESCE(record.dns_name, '')) STARTS WITH $name_prefix)
+      AND ($ttl IS NULL OR toString(apoc.convert.fromJsonMap(record.custom_properties).ttl) = $ttl)
+"""
+
+
+def _zone_record_filters(request):
+    """
+    Read record listing filters (type, name prefix, TTL) from the query string.
+    """
+    record_type = request.GET.get('type', '').strip().upper()
+    name_prefix = request.GET.get('name', '').strip().lower()
+    ttl = request.GET.get('ttl', '').strip()
+    return {
+        'type': record_type or None,
+        'name': name_prefix or None,
+        'ttl': ttl or None,
+    }
+
+
+def _zone_record_type_counts(element_id, filters):
+    """
+    Per-type record counts for a zone in one aggregate query.
+    The type filter is not applied so every type remains selectable.
+    """
+    ensure_record_sort_keys()
+    query = ZONE_RECORDS_MATCH + """
+        RETURN rtype AS type, count(record) AS count
+        ORDER BY type
+    """
+    result, _ = db.cypher_query(query, {
+        'eid': element_id,
+        'name_prefix': filters['name'],
+        'ttl': filters['ttl'],
+    })
+    return [{'type': row[0], 'count': row[1]} for row in result]
+
+
+def _zone_records_page(element_id, filters, offset=0, limit=RECORD_PAGE_SIZE):
+    """
+    One page of records for a zone ordered by type and name.
+
+    Ordering reads the native sort keys, so no record outside the page has its
+    JSON decoded; the zone's records are still expanded and sorted on every page,
+    since the index covers all records rather than one zone's.
+    custom_properties and resolved IPs (one row per record, IPs collected) are
+    only read for the records on the page.
+    """
+    ensure_record_sort_keys()
+    query = ZONE_RECORDS_MATCH + """
+          AND ($type IS NULL OR rtype = $type)
+        WITH record, rtype
+        ORDER BY rtype, record.dns_name, elementId(record)
+        SKIP $offset
+        LIMIT $limit
+        WITH record, rtype, apoc.convert.fromJsonMap(record.custom_properties) AS rec_props,
+            COLLECT {
+                MATCH (record)-[:RESOLVES_TO]->(ip:IP_Address)
+                RETURN [elementId(ip), apoc.convert.fromJsonMap(ip.custom_properties).address] AS ip
+                ORDER BY ip[1]
+            } AS ips
+        RETURN
+            elementId(record) AS record_id,
+            labels(record)[0] AS record_label,
+            COALESCE(rec_props.name, 'Unknown') AS name,
+            rtype AS type,
+            COALESCE(rec_props.value, 'Unknown') AS value,
+            COALESCE(rec_props.ttl, 'Default') AS ttl,
+            ips
+    """
+    result, _ = db.cypher_query(query, {
+        'eid': element_id,
+        'type': filters['type'],
+        'name_prefix': filters['name'],
+        'ttl': filters['ttl'],
+        'offset': offset,
+        # Fetch one extra row to know whether another page exists
+        'limit': limit + 1,
+    })
+    records = []
+    for row in result[:limit]:
+        records.append({
+            'id': row[0],
+            'label': row[1],
+            'name': row[2],
+            'type': row[3],
+            'value': row[4],
+            'ttl': row[5],
+            'ips': [{'id': ip_id, 'address': address} for ip_id, address in row[6]],
+        })
+    return {
+        'records': records,
+        'has_more': len(result) > limit,
+        'next_offset': offset + limit,
+    }
 
 
 def dns_zone_details_tab(request, label, element_id):
     """
     Custom view for DNS Zone Details tab.
-    Shows DNS records in this zone.
+    Shows per-type record counts and the first page of DNS records in this zone.
     """
     context = {
         'label': label,
@@ -19,6 +139,11 @@ def dns_zone_details_tab(request, label, element_id):
         'node': None,
         'custom_data': {
             'records': [],
+            'type_counts': [],
+            'total_records': 0,
+            'has_more': False,
+            'next_offset': 0,
+            'filters': {},
             'views': []
         },
         'error': None,
@@ -40,37 +165,15 @@ def dns_zone_details_tab(request, label, element_id):
         node = node_class.inflate(raw_node)
         context['node'] = node
 
-        # Fetch DNS records in this zone
-        records_query = """
-            MATCH (zone:DNS_Zone) WHERE elementId(zone) = $eid
-            MATCH (zone)-[:HAS_RECORD]->(record:DNS_Record)
-            OPTIONAL MATCH (record)-[:RESOLVES_TO]->(ip:IP_Address)
-            WITH record, ip,
-                apoc.convert.fromJsonMap(record.custom_properties) AS rec_props,
-                apoc.convert.fromJsonMap(ip.custom_properties) AS ip_props
-            RETURN 
-                elementId(record) AS record_id,
-                labels(record)[0] AS record_label,
-                COALESCE(rec_props.name, 'Unknown') AS name,
-                COALESCE(rec_props.type, 'Unknown') AS type,
-                COALESCE(rec_props.value, 'Unknown') AS value,
-                COALESCE(rec_props.ttl, 'Default') AS ttl,
-                elementId(ip) AS ip_id,
-                COALESCE(ip_props.address, NULL) AS ip_address
-            ORDER BY rec_props.type, rec_props.name
-        """
-        records_result, _ = db.cypher_query(records_query, {'eid': element_id})
-        for row in records_result:
-            context['custom_data']['records'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'type': row[3],
-                'value': row[4],
-                'ttl': row[5],
-                'ip_id': row[6],
-                'ip_address': row[7]
-            })
+        # Fetch per-type counts and the first page of records in this zone
+        filters = _zone_record_filters(request)
+        context['custom_data']['filters'] = filters
+        context['custom_data']['type_counts'] = _zone_record_type_counts(element_id, filters)
+        context['custom_data']['total_records'] = sum(c['count'] for c in context['custom_data']['type_counts'])
+        page = _zone_records_page(element_id, filters, offset=0)
+        context['custom_data']['records'] = page['records']
+        context['custom_data']['has_more'] = page['has_more']
+        context['custom_data']['next_offset'] = page['next_offset']
 
         # Fetch DNS views containing this zone
         views_query = """
@@ -523,3 +626,108 @@ def dns_record_create_modal(request, label):
     except Exception as e:
         context['error'] = str(e)
         return render(request, 'dns_record_create_modal.html', context)
+
+
+@require_http_methods(["GET"])
+def dns_consistency_report(request):
+    """
+    Summary page for the latest DNS consistency report.
+    Supports HTMX partial updates
+    """
+    try:
+        report = get_latest_report()
+        error = None
+    except Exception as exc:
+        report = None
+        error = str(exc)
+
+    zones = []
+    if report:
+        for zone_id, entry in report.get('zones', {}).items():
+            total = sum(entry.get('counts', {}).values())
+            zones.append({
+                'id': None if zone_id == NO_ZONE_KEY else zone_id,
+                'name': entry.get('name', 'Unnamed'),
+                'records': entry.get('records', 0),
+                'counts': [entry.get('counts', {}).get(vt, 0) for vt in VIOLATION_TYPES],
+                'total': total,
+                'violations': entry.get('violations', []),
+            })
+        zones.sort(key=lambda z: (-z['total'], z['name']))
+
+    context = {
+        'report': report,
+        'zones': zones,
+        'violation_types': VIOLATION_TYPES,
+        'totals': [report['totals'].get(vt, 0) for vt in VIOLATION_TYPES] if report else [],
+        'error': error,
+    }
+
+    if request.htmx:
+        content_html = render_to_string('dns_pack/partials/dns_consistency_content.html', context, request=request)
+        header_html = render_to_string('dns_pack/partials/dns_consistency_header.html', context, request=request)
+        return HttpResponse(content_html + header_html)
+
+    return render(request, 'dns_pack/dns_consistency_report.html', context)
+
+
+@require_http_methods(["GET"])
+def dns_consistency_report_json(request):
+    """
+    Latest DNS consistency report as JSON.
+    """
+    try:
+        report = get_latest_report()
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    if not report:
+        return JsonResponse({'error': 'No DNS consistency report has been generated yet.'}, status=404)
+    return JsonResponse(report)
+
+
+@require_http_methods(["POST"])
+@login_required
+def dns_consistency_run(request):
+    """
+    Run the DNS consistency checker. Pass incremental=1 to only re-check touched zones.
+    """
+    incremental = request.POST.get('incremental', '').lower() in ('1', 'true', 'yes')
+    try:
+        report = run_consistency_check(incremental=incremental)
+        messages.success(
+            request,
+            f"DNS consistency check ({report['mode']}) finished: {report['zones_checked']} zones, "
+            f"{report['records_checked']} records, {sum(report['totals'].values())} violations."
+        )
+    except Exception as exc:
+        messages.error(request, f'DNS consistency check failed: {exc}')
+    return redirect('cmdb:dns_consistency_report')
+
+
+@require_http_methods(["GET"])
+def dns_zone_records(request, element_id):
+    """
+    HTMX endpoint returning a page of zone record rows for the DNS Zone tab.
+    """
+    filters = _zone_record_filters(request)
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        offset = 0
+
+    context = {
+        'element_id': element_id,
+        'records': [],
+        'filters': filters,
+        'has_more': False,
+        'next_offset': 0,
+        'first_page': offset == 0,
+        'error': None,
+    }
+    try:
+        page = _zone_records_page(element_id, filters, offset=offset)
+        context.update(page)
+    except Exception as exc:
+        context['error'] = str(exc)
+
+    return render(request, 'dns_pack/partials/dns_zone_record_rows.html', context)
@@ -0,0 +1,282 @@
+# feature_packs/itsm_pack/clusters.py
+
+from neomodel import db
+
+
+# Devices affected by more problems than this (core switches, shared storage...)
+# do not link problems implicitly, otherwise one hub collapses everything into one cluster.
+MAX_DEVICE_FANOUT = 50
+# Problems whose affected-device sets overlap at least this much (Jaccard) form a similarity group
+SIMILARITY_THRESHOLD = 0.5
+WRITE_BATCH_SIZE = 5000
+
+
+class UnionFind:
+    """
+    Disjoint sets with path halving and union by size.
+    """
+
+    def __init__(self, items=()):
+        self.parent = {}
+        self.size = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        self.add(a)
+        self.add(b)
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+    def groups(self):
+        groups = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
+
+
+def ensure_cluster_keys():
+    db.cypher_query("CREATE INDEX itsm_problem_cluster IF NOT EXISTS FOR (p:Problem) ON (p.problem_cluster_id)")
+    db.cypher_query(
+        "CREATE INDEX itsm_problem_similarity IF NOT EXISTS FOR (p:Problem) ON (p.problem_similarity_id)"
+    )
+
+
+def _shared_device_groups(params, scope):
+    """
+    Lists of problems (within ``scope``) affecting the same device, hub devices excluded.
+    """
+    result, _ = db.cypher_query(f"""
+        MATCH (p:Problem)-[:AFFECTS]->(device:Device)
+        WHERE {scope}
+        WITH device, collect(elementId(p)) AS problems
+        WHERE size(problems) > 1 AND COUNT {{ (:Problem)-[:AFFECTS]->(device) }} <= $fanout
+        RETURN problems
+    """, params)
+    return [row[0] for row in result]
+
+
+def _write_groups(groups, id_property, size_property):
+    rows = []
+    multi = 0
+    for members in groups:
+        group_id = min(members)
+        multi += len(members) > 1
+        rows.extend({'id': member, 'group_id': group_id, 'size': len(members)} for member in members)
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        db.cypher_query(f"""
+            UNWIND $rows AS row
+            MATCH (p:Problem) WHERE elementId(p) = row.id
+            SET p.{id_property} = row.group_id, p.{size_property} = row.size
+        """, {'rows': rows[start:start + WRITE_BATCH_SIZE]})
+    return multi
+
+
+def compute_problem_clusters(problem_ids=None):
+    """
+    Connected components of Problems over RELATED_TO (either direction) and
+    shared AFFECTS devices, written to ``problem_cluster_id`` / ``problem_cluster_size``.
+    ``problem_ids`` restricts the run to a set of problems (an existing cluster
+    being re-split); by default every problem is clustered, and the similarity
+    groups are recomputed as well.
+    Returns the number of clusters with more than one problem.
+    """
+    ensure_cluster_keys()
+    params = {'ids': problem_ids, 'fanout': MAX_DEVICE_FANOUT}
+    scope = "$ids IS NULL OR elementId(p) IN $ids"
+
+    result, _ = db.cypher_query(f"MATCH (p:Problem) WHERE {scope} RETURN elementId(p)", params)
+    clusters = UnionFind(row[0] for row in result)
+
+    result, _ = db.cypher_query(f"""
+        MATCH (p:Problem)-[:RELATED_TO]-(other:Problem)
+        WHERE ({scope}) AND elementId(p) < elementId(other)
+        RETURN elementId(p), elementId(other)
+    """, params)
+    for a, b in result:
+        if b in clusters.parent:
+            clusters.union(a, b)
+
+    for problems in _shared_device_groups(params, scope):
+        for other in problems[1:]:
+            clusters.union(problems[0], other)
+
+    multi = _write_groups(clusters.groups(), 'problem_cluster_id', 'problem_cluster_size')
+    if problem_ids is None:
+        compute_similarity_groups()
+    return multi
+
+
+def compute_similarity_groups(problem_ids=None):
+    """
+    Similarity groups: Problems are joined when the Jaccard similarity of their
+    AFFECTS device sets reaches SIMILARITY_THRESHOLD, written to
+    ``problem_similarity_id`` / ``problem_similarity_size``. Unlike clusters, one
+    shared device does not join two problems that otherwise affect different devices.
+    Hub devices (over MAX_DEVICE_FANOUT problems) count toward each problem's set but
+    never as shared, as for clusters. ``problem_ids`` restricts the run
+    to a set of problems (the groups around a changed problem); by default every
+    problem is grouped. Returns the number of groups with more than one problem.
+    """
+    ensure_cluster_keys()
+    params = {'ids': problem_ids, 'fanout': MAX_DEVICE_FANOUT}
+    scope = "$ids IS NULL OR elementId(p) IN $ids"
+
+    result, _ = db.cypher_query(f"""
+        MATCH (p:Problem) WHERE {scope}
+        RETURN elementId(p), COUNT {{ (p)-[:AFFECTS]->(:Device) }}
+    """, params)
+    device_counts = dict(result)
+    groups = UnionFind(device_counts)
+
+    shared = {}
+    for problems in _shared_device_groups(params, scope):
+        problems.sort()
+        for position, a in enumerate(problems):
+            for b in problems[position + 1:]:
+                shared[(a, b)] = shared.get((a, b), 0) + 1
+    for (a, b), common in shared.items():
+        if common / (device_counts[a] + device_counts[b] - common) >= SIMILARITY_THRESHOLD:
+            groups.union(a, b)
+
+    return _write_groups(groups.groups(), 'problem_similarity_id', 'problem_similarity_size')
+
+
+def merge_problem_clusters(problem_ids):
+    """
+    Union the clusters of ``problem_ids`` after a relationship was added.
+    The merged cluster keeps the smallest of the existing cluster ids.
+    """
+    if len(set(problem_ids)) < 2:
+        return
+    db.cypher_query("""
+        UNWIND $ids AS pid
+        MATCH (p:Problem) WHERE elementId(p) = pid
+        WITH collect(DISTINCT COALESCE(p.problem_cluster_id, elementId(p))) AS cluster_ids
+        CALL {
+            WITH cluster_ids
+            UNWIND cluster_ids AS cid
+            MATCH (member:Problem {problem_cluster_id: cid})
+            RETURN member
+            UNION
+            UNWIND $ids AS pid
+            MATCH (member:Problem) WHERE elementId(member) = pid
+            RETURN member
+        }
+        WITH cluster_ids, collect(DISTINCT member) AS members
+        WITH members, reduce(low = head(cluster_ids), c IN cluster_ids | CASE WHEN c < low THEN c ELSE low END) AS cluster_id
+        UNWIND members AS member
+        SET member.problem_cluster_id = cluster_id, member.problem_cluster_size = size(members)
+    """, {'ids': list(set(problem_ids))})
+
+
+def _problems_sharing_device(device_id):
+    result, _ = db.cypher_query("""
+        MATCH (device:Device) WHERE elementId(device) = $eid
+        MATCH (p:Problem)-[:AFFECTS]->(device)
+        WITH collect(elementId(p)) AS problems
+        RETURN CASE WHEN size(problems) <= $fanout THEN problems ELSE [] END
+    """, {'eid': device_id, 'fanout': MAX_DEVICE_FANOUT})
+    return result[0][0] if result else []
+
+
+def _similarity_scope(problem_id):
+    """
+    The changed problem, the problems sharing a non-hub device with it, and the
+    current similarity groups of all of them: the only groups its edit can change.
+    """
+    candidates = [problem_id] + [
+        other for other in _problems_sharing_device_of(problem_id) if other != problem_id
+    ]
+    result, _ = db.cypher_query("""
+        UNWIND $ids AS pid
+        MATCH (p:Problem) WHERE elementId(p) = pid AND p.problem_similarity_id IS NOT NULL
+        MATCH (member:Problem {problem_similarity_id: p.problem_similarity_id})
+        RETURN DISTINCT elementId(member)
+    """, {'ids': candidates})
+    return sorted(set(candidates) | {row[0] for row in result})
+
+
+def _problems_sharing_device_of(problem_id):
+    result, _ = db.cypher_query("""
+        MATCH (p:Problem)-[:AFFECTS]->(device:Device) WHERE elementId(p) = $eid
+          AND COUNT { (:Problem)-[:AFFECTS]->(device) } <= $fanout
+        MATCH (other:Problem)-[:AFFECTS]->(device)
+        RETURN DISTINCT elementId(other)
+    """, {'eid': problem_id, 'fanout': MAX_DEVICE_FANOUT})
+    return [row[0] for row in result]
+
+
+def _cluster_members(problem_ids):
+    result, _ = db.cypher_query("""
+        UNWIND $ids AS pid
+        MATCH (p:Problem) WHERE elementId(p) = pid AND p.problem_cluster_id IS NOT NULL
+        MATCH (member:Problem {problem_cluster_id: p.problem_cluster_id})
+        RETURN DISTINCT elementId(member)
+    """, {'ids': problem_ids})
+    return [row[0] for row in result] or problem_ids
+
+
+def update_problem_clusters(action, node_label, node_id, relationship_type=None,
+                            target_label=None, target_id=None):
+    """
+    Incrementally maintain clusters from one audit event: added links union
+    clusters; removed links re-split only the cluster(s) they belonged to.
+    AFFECTS edits also regroup the similarity groups around the problem, since
+    adding a device can lower its similarity with others as well as raise it.
+    """
+    if node_label != 'Problem':
+        return
+    if relationship_type == 'RELATED_TO' and target_label == 'Problem':
+        linked = [node_id, target_id]
+    elif relationship_type == 'AFFECTS' and target_label == 'Device':
+        linked = [node_id] + _problems_sharing_device(target_id)
+    else:
+        return
+
+    if action == 'connect':
+        merge_problem_clusters(linked)
+    elif action == 'disconnect':
+        compute_problem_clusters(_cluster_members(linked))
+    else:
+        return
+    if relationship_type == 'AFFECTS':
+        compute_similarity_groups(_similarity_scope(node_id))
+
+
+def list_problem_clusters(min_size=2, limit=100):
+    """
+    Largest problem clusters first, with their open-problem counts.
+    """
+    result, _ = db.cypher_query("""
+        MATCH (p:Problem) WHERE p.problem_cluster_size >= $min_size
+        WITH p.problem_cluster_id AS cluster_id, collect(p) AS members
+        RETURN cluster_id, size(members),
+               size([m IN members WHERE toLower(COALESCE(apoc.convert.fromJsonMap(m.custom_properties).status, ''))
+                     IN ['open', 'investigating']]),
+               [m IN members[..5] | COALESCE(apoc.convert.fromJsonMap(m.custom_properties).name, 'Unnamed')]
+        ORDER BY size(members) DESC
+        LIMIT $limit
+    """, {'min_size': min_size, 'limit': limit})
+    return [
+        {'id': row[0], 'size': row[1], 'open': row[2], 'sample': row[3]}
+        for row in result
+    ]
@@ -5,6 +5,13 @@ FEATURE_PACK_CONFIG = {
     'version': '1.0.0',
     'applies_to_labels': ['Issue', 'Problem', 'Change', 'Release', 'Event'],
     'dependencies': ['inventory_pack'],
+    'hooks': {
+        'audit': 'itsm_pack.hooks.register_hooks'
+    },
+    'urls': {
+        'prefix': '',
+        'module': 'itsm_pack.urls'
+    },
     'tabs': [
         {
             'id': 'issue_details',
@@ -0,0 +1,301 @@
+# feature_packs/itsm_pack/correlation.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from neomodel import db
+
+from .counters import adjust_counters, count_nodes
+
+
+CORRELATION_WINDOW = 300  # seconds an event fingerprint / device incident stays hot
+MAX_TRACKED = 100000
+NEIGHBOR_CACHE_PREFIX = 'itsm_device_neighbors'
+NEIGHBOR_CACHE_TIMEOUT = 3600
+
+OPEN_ISSUE_STATUSES = ('open', 'in_progress')
+# Event severities that open a new Issue when no open one can be found, with its priority
+AUTO_ISSUE_PRIORITIES = {'critical': 'critical', 'error': 'high'}
+
+
+def event_fingerprint(device_key, name, severity):
+    payload = '|'.join(str(part or '').strip().lower() for part in (device_key, name, severity))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def ensure_event_keys():
+    db.cypher_query("CREATE INDEX itsm_event_fingerprint IF NOT EXISTS FOR (e:Event) ON (e.event_fingerprint)")
+
+
+class SlidingWindow:
+    """
+    Key -> value map whose entries expire ``window`` seconds after they were last touched.
+    Entries are kept in touch order, so expiry only ever pops from the front: O(1) amortized.
+    """
+
+    def __init__(self, window, max_entries):
+        self.window = window
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def _expire(self, now):
+        entries = self._entries
+        while entries:
+            touched, _ = next(iter(entries.values()))
+            if now - touched <= self.window and len(entries) <= self.max_entries:
+                break
+            entries.popitem(last=False)
+
+    def get(self, key, now):
+        self._expire(now)
+        entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def touch(self, key, value, now):
+        self._entries[key] = (now, value)
+        self._entries.move_to_end(key)
+        self._expire(now)
+
+    def discard_value(self, value):
+        for key in [k for k, (_, v) in self._entries.items() if v == value]:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class EventCorrelator:
+    """
+    Process-wide windowed state: recent event fingerprints and the open Issue each
+    device's recent events were grouped into.
+    """
+
+    def __init__(self, window=CORRELATION_WINDOW, max_entries=MAX_TRACKED):
+        self.window = window
+        self.events = SlidingWindow(window, max_entries)
+        self.device_issues = SlidingWindow(window, max_entries)
+        self.lock = threading.Lock()
+
+    def forget_issue(self, issue_id):
+        with self.lock:
+            self.device_issues.discard_value(issue_id)
+
+
+_correlator = EventCorrelator()
+
+
+def get_correlator():
+    return _correlator
+
+
+def _recent_events(fingerprints, since):
+    """
+    Seed window misses from the graph so restarts and other workers still deduplicate.
+    """
+    result, _ = db.cypher_query("""
+        UNWIND $fps AS fp
+        MATCH (event:Event {event_fingerprint: fp}) WHERE event.event_last_seen >= $since
+        WITH fp, event ORDER BY event.event_last_seen DESC
+        RETURN fp, collect(elementId(event))[0]
+    """, {'fps': fingerprints, 'since': since})
+    return {row[0]: row[1] for row in result}
+
+
+def dedupe(rows, now):
+    """
+    Collapse rows whose fingerprint was seen within the window.
+
+    Returns (new_rows, repeats): rows to create, each with an ``occurrences`` count
+    covering its in-batch repeats, and {index: event_id or first row index} for
+    rows folded into an existing event or into a new row of the same batch.
+    """
+    correlator = get_correlator()
+    with correlator.lock:
+        known = {row['fingerprint']: correlator.events.get(row['fingerprint'], now) for row in rows}
+    misses = [fp for fp, event_id in known.items() if not event_id]
+    if misses:
+        known.update(_recent_events(misses, now - correlator.window))
+
+    first = {}
+    new_rows = []
+    repeats = {}
+    with correlator.lock:
+        for row in rows:
+            fp = row['fingerprint']
+            if known.get(fp):
+                repeats[row['index']] = known[fp]
+                correlator.events.touch(fp, known[fp], now)
+            elif fp in first:
+                first[fp]['occurrences'] += 1
+                repeats[row['index']] = first[fp]['index']
+            else:
+                row['occurrences'] = 1
+                first[fp] = row
+                new_rows.append(row)
+    return new_rows, repeats
+
+
+def bump_events(counts, now):
+    """
+    Add repeat counts to existing events' ``occurrences`` counter.
+    """
+    rows = [{'id': event_id, 'count': count} for event_id, count in counts.items()]
+    if not rows:
+        return
+    db.cypher_query("""
+        UNWIND $rows AS row
+        MATCH (event:Event) WHERE elementId(event) = row.id
+        WITH event, row, apoc.convert.fromJsonMap(event.custom_properties) AS props
+        SET event.custom_properties = apoc.convert.toJson(apoc.map.merge(props, {
+                occurrences: COALESCE(toInteger(props.occurrences), 1) + row.count,
+                last_seen: $last_seen
+            })),
+            event.event_last_seen = $now
+    """, {'rows': rows, 'now': now, 'last_seen': datetime.fromtimestamp(now, timezone.utc).isoformat()})
+
+
+def remember_events(rows, now):
+    correlator = get_correlator()
+    with correlator.lock:
+        for row in rows:
+            if row.get('event_id'):
+                correlator.events.touch(row['fingerprint'], row['event_id'], now)
+
+
+def _device_neighbors(device_ids):
+    """
+    Devices one cable hop away, cached per device.
+    """
+    keys = {device_id: f'{NEIGHBOR_CACHE_PREFIX}:{device_id}' for device_id in device_ids}
+    cached = cache.get_many(list(keys.values()))
+    neighbors = {device_id: cached[key] for device_id, key in keys.items() if key in cached}
+    missing = [device_id for device_id in device_ids if device_id not in neighbors]
+    if missing:
+        result, _ = db.cypher_query("""
+            UNWIND $ids AS did
+            MATCH (device:Device) WHERE elementId(device) = did
+            OPTIONAL MATCH (device)<-[:LOCATED_ON]-(:Interface)<-[:CONNECTS]-(:Cable)
+                           -[:CONNECTS]->(:Interface)-[:LOCATED_ON]->(peer:Device)
+            WHERE peer <> device
+            RETURN did, collect(DISTINCT elementId(peer))
+        """, {'ids': missing})
+        fetched = {row[0]: row[1] for row in result}
+        for device_id in missing:
+            neighbors[device_id] = fetched.get(device_id, [])
+        cache.set_many({keys[d]: neighbors[d] for d in missing}, NEIGHBOR_CACHE_TIMEOUT)
+    return neighbors
+
+
+def _open_device_issues(device_ids):
+    result, _ = db.cypher_query("""
+        UNWIND $ids AS did
+        MATCH (issue:Issue)-[:IMPACTS]->(device:Device) WHERE elementId(device) = did
+        WITH did, issue, apoc.convert.fromJsonMap(issue.custom_properties) AS props
+        WHERE toLower(COALESCE(props.status, '')) IN $open
+        WITH did, issue, props ORDER BY props.created_date DESC
+        RETURN did, collect(elementId(issue))[0]
+    """, {'ids': device_ids, 'open': list(OPEN_ISSUE_STATUSES)})
+    return {row[0]: row[1] for row in result}
+
+
+def _create_issues(pending):
+    result, _ = db.cypher_query("""
+        UNWIND $issues AS item
+        CREATE (issue:Issue {custom_properties: apoc.convert.toJson(item.props)})
+        WITH issue, item
+        MATCH (device:Device) WHERE elementId(device) = item.device_id
+        CREATE (issue)-[:IMPACTS]->(device)
+        RETURN item.ref, elementId(issue)
+    """, {'issues': pending})
+    return {row[0]: row[1] for row in result}
+
+
+def _link_events(links):
+    result, _ = db.cypher_query("""
+        UNWIND $links AS link
+        MATCH (event:Event) WHERE elementId(event) = link.event_id
+        MATCH (issue:Issue) WHERE elementId(issue) = link.issue_id
+        WITH event, issue, link, apoc.convert.fromJsonMap(issue.custom_properties) AS props
+        WHERE toLower(COALESCE(props.status, '')) IN $open
+        MERGE (event)-[:TRIGGERS]->(issue)
+        RETURN link.event_id
+    """, {'links': links, 'open': list(OPEN_ISSUE_STATUSES)})
+    return {row[0] for row in result}
+
+
+def group_into_issues(rows, now):
+    """
+    Link newly created events to an open Issue via TRIGGERS.
+
+    An event joins, in order: the Issue its device's recent events joined, the
+    Issue a cable-adjacent device's recent events joined, the newest open Issue
+    impacting the device, or - for error/critical events - a new Issue impacting
+    the device. Returns (linked events, elementIds of issues created).
+    """
+    rows = [row for row in rows if row.get('event_id') and row.get('device_id')]
+    if not rows:
+        return {}, []
+
+    correlator = get_correlator()
+    device_ids = list(dict.fromkeys(row['device_id'] for row in rows))
+    with correlator.lock:
+        hot = {d: correlator.device_issues.get(d, now) for d in device_ids}
+    neighbors = _device_neighbors([d for d in device_ids if not hot[d]])
+    with correlator.lock:
+        for device_id, peers in neighbors.items():
+            for peer in peers:
+                issue_id = correlator.device_issues.get(peer, now)
+                if issue_id:
+                    hot[device_id] = issue_id
+                    break
+    cold = [d for d in device_ids if not hot[d]]
+    if cold:
+        hot.update(_open_device_issues(cold))
+
+    pending = {}
+    assignments = {}
+    for row in rows:
+        device_id = row['device_id']
+        if hot.get(device_id):
+            assignments[row['event_id']] = hot[device_id]
+            continue
+        priority = AUTO_ISSUE_PRIORITIES.get(row['props']['severity'])
+        if not priority:
+            continue
+        ref = f'new:{device_id}'
+        if ref not in pending:
+            pending[ref] = {
+                'ref': ref,
+                'device_id': device_id,
+                'props': {
+                    'name': row['props']['name'],
+                    'description': f"Opened automatically from {row['props'].get('source') or 'event'} alerts",
+                    'priority': priority,
+                    'status': 'open',
+                    'category': row['props'].get('category', ''),
+                    'created_date': datetime.fromtimestamp(now, timezone.utc).isoformat(),
+                },
+            }
+        assignments[row['event_id']] = ref
+
+    created = _create_issues(list(pending.values())) if pending else {}
+    adjust_counters(count_nodes('Issue', [pending[ref]['props'] for ref in created]))
+    links = []
+    for event_id, issue_ref in assignments.items():
+        issue_id = created.get(issue_ref, issue_ref)
+        if not issue_ref.startswith('new:') or issue_ref in created:
+            links.append({'event_id': event_id, 'issue_id': issue_id})
+    issue_by_event = {link['event_id']: link['issue_id'] for link in links}
+    linked = _link_events(links) if links else set()
+
+    with correlator.lock:
+        for row in rows:
+            issue_id = issue_by_event.get(row['event_id'])
+            if row['event_id'] in linked:
+                correlator.device_issues.touch(row['device_id'], issue_id, now)
+            elif issue_id:
+                correlator.device_issues.discard_value(issue_id)  # no longer open
+    return {event_id: issue_by_event[event_id] for event_id in linked}, list(created.values())
@@ -0,0 +1,200 @@
+# feature_packs/itsm_pack/counters.py
+
+import json
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from neomodel import db
+
+
+COUNTER_LABEL = 'ITSM_Counter'
+DASHBOARD_CACHE_KEY = 'itsm_dashboard_counters'
+RECONCILED_AT_CACHE_KEY = 'itsm_dashboard_counters:reconciled_at'
+COUNTER_KEYS_READY_KEY = 'itsm_dashboard_counters:keys_ready'
+
+# Second dimension counted alongside status, per ITSM label
+COUNTER_DIMENSIONS = {
+    'Issue': 'priority',
+    'Problem': 'priority',
+    'Change': 'approval_status',
+    'Release': 'release_type',
+    'Event': 'severity',
+}
+
+
+def _normalize(value):
+    text = str(value).strip().lower() if value not in (None, '') else ''
+    return text or 'unknown'
+
+
+def _props(value):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+def counter_bucket(label, props):
+    """
+    (status, dimension value) bucket a node with ``props`` is counted in.
+    """
+    props = props or {}
+    return _normalize(props.get('status')), _normalize(props.get(COUNTER_DIMENSIONS[label]))
+
+
+def ensure_counter_keys():
+    """
+    Make ``counter_key`` unique so concurrent hooks MERGE onto one counter per bucket.
+    Runs once per cache lifetime.
+    """
+    if cache.get(COUNTER_KEYS_READY_KEY):
+        return
+    # A plain index on the same property would block the constraint
+    db.cypher_query("DROP INDEX itsm_counter_key IF EXISTS")
+    # Duplicates left by racing MERGEs must go before the constraint can exist
+    result, _ = db.cypher_query(f"""
+        MATCH (c:{COUNTER_LABEL})
+        WITH c.counter_key AS key, c ORDER BY elementId(c)
+        WITH key, collect(c) AS counters WHERE size(counters) > 1
+        UNWIND counters[1..] AS duplicate
+        DELETE duplicate
+        RETURN count(*)
+    """)
+    if result and result[0][0]:
+        # The surviving counts are incomplete; recount on the next dashboard read
+        cache.delete(RECONCILED_AT_CACHE_KEY)
+    db.cypher_query(
+        f"CREATE CONSTRAINT itsm_counter_key_unique IF NOT EXISTS "
+        f"FOR (c:{COUNTER_LABEL}) REQUIRE c.counter_key IS UNIQUE"
+    )
+    cache.set(COUNTER_KEYS_READY_KEY, True, None)
+
+
+def adjust_counters(deltas):
+    """
+    Apply {(label, status, value): delta} to the materialized counters in one write.
+    Each counter is write-locked before it is read, so concurrent deltas all land.
+    """
+    rows = sorted((
+        {'key': '|'.join(key), 'label': key[0], 'status': key[1], 'value': key[2], 'delta': delta}
+        for key, delta in deltas.items() if delta
+    ), key=lambda row: row['key'])  # a fixed lock order keeps concurrent writers from deadlocking
+    if not rows:
+        return
+    ensure_counter_keys()
+    db.cypher_query(f"""
+        UNWIND $rows AS row
+        MERGE (c:{COUNTER_LABEL} {{counter_key: row.key}})
+        ON CREATE SET c.label = row.label, c.status = row.status, c.value = row.value, c.count = 0
+        WITH c, row
+        CALL apoc.lock.nodes([c])
+        SET c.count = c.count + row.delta
+    """, {'rows': rows})
+    cache.delete(DASHBOARD_CACHE_KEY)
+
+
+def count_nodes(label, props_list, sign=1):
+    """
+    Counter deltas for adding (sign=1) or removing (sign=-1) nodes with the given props.
+    """
+    deltas = {}
+    for props in props_list:
+        key = (label,) + counter_bucket(label, props)
+        deltas[key] = deltas.get(key, 0) + sign
+    return deltas
+
+
+def apply_audit_event(action, node_label, old_props=None, new_props=None):
+    """
+    Move a node between counter buckets for one audit event.
+    Events without property snapshots are left to reconciliation.
+    """
+    if node_label not in COUNTER_DIMENSIONS:
+        return
+    old_props = _props(old_props)
+    new_props = _props(new_props)
+    deltas = {}
+    if action in ('update', 'revert') and old_props is not None and new_props is not None:
+        old_key = (node_label,) + counter_bucket(node_label, old_props)
+        new_key = (node_label,) + counter_bucket(node_label, new_props)
+        if old_key != new_key:
+            deltas = {old_key: -1, new_key: 1}
+    elif action == 'create' and new_props is not None:
+        deltas = count_nodes(node_label, [new_props])
+    elif action == 'delete' and old_props is not None:
+        deltas = count_nodes(node_label, [old_props], sign=-1)
+    adjust_counters(deltas)
+
+
+def reconcile_counters():
+    """
+    Recount every ITSM label with one aggregate query per label and replace the
+    materialized counters. Returns the number of buckets written.
+    """
+    ensure_counter_keys()
+    rows = []
+    for label, dimension in COUNTER_DIMENSIONS.items():
+        result, _ = db.cypher_query(f"""
+            MATCH (n:`{label}`)
+            WITH apoc.convert.fromJsonMap(n.custom_properties) AS props
+            RETURN props.status, props[$dimension], count(*)
+        """, {'dimension': dimension})
+        buckets = {}
+        for status, value, count in result:
+            key = (label, _normalize(status), _normalize(value))
+            buckets[key] = buckets.get(key, 0) + count
+        rows.extend(
+            {'key': '|'.join(key), 'label': key[0], 'status': key[1], 'value': key[2], 'count': count}
+            for key, count in buckets.items()
+        )
+
+    db.cypher_query(f"""
+        MATCH (c:{COUNTER_LABEL}) WHERE NOT c.counter_key IN $keys
+        DELETE c
+    """, {'keys': [row['key'] for row in rows]})
+    db.cypher_query(f"""
+        UNWIND $rows AS row
+        MERGE (c:{COUNTER_LABEL} {{counter_key: row.key}})
+        SET c.label = row.label, c.status = row.status, c.value = row.value, c.count = row.count
+    """, {'rows': rows})
+    cache.set(RECONCILED_AT_CACHE_KEY, datetime.now(timezone.utc).isoformat(), None)
+    cache.delete(DASHBOARD_CACHE_KEY)
+    return len(rows)
+
+
+def get_dashboard_counters():
+    """
+    Materialized ITSM counters, grouped per label by status and by status x dimension.
+    Served from cache; a miss reads only the counter nodes, never the ITSM nodes.
+    """
+    dashboard = cache.get(DASHBOARD_CACHE_KEY)
+    if dashboard is not None:
+        return dashboard
+
+    reconciled_at = cache.get(RECONCILED_AT_CACHE_KEY)
+    if reconciled_at is None:
+        reconcile_counters()
+        reconciled_at = cache.get(RECONCILED_AT_CACHE_KEY)
+
+    labels = {
+        label: {'dimension': dimension, 'total': 0, 'by_status': {}, 'by_dimension': {}, 'matrix': {}}
+        for label, dimension in COUNTER_DIMENSIONS.items()
+    }
+    result, _ = db.cypher_query(f"""
+        MATCH (c:{COUNTER_LABEL}) WHERE c.count <> 0
+        RETURN c.label, c.status, c.value, c.count
+    """)
+    for label, status, value, count in result:
+        entry = labels.get(label)
+        if entry is None:
+            continue
+        entry['total'] += count
+        entry['by_status'][status] = entry['by_status'].get(status, 0) + count
+        entry['by_dimension'][value] = entry['by_dimension'].get(value, 0) + count
+        entry['matrix'].setdefault(status, {})[value] = count
+
+    dashboard = {'labels': labels, 'reconciled_at': reconciled_at}
+    cache.set(DASHBOARD_CACHE_KEY, dashboard, None)
+    return dashboard
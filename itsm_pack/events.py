@@ -0,0 +1,237 @@
+# feature_packs/itsm_pack/events.py
+
+import json
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from neomodel import db
+from cmdb.audit_hooks import emit_audit
+
+from .counters import adjust_counters, count_nodes
+from .correlation import (
+    bump_events, dedupe, ensure_event_keys, event_fingerprint, group_into_issues, remember_events,
+)
+from .sla import refresh_sla
+
+
+INGEST_BATCH_SIZE = 1000
+DEVICE_MAP_CACHE_KEY = 'itsm_device_name_map'
+
+EVENT_PROPERTIES = (
+    'name', 'description', 'severity', 'status', 'timestamp', 'source',
+    'event_type', 'category', 'acknowledged', 'acknowledged_by', 'acknowledged_date',
+)
+EVENT_SEVERITIES = ('informational', 'warning', 'error', 'critical')
+EVENT_STATUSES = ('new', 'acknowledged', 'investigating', 'resolved', 'closed')
+
+
+def get_device_name_map():
+    """
+    Lower-cased Device name -> elementId, built with one scan and cached until a Device changes.
+    """
+    device_map = cache.get(DEVICE_MAP_CACHE_KEY)
+    if device_map is None:
+        result, _ = db.cypher_query("""
+            MATCH (device:Device)
+            WITH device, apoc.convert.fromJsonMap(device.custom_properties).name AS name
+            WHERE name IS NOT NULL
+            RETURN toLower(toString(name)), elementId(device)
+        """)
+        device_map = {row[0]: row[1] for row in result}
+        cache.set(DEVICE_MAP_CACHE_KEY, device_map, None)
+    return device_map
+
+
+def invalidate_device_name_map():
+    cache.delete(DEVICE_MAP_CACHE_KEY)
+
+
+def iter_ndjson(lines):
+    """
+    Yield one decoded payload per non-blank NDJSON line; undecodable lines
+    are yielded as ValueError instances so they get a per-item error result.
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield ValueError(f"Invalid JSON: {exc}")
+
+
+def normalize_event(payload, device_map):
+    """
+    Validate one incoming event payload.
+    Returns (props, device_id, error, warning); error is None when the event can be
+    written. Devices are given by name (``device``) or elementId (``device_id``);
+    an unknown device is only a warning so the alert itself is not lost.
+    """
+    if isinstance(payload, Exception):
+        return None, None, str(payload), None
+    if not isinstance(payload, dict):
+        return None, None, 'Event must be a JSON object.', None
+
+    props = {key: payload[key] for key in EVENT_PROPERTIES if payload.get(key) not in (None, '')}
+    if not props.get('name'):
+        return None, None, 'Missing required property: name', None
+
+    severity = str(props.get('severity', '')).lower()
+    if severity not in EVENT_SEVERITIES:
+        return None, None, f"Invalid severity: {props.get('severity', '')}", None
+    props['severity'] = severity
+
+    status = str(props.get('status', 'new')).lower()
+    if status not in EVENT_STATUSES:
+        return None, None, f"Invalid status: {props['status']}", None
+    props['status'] = status
+
+    if not props.get('timestamp'):
+        props['timestamp'] = datetime.now(timezone.utc).isoformat()
+
+    device_id = payload.get('device_id')
+    device_name = payload.get('device')
+    if not device_id and device_name:
+        device_id = device_map.get(str(device_name).strip().lower())
+        if not device_id:
+            return props, None, None, f"Unknown device: {device_name}"
+    return props, device_id, None, None
+
+
+def _write_events(rows, now):
+    """
+    Create a batch of events and their ORIGINATED_FROM edges in one transaction.
+    Returns {row index: (event elementId, device linked)}.
+    """
+    last_seen = datetime.fromtimestamp(now, timezone.utc).isoformat()
+    for row in rows:
+        row['props']['occurrences'] = row.get('occurrences', 1)
+        row['props']['last_seen'] = last_seen
+    result, _ = db.cypher_query("""
+        UNWIND $rows AS row
+        CREATE (event:Event {
+            custom_properties: apoc.convert.toJson(row.props),
+            event_fingerprint: row.fingerprint,
+            event_last_seen: $now
+        })
+        WITH event, row
+        OPTIONAL MATCH (device:Device) WHERE elementId(device) = row.device_id
+        FOREACH (_ IN CASE WHEN device IS NULL THEN [] ELSE [1] END | CREATE (event)-[:ORIGINATED_FROM]->(device))
+        RETURN row.index, elementId(event), device IS NOT NULL
+    """, {'rows': rows, 'now': now})
+    return {row[0]: (row[1], row[2]) for row in result}
+
+
+def _flush(rows, results, stats, user, correlate):
+    now = time.time()
+    repeats = {}
+    if correlate:
+        rows, repeats = dedupe(rows, now)
+
+    written = _write_events(rows, now) if rows else {}
+    for row in rows:
+        event_id, linked = written.get(row['index'], (None, False))
+        row['event_id'] = event_id
+        item = results[row['index']]
+        item['id'] = event_id
+        item['device_linked'] = linked
+        if row['device_id'] and not linked:
+            item['warning'] = f"Device not found: {row['device_id']}"
+            stats['unresolved_device'] += 1
+    stats['created'] += len(written)
+    stats['batches_written'] += 1
+    adjust_counters(count_nodes('Event', [row['props'] for row in rows if row['event_id']]))
+
+    if correlate:
+        remember_events(rows, now)
+        counts = {}
+        for index, target in repeats.items():
+            # Repeats point either at an existing event or at a new row of this batch
+            event_id = results[target]['id'] if isinstance(target, int) else target
+            if not isinstance(target, int):
+                counts[event_id] = counts.get(event_id, 0) + 1
+            results[index]['status'] = 'deduplicated'
+            results[index]['id'] = event_id
+        bump_events(counts, now)
+        stats['deduplicated'] += len(repeats)
+
+        links, new_issues = group_into_issues(rows, now)
+        for row in rows:
+            results[row['index']]['issue_id'] = links.get(row['event_id'])
+        stats['linked_to_issue'] += len(links)
+        stats['issues_created'] += len(new_issues)
+        if new_issues:
+            # The summary event names no single Issue, so the per-item SLA upkeep runs here
+            refresh_sla('Issue', new_issues, now)
+            emit_audit(
+                action='create',
+                node_label='Issue',
+                node_id='',
+                node_name=f"{len(new_issues)} issues",
+                user=user,
+                changes=f"Event correlation opened {len(new_issues)} issues",
+            )
+
+    if written:
+        emit_audit(
+            action='create',
+            node_label='Event',
+            node_id='',
+            node_name=f"{len(written)} events",
+            user=user,
+            changes=f"Bulk event ingest created {len(written)} events",
+        )
+
+
+def ingest_events(payloads, batch_size=INGEST_BATCH_SIZE, user='System', correlate=True):
+    """
+    Validate and create events from an iterable of payload dicts, writing them in
+    UNWIND batches. Returns (stats, results) where results holds one entry per
+    input item in order: {'index', 'status', 'id', 'device_linked', 'error', 'warning'}.
+
+    With ``correlate`` (the default), repeats of a (device, name, severity) seen
+    within the correlation window are folded into the existing event's
+    ``occurrences`` counter (status ``deduplicated``), and new events are linked
+    to an open Issue via TRIGGERS (``issue_id``).
+    """
+    started = time.time()
+    device_map = get_device_name_map()
+    if correlate:
+        ensure_event_keys()
+    stats = {'received': 0, 'created': 0, 'rejected': 0, 'unresolved_device': 0, 'batches_written': 0,
+             'deduplicated': 0, 'linked_to_issue': 0, 'issues_created': 0}
+    results = []
+    batch = []
+
+    for index, payload in enumerate(payloads):
+        stats['received'] += 1
+        props, device_id, error, warning = normalize_event(payload, device_map)
+        if error:
+            stats['rejected'] += 1
+            results.append({'index': index, 'status': 'error', 'id': None, 'device_linked': False,
+                            'error': error, 'warning': None})
+            continue
+        if warning:
+            stats['unresolved_device'] += 1
+        results.append({'index': index, 'status': 'created', 'id': None, 'device_linked': False,
+                        'error': None, 'warning': warning})
+        batch.append({
+            'index': index,
+            'props': props,
+            'device_id': device_id,
+            'fingerprint': event_fingerprint(device_id or payload.get('device'), props['name'], props['severity']),
+        })
+        if len(batch) >= batch_size:
+            _flush(batch, results, stats, user, correlate)
+            batch = []
+    if batch:
+        _flush(batch, results, stats, user, correlate)
+
+    elapsed = max(time.time() - started, 0.001)
+    stats['elapsed_ms'] = int(elapsed * 1000)
+    stats['rate_per_sec'] = round(stats['created'] / elapsed, 1)
+    return stats, results
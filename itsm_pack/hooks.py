@@ -0,0 +1,71 @@
+from .clusters import update_problem_clusters
+from .correlation import get_correlator
+from .counters import apply_audit_event
+from .events import invalidate_device_name_map
+from .impact import IMPACT_LABELS, invalidate_impact
+from .jobs import start_background_jobs
+from .lineage import invalidate_release_lineage
+from .schedule import flag_change_conflicts, record_schedule_edit, schedule_peers
+from .sla import SLA_LABELS, refresh_sla
+
+
+def track_itsm_changes(action, node_label, node_id, node_name=None, user=None, changes=None,
+                       relationship_type=None, target_label=None, target_id=None, **kwargs):
+    """
+    Drop cached device blast-radius sets when a node or edge inside one changes,
+    the device name map used by event ingestion when a Device changes, and the
+    correlation window's grouping for an Issue that was edited or deleted.
+    Change schedule and IMPACTS edits are replayed into the schedule index and
+    re-flag collisions for the change and its peers, and
+    node edits move the node between materialized dashboard counter buckets.
+    Release and SUPERSEDES edits drop the cached lineage of the families involved,
+    and Problem RELATED_TO / AFFECTS edits merge or re-split problem clusters.
+    Issue and Change edits re-evaluate the item's SLA deadlines.
+    Each step runs on its own, so one failing does not skip the rest.
+    """
+    if relationship_type is None:
+        _step('counters', apply_audit_event, action, node_label, kwargs.get('old_props'), kwargs.get('new_props'))
+    if node_label == 'Issue' and action in ('update', 'delete'):
+        _step('correlator', lambda: get_correlator().forget_issue(node_id))
+    if node_label == 'Device' and relationship_type is None:
+        _step('device map', invalidate_device_name_map)
+    if node_label in IMPACT_LABELS or target_label in IMPACT_LABELS:
+        _step('impact', invalidate_impact, [node_id, target_id])
+    if node_label == 'Release' or target_label == 'Release':
+        _step('lineage', invalidate_release_lineage, [node_id, target_id])
+    if node_label in SLA_LABELS and relationship_type is None and action != 'delete' and node_id:
+        _step('SLA', refresh_sla, node_label, [node_id])
+    if relationship_type:
+        _step('problem clusters', update_problem_clusters,
+              action, node_label, node_id, relationship_type, target_label, target_id)
+    if node_label == 'Change' and relationship_type in (None, 'IMPACTS'):
+        _step('change schedule', _track_change_schedule, action, node_id)
+    elif node_label == 'Device' and relationship_type is None and action == 'delete':
+        _step('change schedule', record_schedule_edit, 'device', node_id)
+
+
+def _step(name, func, *args):
+    """
+    Run one maintenance step; a failure is logged without skipping the others.
+    """
+    try:
+        func(*args)
+    except Exception as exc:
+        print(f"Error tracking ITSM change ({name}): {exc}")
+
+
+def _track_change_schedule(action, change_id):
+    if action == 'delete':
+        peers = schedule_peers(change_id)
+        record_schedule_edit('change', change_id)
+        for peer_id in peers:
+            flag_change_conflicts(peer_id)
+    else:
+        record_schedule_edit('change', change_id)
+        flag_change_conflicts(change_id)
+
+
+def register_hooks(register_audit_hook):
+    register_audit_hook(track_itsm_changes)
+    # Packs have no scheduler of their own; hook registration runs once per process at startup
+    start_background_jobs()
@@ -0,0 +1,203 @@
+# feature_packs/itsm_pack/impact.py
+
+import time
+
+from django.core.cache import cache
+from neomodel import db
+
+
+CACHE_PREFIX = 'itsm_impact'
+MEMBERS_PREFIX = 'itsm_impact_members'
+CACHE_TIMEOUT = 3600  # safety net; entries are normally dropped by the audit hook
+TRUNCATED_CACHE_TIMEOUT = 60
+
+MAX_DEPTH = 5
+MAX_NODES_PER_DEVICE = 2000
+TIME_BUDGET = 2.0  # seconds spent traversing before giving up with a partial result
+DISPLAY_LIMIT = 100
+VIA_DISPLAY_LIMIT = 10  # device names listed per affected item
+
+# (from label, relationship type, direction seen from the "from" node, to label)
+IMPACT_RULES = [
+    ('Device', 'HOSTED_ON', 'in', 'Virtual_Host'),
+    # VMs are placed on clusters, so a host's VMs are those of the clusters it belongs to
+    ('Virtual_Host', 'MEMBER_OF', 'out', 'Virtual_Cluster'),
+    ('Virtual_Cluster', 'HOSTED_ON', 'in', 'Virtual_Machine'),
+    ('Device', 'HOSTED_ON', 'in', 'DNS_Server'),
+    ('DNS_Server', 'HOSTED_ON', 'in', 'DNS_Zone'),
+    ('Device', 'LOCATED_ON', 'in', 'Interface'),
+    ('Interface', 'CONNECTS', 'in', 'Cable'),
+    ('Interface', 'TERMINATES_AT', 'in', 'Circuit'),
+    ('Interface', 'ASSIGNED_TO', 'in', 'Mac_Address'),
+    ('Mac_Address', 'ASSIGNED_TO', 'in', 'IP_Address'),
+    ('IP_Address', 'PART_OF', 'out', 'Network'),
+    ('IP_Address', 'RESOLVES_TO', 'in', 'DNS_Record'),
+    ('DNS_Record', 'RESOLVES_TO', 'in', 'DNS_Record'),
+]
+IMPACT_REL_TYPES = sorted({rule[1] for rule in IMPACT_RULES})
+IMPACT_LABELS = sorted({rule[0] for rule in IMPACT_RULES} | {rule[3] for rule in IMPACT_RULES})
+
+_EXPAND_QUERY = f"""
+    UNWIND $frontier AS item
+    MATCH (n) WHERE elementId(n) = item.id
+    MATCH (n)-[r:{'|'.join(IMPACT_REL_TYPES)}]-(m)
+    WITH item, r, m, labels(m)[0] AS m_label,
+         CASE WHEN startNode(r) = n THEN 'out' ELSE 'in' END AS direction
+    WHERE [item.label, type(r), direction, m_label] IN $rules
+    WITH item, r, m, m_label, apoc.convert.fromJsonMap(m.custom_properties) AS props
+    RETURN item.origin, elementId(m), m_label, type(r),
+           COALESCE(props.name, props.address, props.cidr, props.circuit_id, 'Unnamed')
+"""
+
+
+def _cache_key(device_id):
+    return f'{CACHE_PREFIX}:{device_id}'
+
+
+def _members_key(node_id):
+    return f'{MEMBERS_PREFIX}:{node_id}'
+
+
+def _traverse(device_ids):
+    """
+    Breadth-first typed expansion from several devices at once, one query per hop.
+    Returns {device_id: {'items': [...], 'truncated': bool}}.
+    """
+    results = {device_id: {'items': [], 'truncated': False} for device_id in device_ids}
+    visited = {device_id: {device_id} for device_id in device_ids}
+    frontier = [{'id': device_id, 'label': 'Device', 'origin': device_id} for device_id in device_ids]
+    rules = [list(rule) for rule in IMPACT_RULES]
+    started = time.monotonic()
+
+    for depth in range(1, MAX_DEPTH + 1):
+        if not frontier:
+            break
+        if time.monotonic() - started > TIME_BUDGET:
+            for item in frontier:
+                results[item['origin']]['truncated'] = True
+            break
+
+        rows, _ = db.cypher_query(_EXPAND_QUERY, {'frontier': frontier, 'rules': rules})
+        frontier = []
+        for origin, node_id, node_label, rel_type, name in rows:
+            seen = visited[origin]
+            if node_id in seen:
+                continue
+            if len(seen) > MAX_NODES_PER_DEVICE:
+                results[origin]['truncated'] = True
+                continue
+            seen.add(node_id)
+            results[origin]['items'].append({
+                'id': node_id,
+                'label': node_label,
+                'name': name,
+                'relationship': rel_type,
+                'depth': depth,
+            })
+            frontier.append({'id': node_id, 'label': node_label, 'origin': origin})
+    return results
+
+
+def _store(device_id, impact):
+    timeout = TRUNCATED_CACHE_TIMEOUT if impact['truncated'] else CACHE_TIMEOUT
+    cache.set(_cache_key(device_id), impact, timeout)
+
+    # Reverse index so an edge change on any member drops the device's entry
+    member_ids = [device_id] + [item['id'] for item in impact['items']]
+    existing = cache.get_many([_members_key(node_id) for node_id in member_ids])
+    updates = {}
+    for node_id in member_ids:
+        key = _members_key(node_id)
+        devices = set(existing.get(key) or ())
+        if device_id not in devices:
+            devices.add(device_id)
+            updates[key] = devices
+    if updates:
+        cache.set_many(updates, CACHE_TIMEOUT)
+
+
+def get_device_impact(device_ids):
+    """
+    Impact sets for the given devices, served from cache where possible.
+    Returns {device_id: {'items': [...], 'truncated': bool}}.
+    """
+    device_ids = list(dict.fromkeys(device_id for device_id in device_ids if device_id))
+    cached = cache.get_many([_cache_key(device_id) for device_id in device_ids])
+    impacts = {}
+    missing = []
+    for device_id in device_ids:
+        impact = cached.get(_cache_key(device_id))
+        if impact is None:
+            missing.append(device_id)
+        else:
+            impacts[device_id] = impact
+    if missing:
+        for device_id, impact in _traverse(missing).items():
+            _store(device_id, impact)
+            impacts[device_id] = impact
+    return impacts
+
+
+def _device_names(device_ids):
+    result, _ = db.cypher_query("""
+        UNWIND $ids AS did
+        MATCH (d:Device) WHERE elementId(d) = did
+        RETURN did, COALESCE(apoc.convert.fromJsonMap(d.custom_properties).name, 'Unnamed')
+    """, {'ids': list(device_ids)})
+    return {row[0]: row[1] for row in result}
+
+
+def summarize_impact(devices, limit=DISPLAY_LIMIT):
+    """
+    Merge per-device impact sets into one deduplicated blast radius for display.
+    ``devices`` is a list of {'id', 'name'} dicts; a missing name is looked up
+    only if the device is listed as a "via" of a displayed item.
+    """
+    impacts = get_device_impact([device['id'] for device in devices])
+    names = {device['id']: device['name'] for device in devices if device.get('name')}
+    merged = {}
+    truncated = False
+    for device_id, impact in impacts.items():
+        truncated = truncated or impact['truncated']
+        for item in impact['items']:
+            entry = merged.get(item['id'])
+            if entry is None:
+                entry = merged[item['id']] = dict(item, via=[])
+            elif item['depth'] < entry['depth']:
+                entry['depth'] = item['depth']
+            entry['via'].append(device_id)
+
+    by_label = {}
+    for entry in merged.values():
+        by_label[entry['label']] = by_label.get(entry['label'], 0) + 1
+    items = sorted(merged.values(), key=lambda e: (e['depth'], e['label'], str(e['name'])))[:limit]
+    unnamed = {device_id for entry in items for device_id in entry['via'][:VIA_DISPLAY_LIMIT]
+               if device_id not in names}
+    if unnamed:
+        names.update(_device_names(unnamed))
+    for entry in items:
+        entry['via_more'] = max(len(entry['via']) - VIA_DISPLAY_LIMIT, 0)
+        entry['via'] = [names.get(device_id, device_id) for device_id in entry['via'][:VIA_DISPLAY_LIMIT]]
+    return {
+        'device_count': len(impacts),
+        'total': len(merged),
+        'by_label': sorted(by_label.items(), key=lambda kv: (-kv[1], kv[0])),
+        'items': items,
+        'truncated': truncated,
+    }
+
+
+def invalidate_impact(node_ids):
+    """
+    Drop cached impact sets for every device whose blast radius includes one of
+    ``node_ids`` (devices themselves included).
+    """
+    node_ids = [node_id for node_id in node_ids if node_id]
+    if not node_ids:
+        return
+    members = cache.get_many([_members_key(node_id) for node_id in node_ids])
+    device_ids = set()
+    for devices in members.values():
+        device_ids.update(devices)
+    device_ids.update(node_ids)  # a changed Device drops its own entry
+    cache.delete_many([_cache_key(device_id) for device_id in device_ids])
@@ -0,0 +1,70 @@
+# feature_packs/itsm_pack/jobs.py
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .counters import reconcile_counters
+from .sla import BUCKET_SECONDS, process_sla_deadlines
+
+
+JOB_CACHE_PREFIX = 'itsm_periodic_job'
+JOB_LOCK_TIMEOUT = 6 * 3600  # outlives any run; only matters if a worker dies mid-run
+
+# name -> (settings override in seconds, default interval, job). An interval of 0 disables the job.
+PERIODIC_JOBS = {
+    'sla_deadlines': ('ITSM_SLA_DEADLINE_INTERVAL', BUCKET_SECONDS, process_sla_deadlines),
+    'counter_reconcile': ('ITSM_COUNTER_RECONCILE_INTERVAL', 86400, reconcile_counters),
+}
+
+
+def job_interval(name):
+    setting, default, _ = PERIODIC_JOBS[name]
+    return int(getattr(settings, setting, default) or 0)
+
+
+def run_job_if_due(name):
+    """
+    Run a periodic job unless it is still running or already started within its
+    interval in any process sharing the cache. Returns the job's result, or None when skipped.
+    """
+    interval = job_interval(name)
+    lock_key = f'{JOB_CACHE_PREFIX}:{name}:lock'
+    if interval <= 0 or not cache.add(lock_key, True, JOB_LOCK_TIMEOUT):
+        return None
+    try:
+        if not cache.add(f'{JOB_CACHE_PREFIX}:{name}:recent', True, interval):
+            return None
+        return PERIODIC_JOBS[name][2]()
+    finally:
+        cache.delete(lock_key)
+
+
+_jobs_thread = None
+
+
+def _run_forever(tick):
+    while True:
+        time.sleep(tick)
+        for name in PERIODIC_JOBS:
+            try:
+                run_job_if_due(name)
+            except Exception as exc:
+                print(f"Error running ITSM job {name}: {exc}")
+
+
+def start_background_jobs():
+    """
+    Run the periodic ITSM jobs from a daemon thread, once per process.
+    Every worker runs one; the cache locks let only one of them run each job per interval.
+    """
+    global _jobs_thread
+    intervals = [job_interval(name) for name in PERIODIC_JOBS]
+    intervals = [interval for interval in intervals if interval > 0]
+    if not intervals or (_jobs_thread is not None and _jobs_thread.is_alive()):
+        return
+    _jobs_thread = threading.Thread(target=_run_forever, args=(min(intervals),),
+                                    name='itsm-periodic-jobs', daemon=True)
+    _jobs_thread.start()
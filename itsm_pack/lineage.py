@@ -0,0 +1,202 @@
+# feature_packs/itsm_pack/lineage.py
+
+from django.core.cache import cache
+from neomodel import db
+
+
+FAMILY_PREFIX = 'itsm_release_family'
+FAMILY_OF_PREFIX = 'itsm_release_family_of'
+CACHE_TIMEOUT = 3600
+MAX_LINEAGE_DEPTH = 1000
+
+
+def _family_key(family_id):
+    return f'{FAMILY_PREFIX}:{family_id}'
+
+
+def _family_of_key(release_id):
+    return f'{FAMILY_OF_PREFIX}:{release_id}'
+
+
+def _fetch_family(release_id):
+    """
+    Every release reachable from ``release_id`` over SUPERSEDES in either
+    direction, with its outgoing SUPERSEDES edges, in one bounded query.
+    """
+    result, _ = db.cypher_query("""
+        MATCH (start:Release) WHERE elementId(start) = $eid
+        CALL apoc.path.subgraphNodes(start, {
+            relationshipFilter: 'SUPERSEDES',
+            labelFilter: '+Release',
+            maxLevel: $max_depth
+        }) YIELD node
+        WITH node AS release, apoc.convert.fromJsonMap(node.custom_properties) AS props
+        OPTIONAL MATCH (release)-[:SUPERSEDES]->(older:Release)
+        RETURN elementId(release), COALESCE(props.name, 'Unnamed'), props.version, props.status,
+               props.deployed_date, collect(elementId(older))
+    """, {'eid': release_id, 'max_depth': MAX_LINEAGE_DEPTH})
+    return result
+
+
+def build_lineage(rows):
+    """
+    Order a release family newest-first. Releases nobody supersedes are the
+    latest; more than one latest release means the family has branched.
+    """
+    releases = {}
+    for release_id, name, version, status, deployed_date, supersedes in rows:
+        releases[release_id] = {
+            'id': release_id,
+            'name': name,
+            'version': version or '',
+            'status': status or '',
+            'deployed_date': deployed_date or '',
+            'supersedes': [older for older in supersedes if older],
+            'superseded_by': [],
+        }
+    for release in releases.values():
+        for older in release['supersedes']:
+            if older in releases:
+                releases[older]['superseded_by'].append(release['id'])
+
+    # Longest distance from a head gives each release its generation
+    generation = {}
+    queue = [r['id'] for r in releases.values() if not r['superseded_by']]
+    for release_id in queue:
+        generation[release_id] = 0
+    pending = {r['id']: len(r['superseded_by']) for r in releases.values()}
+    while queue:
+        release_id = queue.pop()
+        for older in releases[release_id]['supersedes']:
+            if older not in releases:
+                continue
+            generation[older] = max(generation.get(older, 0), generation[release_id] + 1)
+            pending[older] -= 1
+            if pending[older] == 0:
+                queue.append(older)
+
+    cyclic = [release_id for release_id in releases if release_id not in generation or pending[release_id] > 0]
+    for release_id in cyclic:
+        generation.setdefault(release_id, len(releases))
+
+    ordered = sorted(releases.values(), key=lambda r: (generation[r['id']], str(r['version']), r['name']))
+    for release in ordered:
+        release['generation'] = generation[release['id']]
+    latest = [r['id'] for r in ordered if not r['superseded_by']]
+    return {
+        'family_id': min(releases) if releases else None,
+        'releases': ordered,
+        'latest': latest,
+        'branched': len(latest) > 1,
+        'has_cycle': bool(cyclic),
+    }
+
+
+def get_release_lineage(release_id):
+    """
+    Full SUPERSEDES lineage of the family ``release_id`` belongs to, cached per family.
+    """
+    family_id = cache.get(_family_of_key(release_id))
+    if family_id:
+        lineage = cache.get(_family_key(family_id))
+        if lineage is not None:
+            return lineage
+
+    rows = _fetch_family(release_id)
+    if not rows:
+        return None
+    lineage = build_lineage(rows)
+    cache.set(_family_key(lineage['family_id']), lineage, CACHE_TIMEOUT)
+    cache.set_many(
+        {_family_of_key(release['id']): lineage['family_id'] for release in lineage['releases']},
+        CACHE_TIMEOUT,
+    )
+    return lineage
+
+
+def invalidate_release_lineage(release_ids):
+    """
+    Drop the cached lineage of every family containing one of ``release_ids``.
+    """
+    release_ids = [release_id for release_id in release_ids if release_id]
+    if not release_ids:
+        return
+    families = cache.get_many([_family_of_key(release_id) for release_id in release_ids])
+    keys = [_family_key(family_id) for family_id in families.values()]
+    keys += [_family_of_key(release_id) for release_id in release_ids]
+    cache.delete_many(keys)
+
+
+def _distance_to_latest(lineage, release_id):
+    """
+    Walk SUPERSEDES backwards from ``release_id`` through its cached family.
+    Returns (latest releases reachable from it, fewest generations to the nearest one).
+    """
+    releases = {release['id']: release for release in lineage['releases']}
+    distance = {release_id: 0}
+    frontier = [release_id]
+    while frontier:
+        next_frontier = []
+        for current in frontier:
+            for newer in releases[current]['superseded_by']:
+                if newer not in distance:
+                    distance[newer] = distance[current] + 1
+                    next_frontier.append(newer)
+        frontier = next_frontier
+    latest = [releases[r] for r in distance if r != release_id and not releases[r]['superseded_by']]
+    if not latest:
+        return [], None
+    return latest, min(distance[r['id']] for r in latest)
+
+
+def devices_on_superseded_releases(limit=None):
+    """
+    Every device running a release that has been superseded, with the latest
+    release(s) of its family and how many generations behind it is. Each distinct
+    deployed release is resolved once against its cached family lineage, then
+    the devices are joined in one query.
+    """
+    result, _ = db.cypher_query("""
+        MATCH (release:Release)
+        WHERE EXISTS { (:Release)-[:SUPERSEDES]->(release) }
+          AND EXISTS { (release)-[:DEPLOYS_TO]->(:Device) }
+        RETURN elementId(release)
+    """)
+    releases = {}
+    for (release_id,) in result:
+        lineage = get_release_lineage(release_id)
+        if not lineage:
+            continue
+        latest, behind = _distance_to_latest(lineage, release_id)
+        if behind is None:
+            continue  # only reachable through a SUPERSEDES cycle
+        releases[release_id] = {
+            'behind': behind,
+            'latest': [{'id': r['id'], 'name': r['name'], 'version': r['version']} for r in latest],
+        }
+    if not releases:
+        return []
+
+    query = """
+        UNWIND $releases AS entry
+        MATCH (release:Release)-[:DEPLOYS_TO]->(device:Device) WHERE elementId(release) = entry.id
+        WITH entry, device, release,
+             apoc.convert.fromJsonMap(device.custom_properties) AS device_props,
+             apoc.convert.fromJsonMap(release.custom_properties) AS release_props
+        RETURN elementId(device), COALESCE(device_props.name, 'Unnamed'),
+               elementId(release), COALESCE(release_props.name, 'Unnamed'), release_props.version
+        ORDER BY entry.behind DESC, device_props.name
+    """
+    result, _ = db.cypher_query(
+        query + (f" LIMIT {int(limit)}" if limit else ''),
+        {'releases': [{'id': release_id, 'behind': entry['behind']} for release_id, entry in releases.items()]},
+    )
+    return [
+        {
+            'device': {'id': row[0], 'name': row[1]},
+            'release': {'id': row[2], 'name': row[3], 'version': row[4]},
+            'latest': releases[row[2]]['latest'],
+            'generations_behind': releases[row[2]]['behind'],
+        }
+        for row in result
+    ]
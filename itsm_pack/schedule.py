@@ -0,0 +1,395 @@
+# feature_packs/itsm_pack/schedule.py
+
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from neomodel import db
+
+
+INDEX_GENERATION_KEY = 'itsm_change_schedule:generation'
+INDEX_LOG_PREFIX = 'itsm_change_schedule:log'
+INDEX_LOG_TIMEOUT = 86400
+MAX_LOG_REPLAY = 1000
+DEFAULT_CHANGE_DURATION = timedelta(hours=4)
+INACTIVE_CHANGE_STATUSES = ('cancelled',)
+FREEZE_EXEMPT_CHANGE_TYPES = ('emergency',)
+
+_TIME_FORMATS = (
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y/%m/%d %H:%M:%S',
+    '%m/%d/%Y %H:%M',
+)
+_DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y')
+
+_schedule_index = None
+
+
+def parse_change_time(value):
+    """
+    Parse a Change date/datetime property.
+    Returns (aware datetime, is_date_only) or (None, False).
+    """
+    text = str(value or '').strip()
+    if not text:
+        return None, False
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).replace(tzinfo=timezone.utc), True
+        except ValueError:
+            continue
+    parsed = None
+    try:
+        parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        for fmt in _TIME_FORMATS:
+            try:
+                parsed = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+    if parsed is None:
+        return None, False
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed, False
+
+
+def change_window(scheduled_date, completed_date):
+    """
+    The interval a Change occupies, as (start, end) epoch seconds.
+    A date-only schedule covers the whole day; without a completed_date a timed
+    change is assumed to take DEFAULT_CHANGE_DURATION. Returns None if unscheduled.
+    """
+    start, start_is_date = parse_change_time(scheduled_date)
+    if start is None:
+        return None
+    end, end_is_date = parse_change_time(completed_date)
+    if end is None:
+        end = start + (timedelta(days=1) if start_is_date else DEFAULT_CHANGE_DURATION)
+    elif end_is_date:
+        end = end + timedelta(days=1)
+    if end <= start:
+        end = start + DEFAULT_CHANGE_DURATION
+    return start.timestamp(), end.timestamp()
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def freeze_windows():
+    """
+    Change freeze periods from settings.ITSM_CHANGE_FREEZE_WINDOWS:
+    a list of {'name', 'start', 'end'} with ISO dates or datetimes.
+    """
+    windows = []
+    for entry in getattr(settings, 'ITSM_CHANGE_FREEZE_WINDOWS', []) or []:
+        bounds = change_window(entry.get('start'), entry.get('end'))
+        if bounds:
+            windows.append({'name': entry.get('name', 'Change freeze'), 'start': bounds[0], 'end': bounds[1]})
+    return windows
+
+
+def fetch_scheduled_changes(range_start=None, range_end=None, change_ids=None):
+    """
+    Every active Change with a schedule and the devices it IMPACTS, in one query.
+    When a range (epoch seconds) is given only changes intersecting it are returned;
+    ``change_ids`` restricts the query to those changes.
+    """
+    result, _ = db.cypher_query("""
+        MATCH (change:Change)
+        WHERE $ids IS NULL OR elementId(change) IN $ids
+        OPTIONAL MATCH (change)-[:IMPACTS]->(device:Device)
+        WITH change, apoc.convert.fromJsonMap(change.custom_properties) AS props,
+             collect([elementId(device), apoc.convert.fromJsonMap(device.custom_properties).name]) AS devices
+        WHERE props.scheduled_date IS NOT NULL
+          AND NOT toLower(COALESCE(props.status, '')) IN $inactive
+        RETURN elementId(change), COALESCE(props.name, 'Unnamed'), props.status, props.change_type,
+               props.scheduled_date, props.completed_date,
+               [d IN devices WHERE d[0] IS NOT NULL] AS devices
+    """, {
+        'ids': list(change_ids) if change_ids is not None else None,
+        'inactive': list(INACTIVE_CHANGE_STATUSES),
+    })
+    changes = []
+    for change_id, name, status, change_type, scheduled, completed, devices in result:
+        bounds = change_window(scheduled, completed)
+        if not bounds:
+            continue
+        if range_start is not None and (bounds[1] <= range_start or bounds[0] >= range_end):
+            continue
+        changes.append({
+            'id': change_id,
+            'name': name,
+            'status': status,
+            'change_type': str(change_type or '').lower(),
+            'start': bounds[0],
+            'end': bounds[1],
+            'devices': [{'id': d[0], 'name': d[1] or 'Unnamed'} for d in devices],
+        })
+    return changes
+
+
+class ChangeScheduleIndex:
+    """
+    Per-device interval lists of scheduled changes, sorted by start with running
+    maximum ends, so the collisions of one change cost O(d log n) for d devices.
+    """
+
+    def __init__(self, changes):
+        self.changes = {}
+        self._starts = {}
+        self._entries = {}
+        self._max_ends = {}
+        self.apply([], changes)
+
+    @classmethod
+    def load(cls):
+        return cls(fetch_scheduled_changes())
+
+    def _index_device(self, device_id, entries):
+        if not entries:
+            for table in (self._entries, self._starts, self._max_ends):
+                table.pop(device_id, None)
+            return
+        entries.sort()
+        running = float('-inf')
+        max_ends = []
+        for entry in entries:
+            running = max(running, entry[1])
+            max_ends.append(running)
+        self._entries[device_id] = entries
+        self._starts[device_id] = [entry[0] for entry in entries]
+        self._max_ends[device_id] = max_ends
+
+    def apply(self, change_ids, changes):
+        """
+        Replace the entries of ``change_ids`` with ``changes`` (their current state;
+        ids missing from it were deleted or unscheduled). Only the interval lists
+        of devices those changes were or are on are rebuilt.
+        """
+        change_ids = set(change_ids)
+        touched = {}
+
+        def device_entries(device_id):
+            if device_id not in touched:
+                touched[device_id] = [
+                    entry for entry in self._entries.get(device_id, []) if entry[2] not in change_ids
+                ]
+            return touched[device_id]
+
+        for change_id in change_ids:
+            old = self.changes.pop(change_id, None)
+            for device in (old['devices'] if old else []):
+                device_entries(device['id'])
+        for change in changes:
+            self.changes[change['id']] = change
+            for device in change['devices']:
+                device_entries(device['id']).append((change['start'], change['end'], change['id']))
+        for device_id, entries in touched.items():
+            self._index_device(device_id, entries)
+
+    def changes_on_device(self, device_id):
+        return {entry[2] for entry in self._entries.get(device_id, [])}
+
+    def overlapping(self, device_id, start, end):
+        """
+        (start, end, change_id) entries on ``device_id`` intersecting [start, end).
+        """
+        entries = self._entries.get(device_id, [])
+        max_ends = self._max_ends.get(device_id, [])
+        pos = bisect_left(self._starts.get(device_id, []), end) - 1
+        matches = []
+        while pos >= 0 and max_ends[pos] > start:
+            if entries[pos][1] > start:
+                matches.append(entries[pos])
+            pos -= 1
+        return matches
+
+    def conflicts_for(self, change_id):
+        """
+        Collisions and freeze-window hits for one change.
+        """
+        change = self.changes.get(change_id)
+        if not change:
+            return []
+        conflicts = []
+        for device in change['devices']:
+            for start, end, other_id in self.overlapping(device['id'], change['start'], change['end']):
+                if other_id == change_id:
+                    continue
+                other = self.changes[other_id]
+                conflicts.append({
+                    'type': 'collision',
+                    'change': {'id': other_id, 'name': other['name'], 'status': other['status']},
+                    'device': device,
+                    'overlap_start': _iso(max(start, change['start'])),
+                    'overlap_end': _iso(min(end, change['end'])),
+                })
+        conflicts.extend(_freeze_conflicts(change))
+        return conflicts
+
+
+def _freeze_conflicts(change, windows=None):
+    if change['change_type'] in FREEZE_EXEMPT_CHANGE_TYPES:
+        return []
+    return [
+        {
+            'type': 'freeze',
+            'freeze': window['name'],
+            'overlap_start': _iso(max(window['start'], change['start'])),
+            'overlap_end': _iso(min(window['end'], change['end'])),
+        }
+        for window in (freeze_windows() if windows is None else windows)
+        if window['start'] < change['end'] and change['start'] < window['end']
+    ]
+
+
+def _replay(generation, index, target):
+    """
+    Bring ``index`` from ``generation`` to ``target`` by re-reading only the changes
+    logged in between. Returns None when the log has a gap and a full load is needed.
+    """
+    if target < generation or target - generation > MAX_LOG_REPLAY:
+        return None
+    keys = [f'{INDEX_LOG_PREFIX}:{g}' for g in range(generation + 1, target + 1)]
+    logged = cache.get_many(keys)
+    if len(logged) != len(keys):
+        return None
+    change_ids = set()
+    for kind, element_id in logged.values():
+        if kind == 'device':
+            change_ids |= index.changes_on_device(element_id)
+        else:
+            change_ids.add(element_id)
+    if change_ids:
+        index.apply(change_ids, fetch_scheduled_changes(change_ids=change_ids))
+    return target, index
+
+
+def get_schedule_index():
+    """
+    Process-wide schedule index. Edits logged by any worker are replayed into it
+    incrementally; it is only reloaded in full when the log cannot be replayed.
+    """
+    global _schedule_index
+    generation = cache.get(INDEX_GENERATION_KEY) or 0
+    if _schedule_index is not None and _schedule_index[0] != generation:
+        _schedule_index = _replay(*_schedule_index, generation)
+    if _schedule_index is None:
+        _schedule_index = (generation, ChangeScheduleIndex.load())
+    return _schedule_index[1]
+
+
+def record_schedule_edit(kind, element_id):
+    """
+    Log that a Change (``kind='change'``) or a Device it may impact (``kind='device'``)
+    was edited, so every worker re-reads just the affected changes.
+    """
+    try:
+        generation = cache.incr(INDEX_GENERATION_KEY)
+    except ValueError:
+        generation = 1
+        cache.set(INDEX_GENERATION_KEY, generation, None)
+    cache.set(f'{INDEX_LOG_PREFIX}:{generation}', (kind, element_id), INDEX_LOG_TIMEOUT)
+
+
+def schedule_peers(change_id):
+    """
+    Changes currently colliding with ``change_id`` according to the index.
+    """
+    return {c['change']['id'] for c in get_schedule_index().conflicts_for(change_id) if 'change' in c}
+
+
+def flag_change_conflicts(change_id):
+    """
+    Recompute the native ``schedule_conflict_count`` flag on a change and on every
+    change it collided with before or collides with now.
+    """
+    previous, _ = db.cypher_query("""
+        MATCH (change:Change) WHERE elementId(change) = $eid
+        RETURN change.schedule_conflict_ids
+    """, {'eid': change_id})
+    peers = set(previous[0][0] or []) if previous else set()
+
+    index = get_schedule_index()
+    rows = []
+    for target in {change_id} | peers | {c['change']['id'] for c in index.conflicts_for(change_id) if 'change' in c}:
+        conflicts = index.conflicts_for(target)
+        rows.append({
+            'id': target,
+            'count': len(conflicts),
+            'peers': sorted({c['change']['id'] for c in conflicts if 'change' in c}),
+        })
+    db.cypher_query("""
+        UNWIND $rows AS row
+        MATCH (change:Change) WHERE elementId(change) = row.id
+        SET change.schedule_conflict_count = row.count,
+            change.schedule_conflict_ids = row.peers
+    """, {'rows': rows})
+    return next((row['count'] for row in rows if row['id'] == change_id), 0)
+
+
+def conflict_calendar(range_start, range_end):
+    """
+    All scheduled changes in [range_start, range_end) (epoch seconds) and every
+    collision between them, found in one sweep per device.
+    """
+    changes = fetch_scheduled_changes(range_start, range_end)
+    by_id = {change['id']: change for change in changes}
+    windows = freeze_windows()
+
+    per_device = {}
+    names = {}
+    for change in changes:
+        for device in change['devices']:
+            per_device.setdefault(device['id'], []).append(change)
+            names[device['id']] = device['name']
+
+    collisions = []
+    for device_id, device_changes in per_device.items():
+        device_changes.sort(key=lambda c: (c['start'], c['end']))
+        open_changes = []
+        for change in device_changes:
+            open_changes = [c for c in open_changes if c['end'] > change['start']]
+            for other in open_changes:
+                collisions.append({
+                    'device': {'id': device_id, 'name': names[device_id]},
+                    'changes': [
+                        {'id': other['id'], 'name': other['name']},
+                        {'id': change['id'], 'name': change['name']},
+                    ],
+                    'overlap_start': _iso(change['start']),
+                    'overlap_end': _iso(min(other['end'], change['end'])),
+                })
+            open_changes.append(change)
+
+    freezes = []
+    for change in changes:
+        for hit in _freeze_conflicts(change, windows):
+            freezes.append(dict(hit, change={'id': change['id'], 'name': change['name']}))
+
+    return {
+        'range_start': _iso(range_start),
+        'range_end': _iso(range_end),
+        'changes': [
+            {
+                'id': change['id'],
+                'name': change['name'],
+                'status': change['status'],
+                'start': _iso(change['start']),
+                'end': _iso(change['end']),
+                'devices': [device['name'] for device in change['devices']],
+            }
+            for change in sorted(by_id.values(), key=lambda c: c['start'])
+        ],
+        'collisions': collisions,
+        'freeze_conflicts': freezes,
+        'freeze_windows': [
+            {'name': w['name'], 'start': _iso(w['start']), 'end': _iso(w['end'])}
+            for w in windows if w['start'] < range_end and range_start < w['end']
+        ],
+    }
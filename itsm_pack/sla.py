@@ -0,0 +1,281 @@
+# feature_packs/itsm_pack/sla.py
+
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from neomodel import db
+
+from .schedule import parse_change_time
+
+
+BUCKET_SECONDS = 300  # deadline index granularity; the periodic job runs at least this often
+POLICY_VERSION_CACHE_KEY = 'itsm_sla_policy_version'
+DEFAULT_PRIORITY = 'medium'
+WRITE_BATCH_SIZE = 5000
+
+# Response and resolution targets in minutes, per label and priority.
+# Overridden (per priority) by settings.ITSM_SLA_POLICIES.
+DEFAULT_SLA_POLICIES = {
+    'Issue': {
+        'critical': {'response': 15, 'resolution': 4 * 60},
+        'high': {'response': 60, 'resolution': 8 * 60},
+        'medium': {'response': 4 * 60, 'resolution': 3 * 24 * 60},
+        'low': {'response': 8 * 60, 'resolution': 7 * 24 * 60},
+    },
+    'Change': {
+        'critical': {'response': 60, 'resolution': 24 * 60},
+        'high': {'response': 4 * 60, 'resolution': 3 * 24 * 60},
+        'medium': {'response': 24 * 60, 'resolution': 7 * 24 * 60},
+        'low': {'response': 2 * 24 * 60, 'resolution': 14 * 24 * 60},
+    },
+}
+
+# How each label's status maps onto the SLA clock
+SLA_LABELS = {
+    'Issue': {
+        'unresponded_statuses': ('open',),
+        'resolved_statuses': ('resolved', 'closed'),
+        'resolved_field': 'resolved_date',
+    },
+    'Change': {
+        'unresponded_statuses': ('draft', 'submitted'),
+        'resolved_statuses': ('completed', 'cancelled'),
+        'resolved_field': 'completed_date',
+    },
+}
+
+
+def get_sla_policies():
+    policies = {}
+    overrides = getattr(settings, 'ITSM_SLA_POLICIES', {}) or {}
+    for label, defaults in DEFAULT_SLA_POLICIES.items():
+        policies[label] = {priority: dict(targets) for priority, targets in defaults.items()}
+        for priority, targets in (overrides.get(label) or {}).items():
+            policies[label].setdefault(priority.lower(), {}).update(targets)
+    return policies
+
+
+def policy_version(policies=None):
+    payload = json.dumps(policies or get_sla_policies(), sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def ensure_sla_keys():
+    for label in SLA_LABELS:
+        db.cypher_query(
+            f"CREATE INDEX itsm_{label.lower()}_sla_bucket IF NOT EXISTS FOR (n:`{label}`) ON (n.sla_deadline_bucket)"
+        )
+        db.cypher_query(
+            f"CREATE INDEX itsm_{label.lower()}_sla_state IF NOT EXISTS FOR (n:`{label}`) ON (n.sla_state)"
+        )
+
+
+def _timestamp(value):
+    parsed, _ = parse_change_time(value)
+    return parsed.timestamp() if parsed else None
+
+
+def _status(value):
+    return str(value or '').strip().lower()
+
+
+def _fetch_sla_rows(label, where, params):
+    result, _ = db.cypher_query(f"""
+        MATCH (n:`{label}`) WHERE {where}
+        WITH n, apoc.convert.fromJsonMap(n.custom_properties) AS props
+        RETURN elementId(n), props.priority, props.status, props.created_date, props[$resolved_field],
+               n.sla_started_at, n.sla_responded_at, n.sla_resolved_at, n.sla_state
+    """, dict(params, resolved_field=SLA_LABELS[label]['resolved_field']))
+    return result
+
+
+def evaluate_sla(label, rows, now, policies=None):
+    """
+    Evaluate SLA deadlines for a batch of rows from _fetch_sla_rows.
+    Works column by column so a policy change recomputes thousands of items in one pass.
+    Returns one dict of native SLA properties per row (with its ``id`` and previous state).
+    """
+    if not rows:
+        return []
+    policies = policies or get_sla_policies()
+    version = policy_version(policies)
+    policies = policies[label]
+    spec = SLA_LABELS[label]
+    fallback = policies.get(DEFAULT_PRIORITY) or next(iter(policies.values()))
+
+    ids, priorities, statuses, created, resolved_dates, started, responded, resolved, states = zip(*rows)
+    statuses = [_status(status) for status in statuses]
+    targets = [policies.get(_status(priority)) or fallback for priority in priorities]
+    start = [_timestamp(c) or s or now for s, c in zip(started, created)]
+    is_resolved = [status in spec['resolved_statuses'] for status in statuses]
+    resolved_at = [
+        (r or _timestamp(d) or now) if done else None
+        for r, d, done in zip(resolved, resolved_dates, is_resolved)
+    ]
+    # A ticket resolved straight from its initial status counts as responded when resolved
+    responded_at = [
+        r or (res if res is not None else (now if status and status not in spec['unresponded_statuses'] else None))
+        for r, res, status in zip(responded, resolved_at, statuses)
+    ]
+    response_due = [s + t['response'] * 60 for s, t in zip(start, targets)]
+    resolution_due = [s + t['resolution'] * 60 for s, t in zip(start, targets)]
+    response_breached = [(r if r is not None else now) > due for r, due in zip(responded_at, response_due)]
+    resolution_breached = [(r if r is not None else now) > due for r, due in zip(resolved_at, resolution_due)]
+
+    evaluated = []
+    for i, item_id in enumerate(ids):
+        pending = [
+            due for due, done in ((response_due[i], responded_at[i]), (resolution_due[i], resolved_at[i]))
+            if done is None and due > now
+        ]
+        next_deadline = min(pending) if pending else None
+        if response_breached[i] or resolution_breached[i]:
+            state = 'breached'
+        elif resolved_at[i] is not None:
+            state = 'met'
+        else:
+            state = 'on_track'
+        evaluated.append({
+            'id': item_id,
+            'previous_state': states[i],
+            'props': {
+                'sla_started_at': start[i],
+                'sla_responded_at': responded_at[i],
+                'sla_resolved_at': resolved_at[i],
+                'sla_response_due': response_due[i],
+                'sla_resolution_due': resolution_due[i],
+                'sla_response_breached': response_breached[i],
+                'sla_resolution_breached': resolution_breached[i],
+                'sla_state': state,
+                'sla_next_deadline': next_deadline,
+                'sla_deadline_bucket': int(next_deadline // BUCKET_SECONDS) if next_deadline else None,
+                'sla_policy_version': version,
+            },
+        })
+    return evaluated
+
+
+def _write_sla(label, evaluated):
+    for start in range(0, len(evaluated), WRITE_BATCH_SIZE):
+        db.cypher_query(f"""
+            UNWIND $rows AS row
+            MATCH (n:`{label}`) WHERE elementId(n) = row.id
+            SET n += row.props
+        """, {'rows': [{'id': e['id'], 'props': e['props']} for e in evaluated[start:start + WRITE_BATCH_SIZE]]})
+
+
+def _newly_breached(evaluated):
+    return [e['id'] for e in evaluated if e['props']['sla_state'] == 'breached' and e['previous_state'] != 'breached']
+
+
+def refresh_sla(label, node_ids, now=None):
+    """
+    Re-evaluate the SLA of specific items, e.g. after an edit.
+    """
+    if label not in SLA_LABELS or not node_ids:
+        return []
+    now = now or datetime.now(timezone.utc).timestamp()
+    evaluated = evaluate_sla(label, _fetch_sla_rows(label, "elementId(n) IN $ids", {'ids': list(node_ids)}), now)
+    _write_sla(label, evaluated)
+    return _newly_breached(evaluated)
+
+
+def recompute_sla(force=False, now=None):
+    """
+    Bulk re-evaluation after a policy change: every item whose SLA was computed
+    under another policy version (or every item with ``force``).
+    Returns {label: items recomputed}.
+    """
+    ensure_sla_keys()
+    now = now or datetime.now(timezone.utc).timestamp()
+    version = policy_version()
+    policies = get_sla_policies()
+    counts = {}
+    for label in SLA_LABELS:
+        rows = _fetch_sla_rows(
+            label,
+            "$force OR n.sla_policy_version IS NULL OR n.sla_policy_version <> $version",
+            {'force': force, 'version': version},
+        )
+        evaluated = evaluate_sla(label, rows, now, policies)
+        _write_sla(label, evaluated)
+        counts[label] = len(evaluated)
+    cache.set(POLICY_VERSION_CACHE_KEY, version, None)
+    return counts
+
+
+def process_sla_deadlines(now=None):
+    """
+    Periodic job: re-evaluate only items whose next deadline bucket has been reached,
+    found through the bucket index. Recomputes everything first if the policies changed.
+    Returns per-label counts of items checked and the elementIds newly breached.
+    """
+    now = now or datetime.now(timezone.utc).timestamp()
+    stats = {'recomputed': None, 'checked': {}, 'breached': {}}
+    if cache.get(POLICY_VERSION_CACHE_KEY) != policy_version():
+        stats['recomputed'] = recompute_sla(now=now)
+
+    bucket = int(now // BUCKET_SECONDS)
+    for label in SLA_LABELS:
+        rows = _fetch_sla_rows(label, "n.sla_deadline_bucket <= $bucket", {'bucket': bucket})
+        evaluated = evaluate_sla(label, rows, now)
+        _write_sla(label, evaluated)
+        stats['checked'][label] = len(evaluated)
+        stats['breached'][label] = _newly_breached(evaluated)
+    return stats
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+
+def sla_summary(node):
+    """
+    Display form of the native SLA properties stored on ``node``; None before first evaluation.
+    """
+    state = node.get('sla_state')
+    if not state:
+        return None
+    return {
+        'state': state,
+        'response_due': _iso(node.get('sla_response_due')),
+        'resolution_due': _iso(node.get('sla_resolution_due')),
+        'responded_at': _iso(node.get('sla_responded_at')),
+        'resolved_at': _iso(node.get('sla_resolved_at')),
+        'response_breached': bool(node.get('sla_response_breached')),
+        'resolution_breached': bool(node.get('sla_resolution_breached')),
+        'next_deadline': _iso(node.get('sla_next_deadline')),
+    }
+
+
+def list_sla_breaches(label, limit=100):
+    """
+    Unresolved items currently in breach, most overdue first.
+    """
+    if label not in SLA_LABELS:
+        return []
+    result, _ = db.cypher_query(f"""
+        MATCH (n:`{label}`) WHERE n.sla_state = 'breached' AND n.sla_resolved_at IS NULL
+        WITH n, apoc.convert.fromJsonMap(n.custom_properties) AS props
+        RETURN elementId(n), COALESCE(props.name, 'Unnamed'), props.priority, props.status,
+               n.sla_response_breached, n.sla_resolution_breached,
+               n.sla_response_due, n.sla_resolution_due
+        ORDER BY CASE WHEN n.sla_resolution_breached THEN n.sla_resolution_due ELSE n.sla_response_due END
+        LIMIT $limit
+    """, {'limit': limit})
+    return [
+        {
+            'id': row[0],
+            'name': row[1],
+            'priority': row[2],
+            'status': row[3],
+            'response_breached': bool(row[4]),
+            'resolution_breached': bool(row[5]),
+            'response_due': _iso(row[6]),
+            'resolution_due': _iso(row[7]),
+        }
+        for row in result
+    ]
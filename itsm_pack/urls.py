@@ -0,0 +1,20 @@
+from django.urls import path
+from . import views
+
+app_name = 'itsm_pack'
+
+urlpatterns = [
+    path('itsm/changes/conflicts/', views.itsm_change_conflicts, name='itsm_change_conflicts'),
+    path('itsm/dashboard/counters/', views.itsm_dashboard_counters, name='itsm_dashboard_counters'),
+    path('itsm/dashboard/counters/reconcile/', views.itsm_dashboard_counters_reconcile,
+         name='itsm_dashboard_counters_reconcile'),
+    path('itsm/problems/clusters/', views.itsm_problem_clusters, name='itsm_problem_clusters'),
+    path('itsm/problems/clusters/recompute/', views.itsm_problem_clusters_recompute,
+         name='itsm_problem_clusters_recompute'),
+    path('itsm/releases/outdated-devices/', views.itsm_outdated_devices, name='itsm_outdated_devices'),
+    path('itsm/releases/<str:element_id>/lineage/', views.itsm_release_lineage, name='itsm_release_lineage'),
+    path('itsm/sla/breaches/', views.itsm_sla_breaches, name='itsm_sla_breaches'),
+    path('itsm/sla/run/', views.itsm_sla_run, name='itsm_sla_run'),
+    path('itsm/sla/recompute/', views.itsm_sla_recompute, name='itsm_sla_recompute'),
+    path('itsm/events/ingest/', views.itsm_event_ingest, name='itsm_event_ingest'),
+]
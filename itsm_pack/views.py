@@ -1,14 +1,124 @@
 # feature_packs/itsm_pack/views.py
 
+import json
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_http_methods
 from neomodel import db
 from cmdb.models import DynamicNode
+from .clusters import compute_problem_clusters, list_problem_clusters
+from .events import ingest_events, iter_ndjson
+from .counters import get_dashboard_counters, reconcile_counters
+from .impact import summarize_impact
+from .lineage import devices_on_superseded_releases, get_release_lineage
+from .schedule import conflict_calendar, get_schedule_index, parse_change_time
+from .sla import SLA_LABELS, list_sla_breaches, process_sla_deadlines, recompute_sla, sla_summary
+
+
+# Most related records each tab collection lists; totals are always exact
+TAB_COLLECTION_LIMIT = 50
+
+# (custom_data key, pattern from the tab node `n` to each item `x`, extra item properties)
+ISSUE_TAB_COLLECTIONS = (
+    ('problems', '(n)-[:CAUSED_BY]->(x:Problem)', ('status', 'priority')),
+    ('changes', '(n)-[:RESOLVED_BY]->(x:Change)', ('status', 'change_type')),
+    ('events', '(n)-[:TRIGGERED_BY|TRIGGERS]-(x:Event)', ('severity', 'timestamp')),
+    ('impacted_devices', '(n)-[:IMPACTS]->(x:Device)', ()),
+)
+PROBLEM_TAB_COLLECTIONS = (
+    ('issues', '(n)-[:CAUSES]->(x:Issue)', ('status', 'priority')),
+    ('changes', '(n)-[:RESOLVED_BY]->(x:Change)', ('status', 'change_type')),
+    ('related_problems', '(n)-[:RELATED_TO]->(x:Problem)', ('status',)),
+    ('affected_devices', '(n)-[:AFFECTS]->(x:Device)', ()),
+    ('cluster_members', '(x:Problem {problem_cluster_id: n.problem_cluster_id}) WHERE x <> n',
+     ('status', 'priority')),
+    ('similar_problems', '(x:Problem {problem_similarity_id: n.problem_similarity_id}) WHERE x <> n',
+     ('status', 'priority')),
+)
+CHANGE_TAB_COLLECTIONS = (
+    ('issues', '(n)-[:RESOLVES]->(x:Issue)', ('status', 'priority')),
+    ('problems', '(n)-[:FIXES]->(x:Problem)', ('status', 'priority')),
+    ('releases', '(n)-[:PART_OF]->(x:Release)', ('version', 'status')),
+    ('impacted_devices', '(n)-[:IMPACTS]->(x:Device)', ()),
+)
+RELEASE_TAB_COLLECTIONS = (
+    ('changes', '(n)-[:CONTAINS]->(x:Change)', ('status', 'change_type')),
+    ('deployed_devices', '(n)-[:DEPLOYS_TO]->(x:Device)', ()),
+    ('supersedes', '(n)-[:SUPERSEDES]->(x:Release)', ('version',)),
+    ('superseded_by', '(x:Release)-[:SUPERSEDES]->(n)', ('version',)),
+)
+EVENT_TAB_COLLECTIONS = (
+    ('triggered_issues', '(n)-[:TRIGGERS]->(x:Issue)', ('status', 'priority')),
+    ('related_events', '(n)-[:RELATED_TO]->(x:Event)', ('severity', 'timestamp')),
+    ('source_devices', '(n)-[:ORIGINATED_FROM]->(x:Device)', ()),
+)
+
+
+def _fetch_tab_data(label, element_id, collections, limit=TAB_COLLECTION_LIMIT):
+    """
+    Fetch a node and every related collection of its tab in one query.
+    Each collection lists at most ``limit`` items, in elementId order so the same
+    ones show on every load, alongside its total count.
+    Returns (raw node, {key: items}, {key: total}) or None if the node is missing.
+    """
+    subqueries = []
+    returns = ['n']
+    for key, pattern, fields in collections:
+        projection = ''.join(f", {field}: COALESCE(props.{field}, 'Unknown')" for field in fields)
+        subqueries.append(f"""
+            CALL {{
+                WITH n
+                MATCH {pattern}
+                WITH x ORDER BY elementId(x) LIMIT $limit
+                WITH x, apoc.convert.fromJsonMap(x.custom_properties) AS props
+                RETURN collect({{id: elementId(x), label: labels(x)[0],
+                                 name: COALESCE(props.name, 'Unnamed'){projection}}}) AS {key}
+            }}""")
+        returns += [key, f"COUNT {{ MATCH {pattern} }} AS {key}_total"]
+
+    query = f"""
+        MATCH (n:`{label}`)
+        WHERE elementId(n) = $eid
+        {''.join(subqueries)}
+        RETURN {', '.join(returns)}
+    """
+    result, _ = db.cypher_query(query, {'eid': element_id, 'limit': limit})
+    if not result:
+        return None
+
+    row = result[0]
+    items = {}
+    totals = {}
+    for position, (key, _, _) in enumerate(collections):
+        items[key] = row[1 + 2 * position]
+        totals[key] = row[2 + 2 * position]
+    return row[0], items, totals
+
+
+def _impact_of_all_devices(label, element_id, listed, total):
+    """
+    Blast radius of every impacted device of a tab node, not only the ``listed`` ones:
+    when the list was cut, the remaining device ids are fetched without their properties.
+    """
+    if total <= len(listed):
+        return summarize_impact(listed)
+    result, _ = db.cypher_query(f"""
+        MATCH (n:`{label}`)-[:IMPACTS]->(x:Device)
+        WHERE elementId(n) = $eid
+        RETURN DISTINCT elementId(x)
+    """, {'eid': element_id})
+    listed_ids = {device['id'] for device in listed}
+    devices = list(listed) + [{'id': row[0]} for row in result if row[0] not in listed_ids]
+    return summarize_impact(devices)
 
 
 def issue_details_tab(request, label, element_id):
     """
     Custom view for Issue Details tab.
-    Shows related problems, changes, events, and impacted devices.
+    Shows SLA status, related problems, changes, events, impacted devices and their blast radius.
     """
     context = {
         'label': label,
@@ -18,110 +128,31 @@ def issue_details_tab(request, label, element_id):
             'problems': [],
             'changes': [],
             'events': [],
-            'impacted_devices': []
+            'impacted_devices': [],
+            'impact': None,
+            'sla': None,
+            'totals': {}
         },
         'error': None,
     }
 
     try:
         node_class = DynamicNode.get_or_create_label(label)
-        query = f"""
-            MATCH (n:`{label}`)
-            WHERE elementId(n) = $eid
-            RETURN n
-        """
-        result, _ = db.cypher_query(query, {'eid': element_id})
+        result = _fetch_tab_data(label, element_id, ISSUE_TAB_COLLECTIONS)
         if not result:
             context['error'] = f"Issue node not found: {element_id}"
             return context
 
-        raw_node = result[0][0]
-        node = node_class.inflate(raw_node)
-        context['node'] = node
-
-        # Fetch related problems (CAUSED_BY relationship)
-        problems_query = """
-            MATCH (issue:Issue) WHERE elementId(issue) = $eid
-            MATCH (issue)-[:CAUSED_BY]->(problem:Problem)
-            WITH problem, apoc.convert.fromJsonMap(problem.custom_properties) AS props
-            RETURN 
-                elementId(problem) AS id,
-                labels(problem)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.status, 'Unknown') AS status,
-                COALESCE(props.priority, 'Unknown') AS priority
-        """
-        problems_result, _ = db.cypher_query(problems_query, {'eid': element_id})
-        for row in problems_result:
-            context['custom_data']['problems'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'status': row[3],
-                'priority': row[4]
-            })
-
-        # Fetch related changes (RESOLVED_BY relationship)
-        changes_query = """
-            MATCH (issue:Issue) WHERE elementId(issue) = $eid
-            MATCH (issue)-[:RESOLVED_BY]->(change:Change)
-            WITH change, apoc.convert.fromJsonMap(change.custom_properties) AS props
-            RETURN 
-                elementId(change) AS id,
-                labels(change)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.status, 'Unknown') AS status,
-                COALESCE(props.change_type, 'Unknown') AS change_type
-        """
-        changes_result, _ = db.cypher_query(changes_query, {'eid': element_id})
-        for row in changes_result:
-            context['custom_data']['changes'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'status': row[3],
-                'change_type': row[4]
-            })
-
-        # Fetch related events (TRIGGERED_BY relationship)
-        events_query = """
-            MATCH (issue:Issue) WHERE elementId(issue) = $eid
-            MATCH (issue)-[:TRIGGERED_BY]->(event:Event)
-            WITH event, apoc.convert.fromJsonMap(event.custom_properties) AS props
-            RETURN 
-                elementId(event) AS id,
-                labels(event)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.severity, 'Unknown') AS severity,
-                COALESCE(props.timestamp, 'Unknown') AS timestamp
-        """
-        events_result, _ = db.cypher_query(events_query, {'eid': element_id})
-        for row in events_result:
-            context['custom_data']['events'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'severity': row[3],
-                'timestamp': row[4]
-            })
-
-        # Fetch impacted devices (IMPACTS relationship)
-        devices_query = """
-            MATCH (issue:Issue) WHERE elementId(issue) = $eid
-            MATCH (issue)-[:IMPACTS]->(device:Device)
-            WITH device, apoc.convert.fromJsonMap(device.custom_properties) AS props
-            RETURN 
-                elementId(device) AS id,
-                labels(device)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name
-        """
-        devices_result, _ = db.cypher_query(devices_query, {'eid': element_id})
-        for row in devices_result:
-            context['custom_data']['impacted_devices'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2]
-            })
+        raw_node, collections, totals = result
+        context['node'] = node_class.inflate(raw_node)
+        context['custom_data'].update(collections)
+        context['custom_data']['totals'] = totals
+        context['custom_data']['sla'] = sla_summary(raw_node)
+
+        # Blast radius of all impacted devices, beyond the listed ones (cached per device)
+        if context['custom_data']['impacted_devices']:
+            context['custom_data']['impact'] = _impact_of_all_devices(
+                label, element_id, context['custom_data']['impacted_devices'], totals['impacted_devices'])
 
     except Exception as e:
         context['error'] = str(e)
@@ -132,7 +163,8 @@ def issue_details_tab(request, label, element_id):
 def problem_details_tab(request, label, element_id):
     """
     Custom view for Problem Details tab.
-    Shows related issues, changes, root causes, and affected devices.
+    Shows related issues, changes, root causes, affected devices, the problem's cluster
+    and the problems affecting a similar set of devices.
     """
     context = {
         'label': label,
@@ -142,108 +174,39 @@ def problem_details_tab(request, label, element_id):
             'issues': [],
             'changes': [],
             'related_problems': [],
-            'affected_devices': []
+            'affected_devices': [],
+            'cluster': None,
+            'similar': None,
+            'totals': {}
         },
         'error': None,
     }
 
     try:
         node_class = DynamicNode.get_or_create_label(label)
-        query = f"""
-            MATCH (n:`{label}`)
-            WHERE elementId(n) = $eid
-            RETURN n
-        """
-        result, _ = db.cypher_query(query, {'eid': element_id})
+        result = _fetch_tab_data(label, element_id, PROBLEM_TAB_COLLECTIONS)
         if not result:
             context['error'] = f"Problem node not found: {element_id}"
             return context
 
-        raw_node = result[0][0]
-        node = node_class.inflate(raw_node)
-        context['node'] = node
-
-        # Fetch related issues (CAUSES relationship)
-        issues_query = """
-            MATCH (problem:Problem) WHERE elementId(problem) = $eid
-            MATCH (problem)-[:CAUSES]->(issue:Issue)
-            WITH issue, apoc.convert.fromJsonMap(issue.custom_properties) AS props
-            RETURN 
-                elementId(issue) AS id,
-                labels(issue)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.status, 'Unknown') AS status,
-                COALESCE(props.priority, 'Unknown') AS priority
-        """
-        issues_result, _ = db.cypher_query(issues_query, {'eid': element_id})
-        for row in issues_result:
-            context['custom_data']['issues'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'status': row[3],
-                'priority': row[4]
-            })
-
-        # Fetch related changes (RESOLVED_BY relationship)
-        changes_query = """
-            MATCH (problem:Problem) WHERE elementId(problem) = $eid
-            MATCH (problem)-[:RESOLVED_BY]->(change:Change)
-            WITH change, apoc.convert.fromJsonMap(change.custom_properties) AS props
-            RETURN 
-                elementId(change) AS id,
-                labels(change)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.status, 'Unknown') AS status,
-                COALESCE(props.change_type, 'Unknown') AS change_type
-        """
-        changes_result, _ = db.cypher_query(changes_query, {'eid': element_id})
-        for row in changes_result:
-            context['custom_data']['changes'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'status': row[3],
-                'change_type': row[4]
-            })
-
-        # Fetch related problems (RELATED_TO relationship)
-        related_problems_query = """
-            MATCH (problem:Problem) WHERE elementId(problem) = $eid
-            MATCH (problem)-[:RELATED_TO]->(related:Problem)
-            WITH related, apoc.convert.fromJsonMap(related.custom_properties) AS props
-            RETURN 
-                elementId(related) AS id,
-                labels(related)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.status, 'Unknown') AS status
-        """
-        related_result, _ = db.cypher_query(related_problems_query, {'eid': element_id})
-        for row in related_result:
-            context['custom_data']['related_problems'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'status': row[3]
-            })
-
-        # Fetch affected devices (AFFECTS relationship)
-        devices_query = """
-            MATCH (problem:Problem) WHERE elementId(problem) = $eid
-            MATCH (problem)-[:AFFECTS]->(device:Device)
-            WITH device, apoc.convert.fromJsonMap(device.custom_properties) AS props
-            RETURN 
-                elementId(device) AS id,
-                labels(device)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name
-        """
-        devices_result, _ = db.cypher_query(devices_query, {'eid': element_id})
-        for row in devices_result:
-            context['custom_data']['affected_devices'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2]
-            })
+        raw_node, collections, totals = result
+        context['node'] = node_class.inflate(raw_node)
+        members = collections.pop('cluster_members')
+        similar = collections.pop('similar_problems')
+        context['custom_data'].update(collections)
+        context['custom_data']['totals'] = totals
+
+        if raw_node.get('problem_cluster_id') is not None:
+            context['custom_data']['cluster'] = {
+                'id': raw_node.get('problem_cluster_id'),
+                'size': totals['cluster_members'] + 1,
+                'members': members,
+            }
+        if raw_node.get('problem_similarity_id') is not None:
+            context['custom_data']['similar'] = {
+                'size': totals['similar_problems'] + 1,
+                'members': similar,
+            }
 
     except Exception as e:
         context['error'] = str(e)
@@ -254,7 +217,8 @@ def problem_details_tab(request, label, element_id):
 def change_details_tab(request, label, element_id):
     """
     Custom view for Change Details tab.
-    Shows related issues, problems, releases, and impacted devices.
+    Shows SLA status, schedule conflicts, related issues, problems, releases,
+    impacted devices and their blast radius.
     """
     context = {
         'label': label,
@@ -264,110 +228,35 @@ def change_details_tab(request, label, element_id):
             'issues': [],
             'problems': [],
             'releases': [],
-            'impacted_devices': []
+            'impacted_devices': [],
+            'impact': None,
+            'schedule_conflicts': [],
+            'sla': None,
+            'totals': {}
         },
         'error': None,
     }
 
     try:
         node_class = DynamicNode.get_or_create_label(label)
-        query = f"""
-            MATCH (n:`{label}`)
-            WHERE elementId(n) = $eid
-            RETURN n
-        """
-        result, _ = db.cypher_query(query, {'eid': element_id})
+        result = _fetch_tab_data(label, element_id, CHANGE_TAB_COLLECTIONS)
         if not result:
             context['error'] = f"Change node not found: {element_id}"
             return context
 
-        raw_node = result[0][0]
-        node = node_class.inflate(raw_node)
-        context['node'] = node
-
-        # Fetch related issues (RESOLVES relationship)
-        issues_query = """
-            MATCH (change:Change) WHERE elementId(change) = $eid
-            MATCH (change)-[:RESOLVES]->(issue:Issue)
-            WITH issue, apoc.convert.fromJsonMap(issue.custom_properties) AS props
-            RETURN 
-                elementId(issue) AS id,
-                labels(issue)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.status, 'Unknown') AS status,
-                COALESCE(props.priority, 'Unknown') AS priority
-        """
-        issues_result, _ = db.cypher_query(issues_query, {'eid': element_id})
-        for row in issues_result:
-            context['custom_data']['issues'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'status': row[3],
-                'priority': row[4]
-            })
-
-        # Fetch related problems (FIXES relationship)
-        problems_query = """
-            MATCH (change:Change) WHERE elementId(change) = $eid
-            MATCH (change)-[:FIXES]->(problem:Problem)
-            WITH problem, apoc.convert.fromJsonMap(problem.custom_properties) AS props
-            RETURN 
-                elementId(problem) AS id,
-                labels(problem)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.status, 'Unknown') AS status,
-                COALESCE(props.priority, 'Unknown') AS priority
-        """
-        problems_result, _ = db.cypher_query(problems_query, {'eid': element_id})
-        for row in problems_result:
-            context['custom_data']['problems'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'status': row[3],
-                'priority': row[4]
-            })
-
-        # Fetch related releases (PART_OF relationship)
-        releases_query = """
-            MATCH (change:Change) WHERE elementId(change) = $eid
-            MATCH (change)-[:PART_OF]->(release:Release)
-            WITH release, apoc.convert.fromJsonMap(release.custom_properties) AS props
-            RETURN 
-                elementId(release) AS id,
-                labels(release)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.version, 'Unknown') AS version,
-                COALESCE(props.status, 'Unknown') AS status
-        """
-        releases_result, _ = db.cypher_query(releases_query, {'eid': element_id})
-        for row in releases_result:
-            context['custom_data']['releases'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'version': row[3],
-                'status': row[4]
-            })
-
-        # Fetch impacted devices (IMPACTS relationship)
-        devices_query = """
-            MATCH (change:Change) WHERE elementId(change) = $eid
-            MATCH (change)-[:IMPACTS]->(device:Device)
-            WITH device, apoc.convert.fromJsonMap(device.custom_properties) AS props
-            RETURN 
-                elementId(device) AS id,
-                labels(device)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name
-        """
-        devices_result, _ = db.cypher_query(devices_query, {'eid': element_id})
-        for row in devices_result:
-            context['custom_data']['impacted_devices'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2]
-            })
+        raw_node, collections, totals = result
+        context['node'] = node_class.inflate(raw_node)
+        context['custom_data'].update(collections)
+        context['custom_data']['totals'] = totals
+        context['custom_data']['sla'] = sla_summary(raw_node)
+
+        # Collisions with other changes on the same devices, and freeze windows
+        context['custom_data']['schedule_conflicts'] = get_schedule_index().conflicts_for(element_id)
+
+        # Blast radius of all impacted devices, beyond the listed ones (cached per device)
+        if context['custom_data']['impacted_devices']:
+            context['custom_data']['impact'] = _impact_of_all_devices(
+                label, element_id, context['custom_data']['impacted_devices'], totals['impacted_devices'])
 
     except Exception as e:
         context['error'] = str(e)
@@ -378,7 +267,7 @@ def change_details_tab(request, label, element_id):
 def release_details_tab(request, label, element_id):
     """
     Custom view for Release Details tab.
-    Shows related changes, deployed devices, and superseded releases.
+    Shows related changes, deployed devices, superseded releases and the full version lineage.
     """
     context = {
         'label': label,
@@ -388,106 +277,28 @@ def release_details_tab(request, label, element_id):
             'changes': [],
             'deployed_devices': [],
             'superseded_by': [],
-            'supersedes': []
+            'supersedes': [],
+            'lineage': None,
+            'totals': {}
         },
         'error': None,
     }
 
     try:
         node_class = DynamicNode.get_or_create_label(label)
-        query = f"""
-            MATCH (n:`{label}`)
-            WHERE elementId(n) = $eid
-            RETURN n
-        """
-        result, _ = db.cypher_query(query, {'eid': element_id})
+        result = _fetch_tab_data(label, element_id, RELEASE_TAB_COLLECTIONS)
         if not result:
             context['error'] = f"Release node not found: {element_id}"
             return context
 
-        raw_node = result[0][0]
-        node = node_class.inflate(raw_node)
-        context['node'] = node
-
-        # Fetch related changes (CONTAINS relationship)
-        changes_query = """
-            MATCH (release:Release) WHERE elementId(release) = $eid
-            MATCH (release)-[:CONTAINS]->(change:Change)
-            WITH change, apoc.convert.fromJsonMap(change.custom_properties) AS props
-            RETURN 
-                elementId(change) AS id,
-                labels(change)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.status, 'Unknown') AS status,
-                COALESCE(props.change_type, 'Unknown') AS change_type
-        """
-        changes_result, _ = db.cypher_query(changes_query, {'eid': element_id})
-        for row in changes_result:
-            context['custom_data']['changes'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'status': row[3],
-                'change_type': row[4]
-            })
-
-        # Fetch deployed devices (DEPLOYS_TO relationship)
-        devices_query = """
-            MATCH (release:Release) WHERE elementId(release) = $eid
-            MATCH (release)-[:DEPLOYS_TO]->(device:Device)
-            WITH device, apoc.convert.fromJsonMap(device.custom_properties) AS props
-            RETURN 
-                elementId(device) AS id,
-                labels(device)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name
-        """
-        devices_result, _ = db.cypher_query(devices_query, {'eid': element_id})
-        for row in devices_result:
-            context['custom_data']['deployed_devices'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2]
-            })
-
-        # Fetch superseded releases (SUPERSEDES relationship - outgoing)
-        supersedes_query = """
-            MATCH (release:Release) WHERE elementId(release) = $eid
-            MATCH (release)-[:SUPERSEDES]->(old_release:Release)
-            WITH old_release, apoc.convert.fromJsonMap(old_release.custom_properties) AS props
-            RETURN 
-                elementId(old_release) AS id,
-                labels(old_release)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.version, 'Unknown') AS version
-        """
-        supersedes_result, _ = db.cypher_query(supersedes_query, {'eid': element_id})
-        for row in supersedes_result:
-            context['custom_data']['supersedes'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'version': row[3]
-            })
-
-        # Fetch superseding releases (SUPERSEDES relationship - incoming)
-        superseded_by_query = """
-            MATCH (release:Release) WHERE elementId(release) = $eid
-            MATCH (new_release:Release)-[:SUPERSEDES]->(release)
-            WITH new_release, apoc.convert.fromJsonMap(new_release.custom_properties) AS props
-            RETURN 
-                elementId(new_release) AS id,
-                labels(new_release)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.version, 'Unknown') AS version
-        """
-        superseded_by_result, _ = db.cypher_query(superseded_by_query, {'eid': element_id})
-        for row in superseded_by_result:
-            context['custom_data']['superseded_by'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'version': row[3]
-            })
+        raw_node, collections, totals = result
+        context['node'] = node_class.inflate(raw_node)
+        context['custom_data'].update(collections)
+        context['custom_data']['totals'] = totals
+
+        # Whole SUPERSEDES chain (cached per release family)
+        if context['custom_data']['supersedes'] or context['custom_data']['superseded_by']:
+            context['custom_data']['lineage'] = get_release_lineage(element_id)
 
     except Exception as e:
         context['error'] = str(e)
@@ -507,90 +318,215 @@ def event_details_tab(request, label, element_id):
         'custom_data': {
             'triggered_issues': [],
             'related_events': [],
-            'source_devices': []
+            'source_devices': [],
+            'totals': {}
         },
         'error': None,
     }
 
     try:
         node_class = DynamicNode.get_or_create_label(label)
-        query = f"""
-            MATCH (n:`{label}`)
-            WHERE elementId(n) = $eid
-            RETURN n
-        """
-        result, _ = db.cypher_query(query, {'eid': element_id})
+        result = _fetch_tab_data(label, element_id, EVENT_TAB_COLLECTIONS)
         if not result:
             context['error'] = f"Event node not found: {element_id}"
             return context
 
-        raw_node = result[0][0]
-        node = node_class.inflate(raw_node)
-        context['node'] = node
-
-        # Fetch triggered issues (TRIGGERS relationship)
-        issues_query = """
-            MATCH (event:Event) WHERE elementId(event) = $eid
-            MATCH (event)-[:TRIGGERS]->(issue:Issue)
-            WITH issue, apoc.convert.fromJsonMap(issue.custom_properties) AS props
-            RETURN 
-                elementId(issue) AS id,
-                labels(issue)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.status, 'Unknown') AS status,
-                COALESCE(props.priority, 'Unknown') AS priority
-        """
-        issues_result, _ = db.cypher_query(issues_query, {'eid': element_id})
-        for row in issues_result:
-            context['custom_data']['triggered_issues'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'status': row[3],
-                'priority': row[4]
-            })
-
-        # Fetch related events (RELATED_TO relationship)
-        related_events_query = """
-            MATCH (event:Event) WHERE elementId(event) = $eid
-            MATCH (event)-[:RELATED_TO]->(related:Event)
-            WITH related, apoc.convert.fromJsonMap(related.custom_properties) AS props
-            RETURN 
-                elementId(related) AS id,
-                labels(related)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name,
-                COALESCE(props.severity, 'Unknown') AS severity,
-                COALESCE(props.timestamp, 'Unknown') AS timestamp
-        """
-        related_result, _ = db.cypher_query(related_events_query, {'eid': element_id})
-        for row in related_result:
-            context['custom_data']['related_events'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'severity': row[3],
-                'timestamp': row[4]
-            })
-
-        # Fetch source devices (ORIGINATED_FROM relationship)
-        devices_query = """
-            MATCH (event:Event) WHERE elementId(event) = $eid
-            MATCH (event)-[:ORIGINATED_FROM]->(device:Device)
-            WITH device, apoc.convert.fromJsonMap(device.custom_properties) AS props
-            RETURN 
-                elementId(device) AS id,
-                labels(device)[0] AS label,
-                COALESCE(props.name, 'Unnamed') AS name
-        """
-        devices_result, _ = db.cypher_query(devices_query, {'eid': element_id})
-        for row in devices_result:
-            context['custom_data']['source_devices'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2]
-            })
+        raw_node, collections, totals = result
+        context['node'] = node_class.inflate(raw_node)
+        context['custom_data'].update(collections)
+        context['custom_data']['totals'] = totals
 
     except Exception as e:
         context['error'] = str(e)
 
     return context
+
+
+@require_http_methods(["POST"])
+@login_required
+def itsm_event_ingest(request):
+    """
+    Bulk-create Events from a JSON array, or from an NDJSON stream when the
+    content type is application/x-ndjson (or ?format=ndjson).
+    Duplicates are folded and events grouped into Issues unless ?correlate=0.
+    Returns ingestion counters plus one result per submitted item.
+    """
+    content_type = request.content_type or ''
+    is_ndjson = 'ndjson' in content_type or request.GET.get('format') == 'ndjson'
+    try:
+        if is_ndjson:
+            payloads = iter_ndjson(request)
+        else:
+            try:
+                payloads = json.loads(request.body or b'[]')
+            except ValueError as exc:
+                return JsonResponse({'error': f"Invalid JSON: {exc}"}, status=400)
+            if isinstance(payloads, dict):
+                payloads = [payloads]
+            if not isinstance(payloads, list):
+                return JsonResponse({'error': 'Expected a JSON array of events.'}, status=400)
+
+        correlate = request.GET.get('correlate', '1').lower() not in ('0', 'false', 'no')
+        stats, results = ingest_events(payloads, user=request.user.username, correlate=correlate)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+
+    return JsonResponse({'stats': stats, 'results': results})
+
+
+@require_http_methods(["GET"])
+def itsm_change_conflicts(request):
+    """
+    Change calendar for ?start=&end= (ISO dates, default the next 30 days):
+    scheduled changes, device collisions between them, and freeze-window hits.
+    """
+    now = datetime.now(timezone.utc)
+    start, _ = parse_change_time(request.GET.get('start'))
+    end, end_is_date = parse_change_time(request.GET.get('end'))
+    start = start or now
+    if end is None:
+        end = start + timedelta(days=30)
+    elif end_is_date:
+        end += timedelta(days=1)
+    if end <= start:
+        return JsonResponse({'error': 'end must be after start.'}, status=400)
+    if end - start > timedelta(days=366):
+        return JsonResponse({'error': 'Date range is limited to one year.'}, status=400)
+
+    try:
+        calendar = conflict_calendar(start.timestamp(), end.timestamp())
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse(calendar)
+
+
+@require_http_methods(["GET"])
+def itsm_dashboard_counters(request):
+    """
+    Materialized ITSM counters per label by status and by priority / approval
+    status / release type / severity, without scanning the ITSM nodes.
+    """
+    try:
+        counters = get_dashboard_counters()
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse(counters)
+
+
+@require_http_methods(["POST"])
+@login_required
+def itsm_dashboard_counters_reconcile(request):
+    """
+    Full recount of the dashboard counters; meant to be run periodically.
+    """
+    try:
+        buckets = reconcile_counters()
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse({'buckets': buckets, 'counters': get_dashboard_counters()})
+
+
+@require_http_methods(["GET"])
+def itsm_release_lineage(request, element_id):
+    """
+    Full SUPERSEDES lineage of a release's family, newest first.
+    """
+    try:
+        lineage = get_release_lineage(element_id)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    if lineage is None:
+        return JsonResponse({'error': f"Release node not found: {element_id}"}, status=404)
+    return JsonResponse(lineage)
+
+
+@require_http_methods(["GET"])
+def itsm_outdated_devices(request):
+    """
+    Devices whose deployed release has been superseded (?limit=N).
+    """
+    limit = request.GET.get('limit')
+    try:
+        limit = max(int(limit), 1) if limit else None
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer.'}, status=400)
+    try:
+        devices = devices_on_superseded_releases(limit=limit)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse({'devices': devices})
+
+
+@require_http_methods(["GET"])
+def itsm_problem_clusters(request):
+    """
+    Problem clusters (RELATED_TO / shared affected devices), largest first (?min_size=&limit=).
+    """
+    try:
+        min_size = max(int(request.GET.get('min_size', 2)), 1)
+        limit = max(int(request.GET.get('limit', 100)), 1)
+    except ValueError:
+        return JsonResponse({'error': 'min_size and limit must be integers.'}, status=400)
+    try:
+        clusters = list_problem_clusters(min_size=min_size, limit=limit)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse({'clusters': clusters})
+
+
+@require_http_methods(["POST"])
+@login_required
+def itsm_problem_clusters_recompute(request):
+    """
+    Recluster every Problem from scratch; incremental updates keep it current in between.
+    """
+    try:
+        clusters = compute_problem_clusters()
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse({'clusters': clusters})
+
+
+@require_http_methods(["POST"])
+@login_required
+def itsm_sla_run(request):
+    """
+    Periodic SLA job: flags items whose next response/resolution deadline has passed.
+    """
+    try:
+        stats = process_sla_deadlines()
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse(stats)
+
+
+@require_http_methods(["POST"])
+@login_required
+def itsm_sla_recompute(request):
+    """
+    Re-evaluate every Issue and Change SLA, e.g. after ITSM_SLA_POLICIES changed.
+    """
+    try:
+        counts = recompute_sla(force=True)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse({'recomputed': counts})
+
+
+@require_http_methods(["GET"])
+def itsm_sla_breaches(request):
+    """
+    Unresolved Issues (or ?label=Change) in SLA breach, most overdue first (?limit=N).
+    """
+    label = request.GET.get('label', 'Issue')
+    if label not in SLA_LABELS:
+        return JsonResponse({'error': f"label must be one of: {', '.join(SLA_LABELS)}."}, status=400)
+    try:
+        limit = max(int(request.GET.get('limit', 100)), 1)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer.'}, status=400)
+    try:
+        breaches = list_sla_breaches(label, limit=limit)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse({'label': label, 'breaches': breaches})
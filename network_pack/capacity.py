@@ -0,0 +1,111 @@
+# feature_packs/network_pack/capacity.py
+
+from django.core.cache import cache
+from neomodel import db
+
+
+CAPACITY_GENERATION_KEY = 'network_circuit_capacity:generation'
+CAPACITY_CACHE_PREFIX = 'network_circuit_capacity'
+CAPACITY_CACHE_TIMEOUT = 3600  # also bounds staleness from location changes, which are not tracked
+SITE_DEPTH = 7                 # Device -> Rack_Unit -> Rack -> Row -> Room -> Floor -> Building -> Site
+UNCOMMITTED_STATUSES = ('decommissioned',)
+ROLLUP_DIMENSIONS = ('vendor', 'site', 'type')
+
+# Labels and relationships whose changes alter the rollups
+CAPACITY_LABELS = ('Circuit', 'Vendor', 'Site')
+CAPACITY_REL_TYPES = ('PROVIDED_BY', 'TERMINATES_AT')
+
+
+def _fetch_capacity_cells():
+    """
+    Circuit counts and bandwidth grouped by (vendor, type, status, sites), in one query.
+    A circuit terminating at two sites lands in one cell listing both, so totals
+    per vendor or type count it once while each site still gets its bandwidth.
+    """
+    result, _ = db.cypher_query(f"""
+        MATCH (c:Circuit)
+        WITH c, apoc.convert.fromJsonMap(c.custom_properties) AS props
+        OPTIONAL MATCH (c)-[:PROVIDED_BY]->(vendor:Vendor)
+        WITH c, props, head(collect(vendor)) AS vendor
+        WITH props, vendor, COLLECT {{
+            MATCH (c)-[:TERMINATES_AT]->(:Interface)-[:LOCATED_ON]->(:Device)
+                  -[:LOCATED_IN|PART_OF*1..{SITE_DEPTH}]->(site:Site)
+            WITH DISTINCT site
+            ORDER BY elementId(site)
+            RETURN [elementId(site), COALESCE(apoc.convert.fromJsonMap(site.custom_properties).name, 'Unnamed')]
+        }} AS sites,
+        toFloatOrNull(toString(props.bandwidth_mbps)) AS bandwidth
+        RETURN elementId(vendor), apoc.convert.fromJsonMap(vendor.custom_properties).name,
+               props.type, toLower(COALESCE(props.status, '')), sites,
+               count(*), sum(COALESCE(bandwidth, 0)), count(bandwidth)
+    """)
+    return result
+
+
+def _empty_group(key, name):
+    return {'id': key, 'name': name, 'circuits': 0, 'total_mbps': 0, 'committed_mbps': 0,
+            'active_mbps': 0, 'missing_bandwidth': 0, 'by_status': {}}
+
+
+def _add(group, status, circuits, mbps, with_bandwidth):
+    group['circuits'] += circuits
+    group['total_mbps'] += mbps
+    group['missing_bandwidth'] += circuits - with_bandwidth
+    if status not in UNCOMMITTED_STATUSES:
+        group['committed_mbps'] += mbps
+    if status == 'active':
+        group['active_mbps'] += mbps
+    group['by_status'][status or 'unknown'] = group['by_status'].get(status or 'unknown', 0) + circuits
+
+
+def compute_capacity_rollups():
+    """
+    Circuit bandwidth rolled up by vendor, site and type, plus an overall total.
+    ``committed_mbps`` excludes decommissioned circuits; ``active_mbps`` counts only active ones.
+    """
+    rollups = {dimension: {} for dimension in ROLLUP_DIMENSIONS}
+    overall = _empty_group(None, 'All circuits')
+    for vendor_id, vendor_name, circuit_type, status, sites, circuits, mbps, with_bandwidth in _fetch_capacity_cells():
+        mbps = int(mbps) if float(mbps).is_integer() else mbps
+        keys = {
+            'vendor': [(vendor_id, vendor_name or 'Unnamed') if vendor_id else (None, 'No vendor')],
+            'site': [tuple(site) for site in sites] or [(None, 'Unterminated')],
+            'type': [(circuit_type, circuit_type) if circuit_type else (None, 'Unspecified')],
+        }
+        for dimension, entries in keys.items():
+            for key, name in entries:
+                group = rollups[dimension].setdefault(key, _empty_group(key, name))
+                _add(group, status, circuits, mbps, with_bandwidth)
+        _add(overall, status, circuits, mbps, with_bandwidth)
+
+    return {
+        'total': overall,
+        **{
+            dimension: sorted(groups.values(), key=lambda g: (-g['committed_mbps'], g['name']))
+            for dimension, groups in rollups.items()
+        },
+    }
+
+
+def _capacity_key():
+    generation = cache.get(CAPACITY_GENERATION_KEY) or 0
+    return f'{CAPACITY_CACHE_PREFIX}:{generation}'
+
+
+def get_capacity_rollups():
+    """
+    Cached circuit capacity rollups; rebuilt after any circuit, vendor or site change.
+    """
+    key = _capacity_key()
+    rollups = cache.get(key)
+    if rollups is None:
+        rollups = compute_capacity_rollups()
+        cache.set(key, rollups, CAPACITY_CACHE_TIMEOUT)
+    return rollups
+
+
+def invalidate_capacity_rollups():
+    try:
+        cache.incr(CAPACITY_GENERATION_KEY)
+    except ValueError:
+        cache.set(CAPACITY_GENERATION_KEY, 1, None)
@@ -3,8 +3,15 @@ FEATURE_PACK_CONFIG = {
     'author_email': 'eric.hester@gmail.com',
     'name': 'Network Pack',
     'version': '1.1.0',
-    'applies_to_labels': ['Interface', 'Cable', 'Circuit', 'VLAN'],
+    'applies_to_labels': ['Interface', 'Cable', 'Circuit', 'VLAN', 'VXLAN'],
     'dependencies': ['inventory_pack', 'vendor_management_pack'],
+    'hooks': {
+        'audit': 'network_pack.hooks.register_hooks'
+    },
+    'urls': {
+        'prefix': '',
+        'module': 'network_pack.urls'
+    },
     'tabs': [
         {
             'id': 'interface_details',
@@ -0,0 +1,292 @@
+# feature_packs/network_pack/export.py
+
+import csv
+import io
+import json
+from xml.sax.saxutils import escape, quoteattr
+
+from neomodel import db
+
+
+PAGE_SIZE = 200  # devices per read; their interfaces, cables and circuits come with them
+SITE_DEPTH = 8   # Device -> Rack_Unit -> Rack -> Row -> Room -> Floor -> Building -> Site
+
+EXPORT_FORMATS = {
+    'graphml': ('application/graphml+xml', 'graphml'),
+    'json': ('application/json', 'json'),
+    'csv': ('text/csv', 'csv'),
+}
+
+NODE_ATTRS = (
+    'name', 'serial_number', 'role', 'device_type', 'speed_mbps', 'status',
+    'circuit_id', 'bandwidth_mbps', 'circuit_type', 'vlan_id', 'vni', 'rd',
+)
+EDGE_ATTRS = ('cable_id', 'cable_type', 'length_meters', 'via')
+
+
+def _device_filter(alias, site, role):
+    """
+    WHERE fragment restricting Device ``alias`` to a site (elementId, name or
+    site_code) and/or a role (the device's ``role`` property or its Device_Type name).
+    """
+    clauses = []
+    if site:
+        clauses.append(f"""EXISTS {{
+            MATCH ({alias})-[:LOCATED_IN|PART_OF*1..{SITE_DEPTH}]->(site:Site)
+            WHERE elementId(site) = $site
+               OR toLower(apoc.convert.fromJsonMap(site.custom_properties).name) = toLower($site)
+               OR toLower(apoc.convert.fromJsonMap(site.custom_properties).site_code) = toLower($site)
+        }}""")
+    if role:
+        clauses.append(f"""(
+            toLower(apoc.convert.fromJsonMap({alias}.custom_properties).role) = toLower($role)
+            OR EXISTS {{
+                MATCH ({alias})-[:INSTANCE_OF]->(device_type:Device_Type)
+                WHERE toLower(apoc.convert.fromJsonMap(device_type.custom_properties).name) = toLower($role)
+            }}
+        )""")
+    return ' AND '.join(clauses) or 'true'
+
+
+def _device_pages(site, role):
+    """
+    Devices in scope, PAGE_SIZE at a time, keyed on elementId.
+    """
+    after = ''
+    while True:
+        result, _ = db.cypher_query(f"""
+            MATCH (d:Device) WHERE elementId(d) > $after AND {_device_filter('d', site, role)}
+            WITH d ORDER BY elementId(d) LIMIT $page_size
+            WITH d, apoc.convert.fromJsonMap(d.custom_properties) AS props
+            OPTIONAL MATCH (d)-[:INSTANCE_OF]->(device_type:Device_Type)
+            RETURN elementId(d), COALESCE(props.name, 'Unnamed'), props.serial_number, props.role,
+                   apoc.convert.fromJsonMap(device_type.custom_properties).name
+            ORDER BY elementId(d)
+        """, {'after': after, 'page_size': PAGE_SIZE, 'site': site, 'role': role})
+        if not result:
+            return
+        yield result
+        if len(result) < PAGE_SIZE:
+            return
+        after = result[-1][0]
+
+
+def _interface_rows(device_ids, site, role):
+    """
+    Interfaces of a page of devices, each with its cables (and the in-scope far
+    ends) and the circuits terminating on it.
+    """
+    result, _ = db.cypher_query(f"""
+        UNWIND $ids AS did
+        MATCH (d:Device) WHERE elementId(d) = did
+        MATCH (i:Interface)-[:LOCATED_ON]->(d)
+        WITH did, i, apoc.convert.fromJsonMap(i.custom_properties) AS props
+        RETURN did, elementId(i), COALESCE(props.name, 'Unnamed'), props.speed_mbps, props.status,
+               [(cable:Cable)-[:CONNECTS]->(i) | {{
+                   id: elementId(cable),
+                   props: apoc.convert.fromJsonMap(cable.custom_properties),
+                   peers: [(cable)-[:CONNECTS]->(peer:Interface)-[:LOCATED_ON]->(peer_device:Device)
+                           WHERE peer <> i AND {_device_filter('peer_device', site, role)} | elementId(peer)]
+               }}],
+               [(circuit:Circuit)-[:TERMINATES_AT]->(i) | {{
+                   id: elementId(circuit),
+                   props: apoc.convert.fromJsonMap(circuit.custom_properties)
+               }}]
+    """, {'ids': device_ids, 'site': site, 'role': role})
+    return result
+
+
+def _logical_rows(device_ids):
+    """
+    VRF membership (through the routing processes running on each device),
+    VXLANs configured on it, and VLANs reached from its interfaces' addresses.
+    """
+    result, _ = db.cypher_query("""
+        UNWIND $ids AS did
+        MATCH (d:Device) WHERE elementId(d) = did
+        RETURN did,
+               [(d)<-[:RUNS_ON]-(process)-[:MEMBER_OF]->(vrf:VRF) | {
+                   id: elementId(vrf), via: labels(process)[0],
+                   props: apoc.convert.fromJsonMap(vrf.custom_properties)
+               }],
+               [(vxlan:VXLAN)-[:CONFIGURED_ON]->(d) | {
+                   id: elementId(vxlan),
+                   props: apoc.convert.fromJsonMap(vxlan.custom_properties),
+                   vlans: [(vxlan)-[:MAPS_TO]->(vlan:VLAN) | {
+                       id: elementId(vlan), props: apoc.convert.fromJsonMap(vlan.custom_properties)
+                   }],
+                   vrfs: [(vxlan)-[:MEMBER_OF]->(vrf:VRF) | {
+                       id: elementId(vrf), props: apoc.convert.fromJsonMap(vrf.custom_properties)
+                   }]
+               }],
+               [(d)<-[:LOCATED_ON]-(i:Interface)<-[:ASSIGNED_TO]-(:Mac_Address)<-[:ASSIGNED_TO]-(:IP_Address)
+                   -[:PART_OF]->(:Network)-[:ASSIGNED_TO]->(vlan:VLAN) | {
+                   interface: elementId(i), id: elementId(vlan),
+                   props: apoc.convert.fromJsonMap(vlan.custom_properties)
+               }]
+    """, {'ids': device_ids})
+    return result
+
+
+def _node(node_id, label, **attrs):
+    return {'id': node_id, 'label': label, **{k: v for k, v in attrs.items() if v not in (None, '')}}
+
+
+def _edge(source, target, rel_type, **attrs):
+    return {'source': source, 'target': target, 'type': rel_type,
+            **{k: v for k, v in attrs.items() if v not in (None, '')}}
+
+
+def _vlan_node(vlan):
+    props = vlan['props'] or {}
+    return _node(vlan['id'], 'VLAN', name=props.get('name'), vlan_id=props.get('vlan_id'))
+
+
+def _vrf_node(vrf):
+    props = vrf['props'] or {}
+    return _node(vrf['id'], 'VRF', name=props.get('name'), rd=props.get('rd'))
+
+
+def iter_topology(site=None, role=None, logical=False, nodes=True, edges=True):
+    """
+    Yield ('node', dict) for every exported node, then ('edge', dict) for every edge.
+    Devices are read a page at a time, in two passes so writers can emit all
+    nodes before any edge. Only ids of circuits and logical objects already
+    emitted are remembered; memory does not grow with the interface count.
+    """
+    if nodes:
+        seen = set()
+        for page in _device_pages(site, role):
+            for device_id, name, serial, device_role, device_type in page:
+                yield 'node', _node(device_id, 'Device', name=name, serial_number=serial,
+                                    role=device_role, device_type=device_type)
+            device_ids = [row[0] for row in page]
+            for _, iface_id, name, speed, status, _, circuits in _interface_rows(device_ids, site, role):
+                yield 'node', _node(iface_id, 'Interface', name=name, speed_mbps=speed, status=status)
+                for circuit in circuits:
+                    if circuit['id'] not in seen:
+                        seen.add(circuit['id'])
+                        props = circuit['props'] or {}
+                        yield 'node', _node(circuit['id'], 'Circuit', name=props.get('name'),
+                                            circuit_id=props.get('circuit_id'),
+                                            bandwidth_mbps=props.get('bandwidth_mbps'),
+                                            circuit_type=props.get('type'), status=props.get('status'))
+            if not logical:
+                continue
+            for _, vrfs, vxlans, vlans in _logical_rows(device_ids):
+                logical_nodes = [_vrf_node(vrf) for vrf in vrfs] + [_vlan_node(vlan) for vlan in vlans]
+                for vxlan in vxlans:
+                    props = vxlan['props'] or {}
+                    logical_nodes.append(_node(vxlan['id'], 'VXLAN', name=props.get('name'), vni=props.get('vni')))
+                    logical_nodes += [_vlan_node(vlan) for vlan in vxlan['vlans']]
+                    logical_nodes += [_vrf_node(vrf) for vrf in vxlan['vrfs']]
+                for node in logical_nodes:
+                    if node['id'] not in seen:
+                        seen.add(node['id'])
+                        yield 'node', node
+
+    if edges:
+        seen = set()
+        for page in _device_pages(site, role):
+            device_ids = [row[0] for row in page]
+            for device_id, iface_id, _, _, _, cables, circuits in _interface_rows(device_ids, site, role):
+                yield 'edge', _edge(iface_id, device_id, 'LOCATED_ON')
+                for cable in cables:
+                    props = cable['props'] or {}
+                    for peer in cable['peers']:
+                        if iface_id < peer:  # each cable once, from its lower end
+                            yield 'edge', _edge(iface_id, peer, 'CABLE', cable_id=cable['id'],
+                                                cable_type=props.get('type'),
+                                                length_meters=props.get('length_meters'))
+                for circuit in circuits:
+                    yield 'edge', _edge(circuit['id'], iface_id, 'TERMINATES_AT')
+            if not logical:
+                continue
+            for device_id, vrfs, vxlans, vlans in _logical_rows(device_ids):
+                for key in {(vrf['id'], vrf['via']) for vrf in vrfs}:
+                    yield 'edge', _edge(device_id, key[0], 'MEMBER_OF', via=key[1])
+                for key in {(vlan['interface'], vlan['id']) for vlan in vlans}:
+                    yield 'edge', _edge(key[0], key[1], 'IN_VLAN')
+                for vxlan in vxlans:
+                    yield 'edge', _edge(vxlan['id'], device_id, 'CONFIGURED_ON')
+                    if vxlan['id'] in seen:
+                        continue
+                    seen.add(vxlan['id'])
+                    for vlan in vxlan['vlans']:
+                        yield 'edge', _edge(vxlan['id'], vlan['id'], 'MAPS_TO')
+                    for vrf in vxlan['vrfs']:
+                        yield 'edge', _edge(vxlan['id'], vrf['id'], 'MEMBER_OF')
+
+
+def write_graphml(items):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+    yield '  <key id="label" for="node" attr.name="label" attr.type="string"/>\n'
+    for attr in NODE_ATTRS:
+        yield f'  <key id="n_{attr}" for="node" attr.name="{attr}" attr.type="string"/>\n'
+    yield '  <key id="type" for="edge" attr.name="type" attr.type="string"/>\n'
+    for attr in EDGE_ATTRS:
+        yield f'  <key id="e_{attr}" for="edge" attr.name="{attr}" attr.type="string"/>\n'
+    yield '  <graph id="topology" edgedefault="directed">\n'
+    for kind, item in items:
+        if kind == 'node':
+            data = [f'<data key="label">{escape(item["label"])}</data>']
+            data += [f'<data key="n_{a}">{escape(str(item[a]))}</data>' for a in NODE_ATTRS if a in item]
+            yield f'    <node id={quoteattr(item["id"])}>{"".join(data)}</node>\n'
+        else:
+            data = [f'<data key="type">{escape(item["type"])}</data>']
+            data += [f'<data key="e_{a}">{escape(str(item[a]))}</data>' for a in EDGE_ATTRS if a in item]
+            yield (f'    <edge source={quoteattr(item["source"])} target={quoteattr(item["target"])}>'
+                   f'{"".join(data)}</edge>\n')
+    yield '  </graph>\n</graphml>\n'
+
+
+def write_json_graph(items):
+    """
+    JSON Graph Format (v1): {"graph": {"directed": true, "nodes": [...], "edges": [...]}}.
+    """
+    yield '{"graph": {"directed": true, "type": "network topology", "nodes": ['
+    section = 'nodes'
+    first = True
+    for kind, item in items:
+        if kind == 'edge' and section == 'nodes':
+            yield '], "edges": ['
+            section = 'edges'
+            first = True
+        if kind == 'node':
+            entry = {'id': item['id'], 'label': item.get('name') or item['id'],
+                     'metadata': {k: v for k, v in item.items() if k not in ('id', 'name')}}
+        else:
+            entry = {'source': item['source'], 'target': item['target'], 'relation': item['type'],
+                     'metadata': {k: v for k, v in item.items() if k not in ('source', 'target', 'type')}}
+        yield ('' if first else ',') + json.dumps(entry, default=str)
+        first = False
+    if section == 'nodes':
+        yield '], "edges": ['
+    yield ']}}\n'
+
+
+def write_edge_csv(items):
+    columns = ('source', 'target', 'type') + EDGE_ATTRS
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    for kind, item in items:
+        if kind != 'edge':
+            continue
+        writer.writerow(item)
+        if buffer.tell() > 65536:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_topology(fmt, site=None, role=None, logical=False):
+    """
+    Generator of text chunks for the requested export format.
+    """
+    if fmt == 'csv':
+        return write_edge_csv(iter_topology(site, role, logical, nodes=False))
+    items = iter_topology(site, role, logical)
+    return write_graphml(items) if fmt == 'graphml' else write_json_graph(items)
@@ -0,0 +1,30 @@
+from .capacity import CAPACITY_LABELS, CAPACITY_REL_TYPES, invalidate_capacity_rollups
+from .neighbors import invalidate_interface_index
+from .tracing import TRACE_LABELS, TRACE_REL_TYPES, invalidate_traces
+from .vxlan import sync_vni
+
+
+def track_network_changes(action, node_label, node_id, node_name=None, user=None, changes=None,
+                          relationship_type=None, target_label=None, target_id=None, **kwargs):
+    """
+    Drop cached cable traces when cabling, patch panel pass-throughs or the
+    interfaces and devices named along a path change, rebuild the neighbor
+    import's interface index when interfaces or devices change, drop the
+    circuit capacity rollups when circuits or their vendors and sites change,
+    and keep the indexed VNI of edited VXLANs in sync.
+    """
+    try:
+        if relationship_type in TRACE_REL_TYPES or (relationship_type is None and node_label in TRACE_LABELS):
+            invalidate_traces()
+        if relationship_type == 'LOCATED_ON' or (relationship_type is None and node_label in ('Interface', 'Device')):
+            invalidate_interface_index()
+        if relationship_type in CAPACITY_REL_TYPES or (relationship_type is None and node_label in CAPACITY_LABELS):
+            invalidate_capacity_rollups()
+        if node_label == 'VXLAN' and relationship_type is None and action != 'delete':
+            sync_vni(node_id)
+    except Exception as exc:
+        print(f"Error tracking network change: {exc}")
+
+
+def register_hooks(register_audit_hook):
+    register_audit_hook(track_network_changes)
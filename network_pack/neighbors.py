@@ -0,0 +1,372 @@
+# feature_packs/network_pack/neighbors.py
+
+import csv
+import json
+import re
+
+from django.core.cache import cache
+from neomodel import db
+
+from cmdb.audit_hooks import emit_audit
+
+
+INDEX_GENERATION_KEY = 'network_interface_index:generation'
+INDEX_CACHE_PREFIX = 'network_interface_index'
+INDEX_CACHE_TIMEOUT = 3600
+APPLY_BATCH_SIZE = 1000
+SCOPE_BATCH_SIZE = 500   # devices per read of existing cabling
+REPORT_SAMPLE = 500      # entries listed per diff section; counts are always exact
+
+# Long interface prefixes (as CDP and most configs print them) -> the short
+# form LLDP port ids usually carry, so "GigabitEthernet1/0/1" matches "Gi1/0/1".
+INTERFACE_ABBREVIATIONS = {
+    'gigabitethernet': 'gi',
+    'tengigabitethernet': 'te',
+    'twentyfivegige': 'twe',
+    'fortygigabitethernet': 'fo',
+    'hundredgige': 'hu',
+    'fastethernet': 'fa',
+    'ethernet': 'et',
+    'eth': 'et',
+    'port-channel': 'po',
+    'management': 'ma',
+    'mgmt': 'ma',
+}
+
+_FIELD_ALIASES = {
+    'local_device': ('local_device', 'device', 'hostname', 'local_hostname'),
+    'local_interface': ('local_interface', 'local_port', 'local_intf', 'interface'),
+    'remote_device': ('remote_device', 'neighbor', 'remote_system_name', 'system_name', 'device_id'),
+    'remote_interface': ('remote_interface', 'remote_port', 'neighbor_interface', 'neighbor_port', 'port_id'),
+}
+
+_INTERFACE_PREFIX = re.compile(r'^([a-z][a-z\-]*?)(?=[\d/.:]|$)(.*)$')
+_JSON_SEPARATORS = re.compile(r'[ \t\r\n,\[]*')
+
+
+def normalize_device(name):
+    return str(name or '').strip().lower()
+
+
+def normalize_interface(name):
+    name = re.sub(r'\s+', '', str(name or '').lower())
+    match = _INTERFACE_PREFIX.match(name)
+    if not match:
+        return name
+    prefix, rest = match.groups()
+    return INTERFACE_ABBREVIATIONS.get(prefix, prefix) + rest
+
+
+def _neighbor_row(record, device=None):
+    """
+    (local_device, local_interface, remote_device, remote_interface) from one record,
+    or None when a field is missing.
+    """
+    values = {}
+    for field, aliases in _FIELD_ALIASES.items():
+        values[field] = next((record[a] for a in aliases if record.get(a) not in (None, '')), None)
+    values['local_device'] = values['local_device'] or device
+    if not all(values.values()):
+        return None
+    return (values['local_device'], values['local_interface'],
+            values['remote_device'], values['remote_interface'])
+
+
+def parse_csv_neighbors(lines):
+    """
+    Stream neighbor rows from a CSV with a header row (column names per _FIELD_ALIASES).
+    """
+    for record in csv.DictReader(lines):
+        yield _neighbor_row({(k or '').strip().lower(): (v or '').strip() for k, v in record.items()})
+
+
+def _json_records(obj):
+    if isinstance(obj, list):
+        for item in obj:
+            yield from _json_records(item)
+    elif isinstance(obj, dict) and isinstance(obj.get('neighbors'), list):
+        device = next((obj[a] for a in _FIELD_ALIASES['local_device'] if obj.get(a)), None)
+        for item in obj['neighbors']:
+            yield _neighbor_row(item, device) if isinstance(item, dict) else None
+    elif isinstance(obj, dict):
+        yield _neighbor_row(obj)
+    else:
+        yield None
+
+
+def _drain_json(decoder, buffer):
+    """
+    Yield the records of every complete value in ``buffer``; return the unconsumed tail.
+    Decoding walks an offset through the buffer, which is sliced once at the end.
+    """
+    pos = 0
+    while True:
+        pos = _JSON_SEPARATORS.match(buffer, pos).end()
+        if pos == len(buffer) or buffer[pos] == ']':
+            return buffer[pos:]
+        try:
+            obj, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            return buffer[pos:]  # value continues on a later line
+        yield from _json_records(obj)
+
+
+def parse_json_neighbors(lines):
+    """
+    Stream neighbor rows from JSON: a top-level array or one value per line (JSON Lines).
+    Each value is a neighbor object or a device object with a ``neighbors`` list.
+    Values are decoded one at a time, so the whole document is never held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    retry_at = 0  # a pretty-printed value is re-decoded only once its text has doubled
+    for line in lines:
+        buffer += line
+        if '}' not in line or len(buffer) < retry_at:
+            continue
+        buffer = yield from _drain_json(decoder, buffer)
+        retry_at = 2 * len(buffer)
+    buffer = yield from _drain_json(decoder, buffer)
+    if buffer.strip(' \t\r\n,[]'):
+        raise ValueError('Neighbor table ends in an incomplete JSON value')
+
+
+NEIGHBOR_PARSERS = {
+    'csv': parse_csv_neighbors,
+    'json': parse_json_neighbors,
+}
+
+
+def _index_key():
+    generation = cache.get(INDEX_GENERATION_KEY) or 0
+    return f'{INDEX_CACHE_PREFIX}:{generation}'
+
+
+def get_interface_index():
+    """
+    {(device name, interface name): interface elementId} plus {device name: device elementId},
+    names normalized. Cached until an Interface, Device or LOCATED_ON edge changes.
+    """
+    key = _index_key()
+    index = cache.get(key)
+    if index is not None:
+        return index
+
+    result, _ = db.cypher_query("""
+        MATCH (i:Interface)-[:LOCATED_ON]->(d:Device)
+        RETURN apoc.convert.fromJsonMap(d.custom_properties).name, elementId(d),
+               apoc.convert.fromJsonMap(i.custom_properties).name, elementId(i)
+    """)
+    interfaces = {}
+    devices = {}
+    for device_name, device_id, iface_name, iface_id in result:
+        device = normalize_device(device_name)
+        devices[device] = device_id
+        interfaces[(device, normalize_interface(iface_name))] = iface_id
+    index = {'interfaces': interfaces, 'devices': devices}
+    cache.set(key, index, INDEX_CACHE_TIMEOUT)
+    return index
+
+
+def invalidate_interface_index():
+    try:
+        cache.incr(INDEX_GENERATION_KEY)
+    except ValueError:
+        cache.set(INDEX_GENERATION_KEY, 1, None)
+
+
+def _resolve(index, device, interface):
+    device = normalize_device(device)
+    interface = normalize_interface(interface)
+    iface_id = index['interfaces'].get((device, interface))
+    if iface_id is None and '.' in device:
+        # LLDP system names are often FQDNs while the CMDB holds short hostnames
+        device = device.split('.', 1)[0]
+        iface_id = index['interfaces'].get((device, interface))
+    return iface_id, index['devices'].get(device)
+
+
+_CABLES_ON_INTERFACES = """
+    UNWIND $ids AS iid
+    MATCH (i:Interface)<-[:CONNECTS]-(cable:Cable) WHERE elementId(i) = iid
+    WITH DISTINCT cable
+    RETURN elementId(cable),
+           [(cable)-[:CONNECTS]->(i:Interface) | [elementId(i), EXISTS { (i)-[:PASSES_THROUGH]-() }]]
+"""
+
+_CABLES_ON_DEVICES = """
+    UNWIND $ids AS did
+    MATCH (d:Device)<-[:LOCATED_ON]-(:Interface)<-[:CONNECTS]-(cable:Cable) WHERE elementId(d) = did
+    WITH DISTINCT cable
+    RETURN elementId(cable),
+           [(cable)-[:CONNECTS]->(i:Interface) | [elementId(i), EXISTS { (i)-[:PASSES_THROUGH]-() }]]
+"""
+
+
+def _existing_cables(device_ids, interface_ids):
+    """
+    Cables on the interfaces of ``device_ids`` and on ``interface_ids``:
+    {cable id: ([(interface id, is patch panel port), ...], on one of ``device_ids``)}.
+    """
+    cables = {}
+    for query, ids, on_device in ((_CABLES_ON_INTERFACES, list(interface_ids), False),
+                                  (_CABLES_ON_DEVICES, list(device_ids), True)):
+        for start in range(0, len(ids), SCOPE_BATCH_SIZE):
+            result, _ = db.cypher_query(query, {'ids': ids[start:start + SCOPE_BATCH_SIZE]})
+            for cable_id, ends in result:
+                cables[cable_id] = ([tuple(end) for end in ends], on_device)
+    return cables
+
+
+def _interface_names(interface_ids):
+    result, _ = db.cypher_query("""
+        UNWIND $ids AS iid
+        MATCH (i:Interface)-[:LOCATED_ON]->(d:Device) WHERE elementId(i) = iid
+        RETURN iid, apoc.convert.fromJsonMap(d.custom_properties).name + ':' +
+                    apoc.convert.fromJsonMap(i.custom_properties).name
+    """, {'ids': list(interface_ids)})
+    return {row[0]: row[1] for row in result if row[1]}
+
+
+def _link(names, a, b):
+    return {'a': names.get(a, a), 'b': names.get(b, b)}
+
+
+def reconcile_neighbors(rows, dry_run=False, prune=False, user='System'):
+    """
+    Diff neighbor rows against Cable/CONNECTS and apply the difference.
+
+    Both ends are resolved through the cached interface index. A neighbor seen
+    from both sides counts once. Existing cabling is read for the reporting
+    devices and for the remote interfaces seen on devices that did not report.
+    Links that are observed but not cabled get a new Cable. A direct cable is
+    removed when either end is now seen with a different neighbor. With ``prune``,
+    cables on reporting devices that no neighbor entry confirms are removed as
+    well. Cables into patch panel ports (PASSES_THROUGH) cannot be checked against
+    an end-to-end neighbor: they are never removed, and their interfaces never get
+    a second cable. Each write batch is summarized in one audit event.
+    Returns the diff report; ``dry_run`` stops before writing.
+    """
+    index = get_interface_index()
+    stats = {'rows': 0, 'invalid': 0, 'unresolved': 0, 'ambiguous': 0, 'unchanged': 0,
+             'via_patch_panel': 0, 'created': 0, 'removed': 0, 'dry_run': dry_run,
+             'unresolved_samples': [], 'create': [], 'remove': []}
+    names = {}
+    observed = {}        # interface -> neighbor interface
+    ambiguous = set()
+    reporting = set()    # devices that sent a neighbor table
+    remote_ends = {}     # remote interface -> its device
+
+    for row in rows:
+        stats['rows'] += 1
+        if row is None:
+            stats['invalid'] += 1
+            continue
+        local_device, local_iface, remote_device, remote_iface = row
+        local_id, local_device_id = _resolve(index, local_device, local_iface)
+        remote_id, remote_device_id = _resolve(index, remote_device, remote_iface)
+        if local_device_id:
+            reporting.add(local_device_id)
+        if not local_id or not remote_id:
+            stats['unresolved'] += 1
+            if len(stats['unresolved_samples']) < REPORT_SAMPLE:
+                stats['unresolved_samples'].append({
+                    'local': f'{local_device}:{local_iface}', 'remote': f'{remote_device}:{remote_iface}',
+                    'missing': 'local' if not local_id else 'remote',
+                })
+            continue
+        remote_ends[remote_id] = remote_device_id
+        names[local_id] = f'{local_device}:{local_iface}'
+        names[remote_id] = f'{remote_device}:{remote_iface}'
+        for a, b in ((local_id, remote_id), (remote_id, local_id)):
+            if observed.setdefault(a, b) != b:
+                ambiguous.add(a)
+
+    stats['ambiguous'] = len(ambiguous)
+    links = {frozenset((a, b)) for a, b in observed.items()
+             if a != b and a not in ambiguous and b not in ambiguous}
+
+    cabled = {}          # interface -> set of direct peers
+    patched = set()      # interfaces cabled into a patch panel port
+    to_remove = []
+    unreported = [iface for iface, device_id in remote_ends.items() if device_id not in reporting]
+    for cable_id, (ends, on_reporting) in _existing_cables(reporting, unreported).items():
+        if len(ends) != 2:
+            continue     # half-documented cable; nothing to compare
+        (a, a_panel), (b, b_panel) = ends
+        if a_panel or b_panel:
+            patched.update(iface for iface, panel in ends if not panel)
+            continue
+        cabled.setdefault(a, set()).add(b)
+        cabled.setdefault(b, set()).add(a)
+        if frozenset((a, b)) in links:
+            continue
+        conflicting = any(
+            iface in observed and iface not in ambiguous and observed[iface] != peer
+            for iface, peer in ((a, b), (b, a))
+        )
+        if conflicting or (prune and on_reporting):
+            to_remove.append({'cable_id': cable_id, 'a': a, 'b': b})
+
+    to_create = []
+    for link in links:
+        a, b = sorted(link)
+        if b in cabled.get(a, ()):
+            stats['unchanged'] += 1
+        elif a in patched or b in patched:
+            stats['via_patch_panel'] += 1
+        else:
+            to_create.append({'a': a, 'b': b})
+
+    unnamed = {item[end] for item in to_remove[:REPORT_SAMPLE] for end in ('a', 'b') if item[end] not in names}
+    if unnamed:
+        names.update(_interface_names(unnamed))
+    stats['create'] = [_link(names, item['a'], item['b']) for item in to_create[:REPORT_SAMPLE]]
+    stats['remove'] = [dict(item, **_link(names, item['a'], item['b'])) for item in to_remove[:REPORT_SAMPLE]]
+    stats['create_count'] = len(to_create)
+    stats['remove_count'] = len(to_remove)
+    if dry_run:
+        return stats
+
+    for start in range(0, len(to_remove), APPLY_BATCH_SIZE):
+        result, _ = db.cypher_query("""
+            UNWIND $cables AS item
+            MATCH (cable:Cable) WHERE elementId(cable) = item.cable_id
+            DETACH DELETE cable
+            RETURN collect(item.cable_id + ': ' + item.a + ' - ' + item.b)
+        """, {'cables': to_remove[start:start + APPLY_BATCH_SIZE]})
+        removed = result[0][0] if result else []
+        if removed:
+            emit_audit(
+                action='delete',
+                node_label='Cable',
+                node_id='',
+                node_name=f"{len(removed)} cables",
+                user=user,
+                changes=f"Neighbor import removed {len(removed)} cables ({', '.join(removed)})",
+            )
+        stats['removed'] += len(removed)
+
+    for start in range(0, len(to_create), APPLY_BATCH_SIZE):
+        result, _ = db.cypher_query("""
+            UNWIND $links AS link
+            MATCH (a:Interface) WHERE elementId(a) = link.a
+            MATCH (b:Interface) WHERE elementId(b) = link.b
+            CREATE (cable:Cable {custom_properties: apoc.convert.toJson({status: 'active'})})
+            CREATE (cable)-[:CONNECTS]->(a)
+            CREATE (cable)-[:CONNECTS]->(b)
+            RETURN collect(elementId(cable) + ': ' + link.a + ' - ' + link.b)
+        """, {'links': to_create[start:start + APPLY_BATCH_SIZE]})
+        created = result[0][0] if result else []
+        if created:
+            emit_audit(
+                action='create',
+                node_label='Cable',
+                node_id='',
+                node_name=f"{len(created)} cables",
+                user=user,
+                changes=f"Neighbor import created {len(created)} cables ({', '.join(created)})",
+            )
+        stats['created'] += len(created)
+
+    return stats
@@ -0,0 +1,183 @@
+# feature_packs/network_pack/provisioning.py
+
+import itertools
+import json
+import re
+
+from neomodel import db
+
+from cmdb.audit_hooks import emit_audit
+
+
+MAX_TEMPLATE_PORTS = 4096  # per device type; guards against a runaway range like [1-100000]
+AUDIT_SAMPLE = 20  # devices named in the provisioning audit summary; counts are always exact
+
+_RANGE = re.compile(r'\[(\d+)-(\d+)\]')
+
+
+def _expand_name(pattern):
+    """
+    Expand numeric ranges in an interface name: "Ethernet1/[1-48]" -> Ethernet1/1 .. Ethernet1/48.
+    Several ranges multiply out ("Gi[1-2]/0/[1-24]"); a zero-padded start ("[01-48]") pads every number.
+    """
+    ranges = _RANGE.findall(pattern)
+    if not ranges:
+        return [pattern]
+    pieces = _RANGE.split(pattern)[::3]
+    choices = []
+    for start, end in ranges:
+        if int(end) < int(start):
+            raise ValueError(f"Descending range [{start}-{end}] in '{pattern}'")
+        width = len(start) if start.startswith('0') and len(start) > 1 else 0
+        choices.append([str(n).zfill(width) for n in range(int(start), int(end) + 1)])
+    names = []
+    for combo in itertools.product(*choices):
+        names.append(''.join(piece + number for piece, number in zip(pieces, combo)) + pieces[-1])
+    return names
+
+
+def _template_entries(value):
+    """
+    Raw template entries as (name pattern, speed, type). The template is either a
+    JSON list of {"name", "speed_mbps", "type"} objects or text with one entry per
+    line (or ';'), fields separated by commas: "Ethernet1/[1-48], 25000, sfp28".
+    """
+    if isinstance(value, str) and value.strip().startswith('['):
+        value = json.loads(value)
+    if isinstance(value, list):
+        for entry in value:
+            if not isinstance(entry, dict) or not entry.get('name'):
+                raise ValueError(f"Template entry without a name: {entry!r}")
+            yield str(entry['name']).strip(), entry.get('speed_mbps'), entry.get('type')
+        return
+    for line in re.split(r'[\n;]', value or ''):
+        fields = [field.strip() for field in line.split(',')]
+        if not fields[0]:
+            continue
+        yield fields[0], fields[1] if len(fields) > 1 else None, fields[2] if len(fields) > 2 else None
+
+
+def parse_interface_template(value):
+    """
+    Expand a Device_Type ``interface_template`` into the list of ports it
+    describes, each {'name', 'speed_mbps', 'type'} with empty fields left out.
+    Raises ValueError for malformed templates or duplicate port names.
+    """
+    ports = []
+    seen = set()
+    for pattern, speed, port_type in _template_entries(value):
+        if speed not in (None, ''):
+            try:
+                speed = int(speed)
+            except (TypeError, ValueError):
+                raise ValueError(f"Speed for '{pattern}' must be an integer (Mbps), got {speed!r}")
+        for name in _expand_name(pattern):
+            if name in seen:
+                raise ValueError(f"Interface '{name}' appears more than once in the template")
+            seen.add(name)
+            port = {'name': name}
+            if speed not in (None, ''):
+                port['speed_mbps'] = speed
+            if port_type:
+                port['type'] = port_type
+            ports.append(port)
+            if len(ports) > MAX_TEMPLATE_PORTS:
+                raise ValueError(f"Template expands to more than {MAX_TEMPLATE_PORTS} interfaces")
+    return ports
+
+
+def _devices_with_templates(device_ids, device_type_ids):
+    result, _ = db.cypher_query("""
+        MATCH (d:Device)
+        WHERE elementId(d) IN $device_ids
+           OR EXISTS { MATCH (d)-[:INSTANCE_OF]->(t:Device_Type) WHERE elementId(t) IN $device_type_ids }
+        OPTIONAL MATCH (d)-[:INSTANCE_OF]->(device_type:Device_Type)
+        RETURN elementId(d), COALESCE(apoc.convert.fromJsonMap(d.custom_properties).name, 'Unnamed'),
+               elementId(device_type), apoc.convert.fromJsonMap(device_type.custom_properties).name,
+               apoc.convert.fromJsonMap(device_type.custom_properties).interface_template
+    """, {'device_ids': list(device_ids or []), 'device_type_ids': list(device_type_ids or [])})
+    return result
+
+
+def provision_interfaces(device_ids=None, device_type_ids=None, dry_run=False, user='System'):
+    """
+    Create the interfaces described by each device's Device_Type template, for the
+    given devices and/or every device of the given device types.
+
+    Idempotent: ports whose name already exists on a device are left alone, so
+    re-running after a template grows only adds the new ports. All devices are
+    written in one transaction (a single UNWIND), the existence check included.
+    With ``dry_run`` nothing is written and the missing ports are reported instead.
+    The write is summarized in one audit event, which also lets the hooks drop the
+    interface index and cached traces for the new interfaces.
+    """
+    stats = {'devices': 0, 'created': 0, 'no_template': [], 'errors': {}, 'provisioned': {}}
+    templates = {}
+    plan = []
+    for device_id, device_name, type_id, type_name, template in _devices_with_templates(device_ids, device_type_ids):
+        stats['devices'] += 1
+        if not template:
+            stats['no_template'].append({'id': device_id, 'name': device_name, 'device_type': type_name})
+            continue
+        if type_id not in templates:
+            try:
+                templates[type_id] = parse_interface_template(template)
+            except (TypeError, ValueError) as exc:
+                templates[type_id] = None
+                stats['errors'][type_name or type_id] = str(exc)
+        if templates[type_id]:
+            plan.append({'device_id': device_id, 'name': device_name, 'device_type': type_name or type_id,
+                         'ports': templates[type_id]})
+
+    if not plan:
+        return stats
+
+    if dry_run:
+        result, _ = db.cypher_query("""
+            UNWIND $plan AS dev
+            MATCH (d:Device) WHERE elementId(d) = dev.device_id
+            WITH dev, COLLECT {
+                MATCH (i:Interface)-[:LOCATED_ON]->(d)
+                RETURN apoc.convert.fromJsonMap(i.custom_properties).name
+            } AS existing
+            RETURN dev.device_id, dev.name, [port IN dev.ports WHERE NOT port.name IN existing | port.name]
+        """, {'plan': plan})
+        for device_id, name, missing in result:
+            if missing:
+                stats['provisioned'][device_id] = {'name': name, 'missing': missing}
+                stats['created'] += len(missing)
+        return stats
+
+    result, _ = db.cypher_query("""
+        UNWIND $plan AS dev
+        MATCH (d:Device) WHERE elementId(d) = dev.device_id
+        WITH d, dev, COLLECT {
+            MATCH (i:Interface)-[:LOCATED_ON]->(d)
+            RETURN apoc.convert.fromJsonMap(i.custom_properties).name
+        } AS existing
+        UNWIND [port IN dev.ports WHERE NOT port.name IN existing] AS port
+        CREATE (i:Interface {custom_properties: apoc.convert.toJson(port)})
+        CREATE (i)-[:LOCATED_ON]->(d)
+        RETURN dev.device_id, dev.name, dev.device_type, count(i)
+    """, {'plan': plan})
+    by_type = {}
+    for device_id, name, device_type, created in result:
+        stats['provisioned'][device_id] = {'name': name, 'created': created}
+        stats['created'] += created
+        by_type[device_type] = by_type.get(device_type, 0) + created
+
+    if stats['created']:
+        devices = [f"{item['name']} ({item['created']})" for item in stats['provisioned'].values()]
+        more = len(devices) - AUDIT_SAMPLE
+        emit_audit(
+            action='create',
+            node_label='Interface',
+            node_id='',
+            node_name=f"{stats['created']} interfaces",
+            user=user,
+            changes=(f"Provisioned {stats['created']} interfaces from Device_Type templates on "
+                     f"{len(devices)} devices (by type: "
+                     f"{', '.join(f'{device_type}: {count}' for device_type, count in sorted(by_type.items()))}; "
+                     f"devices: {', '.join(devices[:AUDIT_SAMPLE])}{f' and {more} more' if more > 0 else ''})"),
+        )
+    return stats
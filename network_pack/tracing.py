@@ -0,0 +1,150 @@
+# feature_packs/network_pack/tracing.py
+
+from django.core.cache import cache
+from neomodel import db
+
+
+TRACE_GENERATION_KEY = 'network_cable_trace:generation'
+TRACE_CACHE_PREFIX = 'network_cable_trace'
+TRACE_CACHE_TIMEOUT = 3600
+MAX_TRACE_LEVELS = 128   # relationship hops explored from the start interface
+MAX_TRACE_NODES = 2000   # nodes loaded per trace; larger subgraphs are reported as truncated
+
+# Labels and relationships whose changes can alter a cached trace
+TRACE_LABELS = ('Interface', 'Cable', 'Device')
+TRACE_REL_TYPES = ('CONNECTS', 'PASSES_THROUGH', 'LOCATED_ON')
+
+
+def _fetch_trace_graph(interface_id):
+    """
+    Every Interface/Cable reachable from ``interface_id`` over CONNECTS and
+    PASSES_THROUGH (front port -> rear port inside a patch panel), with the
+    device of each interface and the links between them, in one bounded query.
+    """
+    result, _ = db.cypher_query("""
+        MATCH (start:Interface) WHERE elementId(start) = $eid
+        CALL apoc.path.subgraphAll(start, {
+            relationshipFilter: 'CONNECTS|PASSES_THROUGH',
+            labelFilter: '+Interface|+Cable',
+            maxLevel: $max_levels,
+            limit: $max_nodes
+        }) YIELD nodes, relationships
+        CALL {
+            WITH nodes
+            UNWIND nodes AS node
+            OPTIONAL MATCH (node)-[:LOCATED_ON]->(device:Device)
+            WITH node, device, apoc.convert.fromJsonMap(node.custom_properties) AS props
+            RETURN collect({
+                id: elementId(node),
+                label: labels(node)[0],
+                name: COALESCE(props.name, props.type, 'Unnamed'),
+                type: props.type,
+                status: props.status,
+                device_id: elementId(device),
+                device_name: apoc.convert.fromJsonMap(device.custom_properties).name
+            }) AS items
+        }
+        RETURN items,
+               [rel IN relationships | [elementId(startNode(rel)), elementId(endNode(rel)), type(rel)]] AS links
+    """, {'eid': interface_id, 'max_levels': MAX_TRACE_LEVELS, 'max_nodes': MAX_TRACE_NODES})
+    if not result:
+        return None, []
+    return result[0][0], result[0][1]
+
+
+def walk_trace(start_id, items, links):
+    """
+    Follow alternating cable / device-internal hops from ``start_id``.
+    Where the path forks (a port on two cables, a rear port fanning out to several
+    front ports) the first option is followed and the fork recorded; revisiting an
+    interface ends the trace as a loop.
+    """
+    nodes = {item['id']: item for item in items}
+    cables = {}     # interface -> cables on it
+    ends = {}       # cable -> interfaces it connects
+    internal = {}   # interface -> interfaces it passes through to (either direction)
+    for start, end, rel_type in links:
+        if rel_type == 'CONNECTS':
+            cables.setdefault(end, []).append(start)
+            ends.setdefault(start, []).append(end)
+        elif rel_type == 'PASSES_THROUGH':
+            internal.setdefault(start, []).append(end)
+            internal.setdefault(end, []).append(start)
+
+    def hop(item):
+        return {key: item.get(key) for key in ('id', 'label', 'name', 'type', 'status', 'device_id', 'device_name')}
+
+    hops = [hop(nodes[start_id])]
+    branches = []
+    visited = {start_id}
+    loop = False
+    current = start_id
+    take_cable = bool(cables.get(start_id))  # without a cable, start through the panel
+
+    while True:
+        if take_cable:
+            options = sorted(cables.get(current, []))
+            if not options:
+                break
+            if len(options) > 1:
+                branches.append({'at': nodes[current]['name'], 'id': current, 'options': len(options)})
+            cable = options[0]
+            hops.append(hop(nodes[cable]))
+            targets = sorted(i for i in ends.get(cable, []) if i != current)
+            branch_at = cable
+        else:
+            targets = sorted(internal.get(current, []))
+            branch_at = current
+        if not targets:
+            break
+        if len(targets) > 1:
+            branches.append({'at': nodes[branch_at]['name'], 'id': branch_at, 'options': len(targets)})
+        nxt = targets[0]
+        if nxt in visited:
+            loop = True
+            hops.append(dict(hop(nodes[nxt]), loop=True))
+            break
+        visited.add(nxt)
+        hops.append(hop(nodes[nxt]))
+        current = nxt
+        take_cable = not take_cable
+
+    far_end = hops[-1] if len(hops) > 1 and hops[-1]['label'] == 'Interface' and not loop else None
+    return {
+        'hops': hops,
+        'far_end': far_end,
+        'cable_count': sum(1 for h in hops if h['label'] == 'Cable'),
+        'loop': loop,
+        'branches': branches,
+        'truncated': len(items) >= MAX_TRACE_NODES,
+    }
+
+
+def _trace_key(interface_id):
+    generation = cache.get(TRACE_GENERATION_KEY) or 0
+    return f'{TRACE_CACHE_PREFIX}:{generation}:{interface_id}'
+
+
+def trace_interface(interface_id):
+    """
+    End-to-end physical path from an interface, cached until any cabling changes.
+    Returns None when the interface does not exist.
+    """
+    key = _trace_key(interface_id)
+    trace = cache.get(key)
+    if trace is not None:
+        return trace
+
+    items, links = _fetch_trace_graph(interface_id)
+    if not items:
+        return None
+    trace = walk_trace(interface_id, items, links)
+    cache.set(key, trace, TRACE_CACHE_TIMEOUT)
+    return trace
+
+
+def invalidate_traces():
+    try:
+        cache.incr(TRACE_GENERATION_KEY)
+    except ValueError:
+        cache.set(TRACE_GENERATION_KEY, 1, None)
@@ -0,0 +1,15 @@
+from django.urls import path
+from . import views
+
+app_name = 'network_pack'
+
+urlpatterns = [
+    path('network/vxlan/vnis/', views.network_vni_list, name='network_vni_list'),
+    path('network/topology/export/', views.network_topology_export, name='network_topology_export'),
+    path('network/interfaces/provision/', views.network_interface_provision, name='network_interface_provision'),
+    path('network/neighbors/import/', views.network_neighbor_import, name='network_neighbor_import'),
+    path('network/circuits/capacity/', views.network_circuit_capacity, name='network_circuit_capacity'),
+    path('network/vlans/', views.network_vlan_inventory, name='network_vlan_inventory'),
+    path('network/vlans/free/', views.network_vlan_free, name='network_vlan_free'),
+    path('network/vlans/<str:element_id>/networks/', views.network_vlan_networks, name='network_vlan_networks'),
+]
@@ -1,14 +1,29 @@
 # feature_packs/network_pack/views.py
 
+import io
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_http_methods
 from neomodel import db
 from cmdb.models import DynamicNode
+from .capacity import ROLLUP_DIMENSIONS, get_capacity_rollups
+from .export import EXPORT_FORMATS, export_topology
+from .neighbors import NEIGHBOR_PARSERS, reconcile_neighbors
+from .provisioning import provision_interfaces
+from .tracing import trace_interface
+from .vlans import (
+    MAX_VLAN_ID, MIN_VLAN_ID, count_vlan_networks, free_vlan_ids, vlan_inventory, vlan_networks_page,
+)
+from .vxlan import count_invalid_vnis, get_vni_mapping, list_vnis
 
 
 def interface_details_tab(request, label, element_id):
     """
     Context builder for Interface Details tab.
-    Shows device it's located on, connected cables, and circuits terminating here.
+    Shows device it's located on, connected cables, the end-to-end cable path,
+    and circuits terminating here.
     Returns context dictionary rather than rendering template directly.
     """
     context = {
@@ -18,6 +33,7 @@ def interface_details_tab(request, label, element_id):
         'custom_data': {
             'device': None,
             'cables': [],
+            'trace': None,
             'circuits': []
         },
         'error': None,
@@ -112,6 +128,9 @@ def interface_details_tab(request, label, element_id):
                 'status': row[5]
             })
 
+        # Follow cables and patch panel pass-throughs to the far end (cached)
+        context['custom_data']['trace'] = trace_interface(element_id)
+
     except Exception as e:
         context['error'] = str(e)
 
@@ -293,7 +312,8 @@ def circuit_details_tab(request, label, element_id):
 def vlan_details_tab(request, label, element_id):
     """
     Context builder for VLAN Details tab.
-    Shows assigned networks (ASSIGNED_TO incoming from Network nodes).
+    Shows the first page of assigned networks (ASSIGNED_TO incoming from Network nodes);
+    further pages load through network_vlan_networks.
     Returns context dictionary rather than rendering template directly.
     """
     context = {
@@ -301,7 +321,10 @@ def vlan_details_tab(request, label, element_id):
         'element_id': element_id,
         'node': None,
         'custom_data': {
-            'networks': []
+            'networks': [],
+            'total_networks': 0,
+            'has_more': False,
+            'next_offset': 0
         },
         'error': None,
     }
@@ -322,32 +345,244 @@ def vlan_details_tab(request, label, element_id):
         node = node_class.inflate(raw_node)
         context['node'] = node
 
-        # Fetch assigned networks (incoming ASSIGNED_TO relationships)
-        networks_query = """
-            MATCH (vlan:VLAN) WHERE elementId(vlan) = $eid
-            MATCH (network:Network)-[:ASSIGNED_TO]->(vlan)
-            WITH network, apoc.convert.fromJsonMap(network.custom_properties) AS net_props
-            RETURN 
-                elementId(network) AS network_id,
-                labels(network)[0] AS network_label,
-                COALESCE(net_props.name, 'Unnamed') AS name,
-                COALESCE(net_props.cidr, 'Unknown') AS cidr,
-                COALESCE(net_props.description, '') AS description,
-                COALESCE(net_props.status, 'Unknown') AS status
-            ORDER BY net_props.name
+        # First page of assigned networks (incoming ASSIGNED_TO relationships)
+        page = vlan_networks_page(element_id, offset=0)
+        context['custom_data'].update(page)
+        context['custom_data']['total_networks'] = count_vlan_networks(element_id)
+
+    except Exception as e:
+        context['error'] = str(e)
+
+    return context
+
+
+def vxlan_details_tab(request, label, element_id):
+    """
+    Context builder for VXLAN Details tab.
+    Shows the VLANs and VRFs the VNI maps to, the devices it is configured on,
+    and other VXLANs reusing the same VNI.
+    Returns context dictionary rather than rendering template directly.
+    """
+    context = {
+        'label': label,
+        'element_id': element_id,
+        'node': None,
+        'custom_data': {
+            'mapping': None
+        },
+        'error': None,
+    }
+
+    try:
+        node_class = DynamicNode.get_or_create_label(label)
+        query = f"""
+            MATCH (n:`{label}`)
+            WHERE elementId(n) = $eid
+            RETURN n
         """
-        networks_result, _ = db.cypher_query(networks_query, {'eid': element_id})
-        for row in networks_result:
-            context['custom_data']['networks'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'cidr': row[3],
-                'description': row[4],
-                'status': row[5]
-            })
+        result, _ = db.cypher_query(query, {'eid': element_id})
+        if not result:
+            context['error'] = f"VXLAN node not found: {element_id}"
+            return context
+
+        raw_node = result[0][0]
+        node = node_class.inflate(raw_node)
+        context['node'] = node
+
+        # VLAN / VRF / device mapping in one query
+        context['custom_data']['mapping'] = get_vni_mapping(element_id)
 
     except Exception as e:
         context['error'] = str(e)
 
     return context
+
+
+@require_http_methods(["GET"])
+def network_vni_list(request):
+    """
+    Fabric-wide VNI table in VNI order, one page per request.
+    Pass the returned ``next_after`` and ``next_after_id`` as ?after= and ?after_id=
+    to fetch the next page (?limit=, max 2000).
+    """
+    try:
+        after = int(request.GET['after']) if request.GET.get('after') else None
+        limit = min(max(int(request.GET.get('limit', 500)), 1), 2000)
+    except ValueError:
+        return JsonResponse({'error': 'after and limit must be integers.'}, status=400)
+    after_id = request.GET.get('after_id') or None
+
+    try:
+        vnis, cursor = list_vnis(after=after, after_id=after_id, limit=limit)
+        payload = {
+            'vnis': vnis,
+            'next_after': cursor['after'] if cursor else None,
+            'next_after_id': cursor['after_id'] if cursor else None,
+        }
+        if after is None:
+            payload['invalid_vni_count'] = count_invalid_vnis()
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse(payload)
+
+
+@require_http_methods(["GET"])
+@login_required
+def network_topology_export(request):
+    """
+    Stream the device/interface/cable/circuit graph as ?format=graphml|json|csv
+    (csv is the edge list). Optional ?site= (id, name or site code), ?role=
+    (device role or device type) and ?logical=1 to add VLAN/VRF/VXLAN membership.
+    """
+    fmt = request.GET.get('format', 'graphml').lower()
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}."}, status=400)
+    content_type, extension = EXPORT_FORMATS[fmt]
+
+    response = StreamingHttpResponse(
+        export_topology(
+            fmt,
+            site=request.GET.get('site') or None,
+            role=request.GET.get('role') or None,
+            logical=request.GET.get('logical') in ('1', 'true', 'yes'),
+        ),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="topology.{extension}"'
+    return response
+
+
+@require_http_methods(["POST"])
+@login_required
+def network_interface_provision(request):
+    """
+    Create missing interfaces from Device_Type interface templates.
+    Targets every ``device_id`` and every device of each ``device_type_id`` posted
+    (both may repeat); ``dry_run=1`` lists the missing ports without creating them.
+    """
+    device_ids = request.POST.getlist('device_id')
+    device_type_ids = request.POST.getlist('device_type_id')
+    if not device_ids and not device_type_ids:
+        return JsonResponse({'error': 'Provide at least one device_id or device_type_id.'}, status=400)
+    dry_run = request.POST.get('dry_run') in ('1', 'true', 'yes')
+
+    try:
+        stats = provision_interfaces(
+            device_ids, device_type_ids, dry_run=dry_run,
+            user=request.user.username if request.user.is_authenticated else 'System',
+        )
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse(dict(stats, dry_run=dry_run))
+
+
+@require_http_methods(["POST"])
+@login_required
+def network_neighbor_import(request):
+    """
+    Reconcile cabling against an uploaded LLDP/CDP neighbor table (format=csv or json).
+    ``dry_run=1`` returns the diff without writing; ``prune=1`` also removes cables on
+    reporting devices that no neighbor entry confirms.
+    """
+    fmt = request.POST.get('format', request.GET.get('format', 'json')).lower()
+    if fmt not in NEIGHBOR_PARSERS:
+        return JsonResponse({'error': f"Unsupported neighbor table format: {fmt}"}, status=400)
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'No neighbor table uploaded.'}, status=400)
+
+    try:
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8', errors='replace')
+        stats = reconcile_neighbors(
+            NEIGHBOR_PARSERS[fmt](lines),
+            dry_run=request.POST.get('dry_run') in ('1', 'true', 'yes'),
+            prune=request.POST.get('prune') in ('1', 'true', 'yes'),
+            user=request.user.username if request.user.is_authenticated else 'System',
+        )
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse(stats)
+
+
+@require_http_methods(["GET"])
+def network_circuit_capacity(request):
+    """
+    Circuit bandwidth rolled up by vendor, site and type (?by= one of them to return
+    only that dimension). Cached until a circuit, vendor or site changes.
+    """
+    by = request.GET.get('by')
+    if by and by not in ROLLUP_DIMENSIONS:
+        return JsonResponse({'error': f"by must be one of: {', '.join(ROLLUP_DIMENSIONS)}."}, status=400)
+
+    try:
+        rollups = get_capacity_rollups()
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    if by:
+        rollups = {'total': rollups['total'], by: rollups[by]}
+    return JsonResponse(rollups)
+
+
+@require_http_methods(["GET"])
+def network_vlan_networks(request, element_id):
+    """
+    HTMX endpoint returning a page of network rows for the VLAN tab.
+    """
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        offset = 0
+
+    context = {
+        'element_id': element_id,
+        'networks': [],
+        'has_more': False,
+        'next_offset': 0,
+        'first_page': offset == 0,
+        'error': None,
+    }
+    try:
+        context.update(vlan_networks_page(element_id, offset=offset))
+    except Exception as exc:
+        context['error'] = str(exc)
+
+    return render(request, 'network_pack/partials/vlan_network_rows.html', context)
+
+
+@require_http_methods(["GET"])
+def network_vlan_inventory(request):
+    """
+    Every VLAN with its network and device counts (?site= id, name or site code
+    to restrict to one site's VLANs plus the global ones).
+    """
+    try:
+        vlans = vlan_inventory(site=request.GET.get('site') or None)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse({'vlans': vlans, 'count': len(vlans)})
+
+
+@require_http_methods(["GET"])
+def network_vlan_free(request):
+    """
+    Free VLAN IDs in a scope: ?site= (omit for IDs free in every site), ?count= IDs
+    to suggest (default 1, max 4094), and an optional ?start=/?end= window.
+    """
+    try:
+        count = min(max(int(request.GET.get('count', 1)), 1), MAX_VLAN_ID)
+        start = int(request.GET.get('start', MIN_VLAN_ID))
+        end = int(request.GET.get('end', MAX_VLAN_ID))
+    except ValueError:
+        return JsonResponse({'error': 'count, start and end must be integers.'}, status=400)
+    if not MIN_VLAN_ID <= start <= end <= MAX_VLAN_ID:
+        return JsonResponse({'error': f'start and end must satisfy {MIN_VLAN_ID} <= start <= end <= {MAX_VLAN_ID}.'},
+                            status=400)
+
+    try:
+        free = free_vlan_ids(site=request.GET.get('site') or None, count=count, start=start, end=end)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse(free)
@@ -0,0 +1,170 @@
+# feature_packs/network_pack/vlans.py
+
+from neomodel import db
+
+
+NETWORK_PAGE_SIZE = 50
+MIN_VLAN_ID = 1
+MAX_VLAN_ID = 4094  # 802.1Q; 0 and 4095 are reserved
+
+# A VLAN is scoped to the Site(s) it is LOCATED_IN; VLANs without a site are
+# global and occupy their ID in every site.
+SITE_MATCH = """
+    elementId(site) = $site
+    OR toLower(apoc.convert.fromJsonMap(site.custom_properties).name) = toLower($site)
+    OR toLower(apoc.convert.fromJsonMap(site.custom_properties).site_code) = toLower($site)
+"""
+
+
+def vlan_networks_page(vlan_id, offset=0, limit=NETWORK_PAGE_SIZE):
+    """
+    One page of the Networks assigned to a VLAN, ordered by name.
+    """
+    result, _ = db.cypher_query("""
+        MATCH (vlan:VLAN) WHERE elementId(vlan) = $eid
+        MATCH (network:Network)-[:ASSIGNED_TO]->(vlan)
+        WITH network, apoc.convert.fromJsonMap(network.custom_properties) AS net_props
+        ORDER BY net_props.name, elementId(network)
+        SKIP $offset
+        LIMIT $limit
+        RETURN
+            elementId(network) AS network_id,
+            labels(network)[0] AS network_label,
+            COALESCE(net_props.name, 'Unnamed') AS name,
+            COALESCE(net_props.cidr, 'Unknown') AS cidr,
+            COALESCE(net_props.description, '') AS description,
+            COALESCE(net_props.status, 'Unknown') AS status
+    """, {
+        'eid': vlan_id,
+        'offset': offset,
+        # Fetch one extra row to know whether another page exists
+        'limit': limit + 1,
+    })
+    networks = [
+        {
+            'id': row[0],
+            'label': row[1],
+            'name': row[2],
+            'cidr': row[3],
+            'description': row[4],
+            'status': row[5]
+        }
+        for row in result[:limit]
+    ]
+    return {
+        'networks': networks,
+        'has_more': len(result) > limit,
+        'next_offset': offset + limit,
+    }
+
+
+def count_vlan_networks(vlan_id):
+    result, _ = db.cypher_query("""
+        MATCH (vlan:VLAN) WHERE elementId(vlan) = $eid
+        RETURN COUNT { (:Network)-[:ASSIGNED_TO]->(vlan) }
+    """, {'eid': vlan_id})
+    return result[0][0] if result else 0
+
+
+def vlan_inventory(site=None):
+    """
+    Every VLAN (optionally only those of one site, global VLANs included) with its
+    network count and the number of distinct devices carrying it, in one aggregate
+    query. A device carries a VLAN when an interface holds an address in one of
+    its networks or a VXLAN mapped to it is configured on the device.
+    """
+    result, _ = db.cypher_query(f"""
+        MATCH (vlan:VLAN)
+        WHERE $site IS NULL
+           OR NOT EXISTS {{ (vlan)-[:LOCATED_IN]->(:Site) }}
+           OR EXISTS {{ MATCH (vlan)-[:LOCATED_IN]->(site:Site) WHERE {SITE_MATCH} }}
+        WITH vlan, apoc.convert.fromJsonMap(vlan.custom_properties) AS props
+        RETURN elementId(vlan), toIntegerOrNull(toString(props.vlan_id)), COALESCE(props.name, 'Unnamed'),
+               props.status,
+               COLLECT {{
+                   MATCH (vlan)-[:LOCATED_IN]->(site:Site)
+                   RETURN {{id: elementId(site), name: apoc.convert.fromJsonMap(site.custom_properties).name}}
+               }},
+               COUNT {{ (:Network)-[:ASSIGNED_TO]->(vlan) }},
+               size(COLLECT {{
+                   MATCH (vlan)<-[:ASSIGNED_TO]-(:Network)<-[:PART_OF]-(:IP_Address)-[:ASSIGNED_TO]->(:Mac_Address)
+                         -[:ASSIGNED_TO]->(:Interface)-[:LOCATED_ON]->(device:Device)
+                   RETURN device
+                   UNION
+                   MATCH (vlan)<-[:MAPS_TO]-(:VXLAN)-[:CONFIGURED_ON]->(device:Device)
+                   RETURN device
+               }})
+        ORDER BY toIntegerOrNull(toString(props.vlan_id)), props.name
+    """, {'site': site})
+    return [
+        {
+            'id': row[0],
+            'vlan_id': row[1],
+            'name': row[2],
+            'status': row[3],
+            'sites': row[4],
+            'network_count': row[5],
+            'device_count': row[6],
+        }
+        for row in result
+    ]
+
+
+def _used_vlan_ids(site):
+    result, _ = db.cypher_query(f"""
+        MATCH (vlan:VLAN)
+        WHERE $site IS NULL
+           OR NOT EXISTS {{ (vlan)-[:LOCATED_IN]->(:Site) }}
+           OR EXISTS {{ MATCH (vlan)-[:LOCATED_IN]->(site:Site) WHERE {SITE_MATCH} }}
+        WITH toIntegerOrNull(toString(apoc.convert.fromJsonMap(vlan.custom_properties).vlan_id)) AS vid
+        WHERE vid >= $min_id AND vid <= $max_id
+        RETURN DISTINCT vid
+    """, {'site': site, 'min_id': MIN_VLAN_ID, 'max_id': MAX_VLAN_ID})
+    return [row[0] for row in result]
+
+
+def _bit_ranges(bits, start, end):
+    """
+    Runs of set bits between ``start`` and ``end`` as [first, last] pairs.
+    """
+    ranges = []
+    vid = start
+    while vid <= end:
+        if bits >> vid & 1:
+            first = vid
+            while vid + 1 <= end and bits >> (vid + 1) & 1:
+                vid += 1
+            ranges.append([first, vid])
+        vid += 1
+    return ranges
+
+
+def free_vlan_ids(site=None, count=1, start=MIN_VLAN_ID, end=MAX_VLAN_ID):
+    """
+    Unused VLAN IDs in a scope, from a bitset of the 4094 IDs. With a site, the
+    site's VLANs and every global VLAN are in use; without one, every VLAN anywhere
+    is, so the IDs returned are free in all sites. Returns the first ``count`` free
+    IDs in [start, end] plus all free ranges.
+    """
+    used = 0
+    for vid in _used_vlan_ids(site):
+        used |= 1 << vid
+    window = ((1 << (end + 1)) - 1) ^ ((1 << start) - 1)
+    free = window & ~used
+
+    first_free = []
+    remaining = free
+    while remaining and len(first_free) < count:
+        lowest = remaining & -remaining
+        first_free.append(lowest.bit_length() - 1)
+        remaining ^= lowest
+
+    return {
+        'site': site,
+        'start': start,
+        'end': end,
+        'used_count': bin(window & used).count('1'),
+        'free_count': bin(free).count('1'),
+        'first_free': first_free,
+        'free_ranges': _bit_ranges(free, start, end),
+    }
@@ -0,0 +1,117 @@
+# feature_packs/network_pack/vxlan.py
+
+from django.core.cache import cache
+from neomodel import db
+
+
+VNI_INDEX_READY_KEY = 'network_vni_index:ready'
+MAX_VNI = 16777215  # 24-bit VXLAN network identifier
+DEVICE_SAMPLE = 20  # devices listed per VNI in the fabric listing; device_count is exact
+
+
+def ensure_vni_index():
+    """
+    Index VXLANs on a native integer ``vxlan_vni`` copied from the JSON ``vni``
+    property, backfilling nodes created before the index existed. Runs once per
+    cache lifetime; the audit hook keeps the copy in sync afterwards.
+    """
+    if cache.get(VNI_INDEX_READY_KEY):
+        return
+    db.cypher_query("CREATE INDEX network_vxlan_vni IF NOT EXISTS FOR (x:VXLAN) ON (x.vxlan_vni)")
+    db.cypher_query("""
+        MATCH (x:VXLAN) WHERE x.vxlan_vni IS NULL
+        WITH x, toIntegerOrNull(apoc.convert.fromJsonMap(x.custom_properties).vni) AS vni
+        WHERE vni >= 1 AND vni <= $max_vni
+        SET x.vxlan_vni = vni
+    """, {'max_vni': MAX_VNI})
+    cache.set(VNI_INDEX_READY_KEY, True, None)
+
+
+def sync_vni(node_id):
+    """
+    Refresh the native ``vxlan_vni`` of one VXLAN after it was created or edited.
+    """
+    db.cypher_query("""
+        MATCH (x:VXLAN) WHERE elementId(x) = $eid
+        WITH x, toIntegerOrNull(apoc.convert.fromJsonMap(x.custom_properties).vni) AS vni
+        SET x.vxlan_vni = CASE WHEN vni >= 1 AND vni <= $max_vni THEN vni END
+    """, {'eid': node_id, 'max_vni': MAX_VNI})
+
+
+def _fetch_vni_rows(where, params, order_limit=''):
+    """
+    VXLANs matching ``where`` with their VLANs, VRFs and devices, in one query.
+    """
+    result, _ = db.cypher_query(f"""
+        MATCH (x:VXLAN) WHERE {where}
+        WITH x {order_limit}
+        WITH x, apoc.convert.fromJsonMap(x.custom_properties) AS props
+        RETURN elementId(x), x.vxlan_vni, props.vni, COALESCE(props.name, 'Unnamed'), props.description,
+               [(x)-[:MAPS_TO]->(vlan:VLAN) | {{
+                   id: elementId(vlan),
+                   name: COALESCE(apoc.convert.fromJsonMap(vlan.custom_properties).name, 'Unnamed'),
+                   vlan_id: apoc.convert.fromJsonMap(vlan.custom_properties).vlan_id
+               }}],
+               [(x)-[:MEMBER_OF]->(vrf:VRF) | {{
+                   id: elementId(vrf),
+                   name: COALESCE(apoc.convert.fromJsonMap(vrf.custom_properties).name, 'Unnamed'),
+                   rd: apoc.convert.fromJsonMap(vrf.custom_properties).rd
+               }}],
+               [(x)-[:CONFIGURED_ON]->(device:Device) | {{
+                   id: elementId(device),
+                   name: COALESCE(apoc.convert.fromJsonMap(device.custom_properties).name, 'Unnamed')
+               }}][..$device_sample],
+               COUNT {{ (x)-[:CONFIGURED_ON]->(:Device) }},
+               COLLECT {{ MATCH (other:VXLAN {{vxlan_vni: x.vxlan_vni}}) WHERE other <> x RETURN elementId(other) }}
+    """, dict(params, device_sample=params.get('device_sample', DEVICE_SAMPLE)))
+    return [
+        {
+            'id': row[0],
+            'vni': row[1] if row[1] is not None else row[2],
+            'name': row[3],
+            'description': row[4] or '',
+            'type': 'L3' if row[6] and not row[5] else 'L2',
+            'vlans': row[5],
+            'vrfs': row[6],
+            'devices': row[7],
+            'device_count': row[8],
+            'duplicate_ids': row[9],
+        }
+        for row in result
+    ]
+
+
+def get_vni_mapping(vxlan_id, device_limit=1000):
+    """
+    VLAN/VRF/device mapping of one VXLAN, plus other VXLANs reusing its VNI.
+    """
+    ensure_vni_index()
+    rows = _fetch_vni_rows("elementId(x) = $eid", {'eid': vxlan_id, 'device_sample': device_limit})
+    return rows[0] if rows else None
+
+
+def list_vnis(after=None, after_id=None, limit=500):
+    """
+    One page of the fabric-wide VNI table in (VNI, elementId) order, via the native
+    index. ``after`` / ``after_id`` are the VNI and id of the last row of the previous
+    page, so VXLANs reusing a VNI across a page boundary are not skipped. VXLANs whose
+    VNI is missing or invalid are not listed here (see ``count_invalid_vnis``).
+    """
+    ensure_vni_index()
+    if after_id is None:
+        where = "x.vxlan_vni > $after"
+    else:
+        where = "x.vxlan_vni > $after OR (x.vxlan_vni = $after AND elementId(x) > $after_id)"
+    rows = _fetch_vni_rows(
+        where,
+        {'after': after if after is not None else 0, 'after_id': after_id, 'limit': limit},
+        order_limit="ORDER BY x.vxlan_vni, elementId(x) LIMIT $limit",
+    )
+    if len(rows) < limit:
+        return rows, None
+    return rows, {'after': rows[-1]['vni'], 'after_id': rows[-1]['id']}
+
+
+def count_invalid_vnis():
+    result, _ = db.cypher_query("MATCH (x:VXLAN) WHERE x.vxlan_vni IS NULL RETURN count(x)")
+    return result[0][0] if result else 0
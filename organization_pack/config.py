@@ -5,6 +5,13 @@ FEATURE_PACK_CONFIG = {
     'version': '1.0.0',
     'applies_to_labels': ['Person', 'Department', 'Site', 'Building'],
     'dependencies': [],
+    'hooks': {
+        'audit': 'organization_pack.hooks.register_hooks'
+    },
+    'urls': {
+        'prefix': '',
+        'module': 'organization_pack.urls'
+    },
     'tabs': [
         {
             'id': 'person_details',
@@ -0,0 +1,135 @@
+# feature_packs/organization_pack/headcount.py
+
+from django.core.cache import cache
+from neomodel import db
+
+
+HEADCOUNT_READY_KEY = 'organization_headcount:ready'
+MAX_DEPARTMENT_DEPTH = 32
+MEMBER_PAGE_SIZE = 50
+
+# Departments carry two native counts kept current by the audit hook:
+#   headcount_direct - people who WORK_IN the department
+#   headcount_total  - headcount_direct plus the totals of its sub-departments
+#                      (Departments PART_OF it); someone working in two departments
+#                      of the same subtree is counted in both.
+
+
+def refresh_department_headcounts(department_ids):
+    """
+    Recount the direct headcount of ``department_ids`` and roll the totals up
+    through every ancestor in one query. Ancestors are ordered by their longest
+    distance from a changed department, so a parent is always written after its
+    children and each row of the CALL sees the totals written before it.
+    """
+    if not department_ids:
+        return
+    db.cypher_query(f"""
+        UNWIND $ids AS did
+        MATCH (d:Department) WHERE elementId(d) = did
+        SET d.headcount_direct = COUNT {{ (:Person)-[:WORKS_IN]->(d) }}
+        WITH collect(d) AS changed
+        UNWIND changed AS d
+        MATCH path = (d)-[:PART_OF*0..{MAX_DEPARTMENT_DEPTH}]->(ancestor:Department)
+        WITH ancestor, max(length(path)) AS distance
+        ORDER BY distance
+        WITH collect(ancestor) AS ancestors
+        UNWIND ancestors AS ancestor
+        CALL {{
+            WITH ancestor
+            SET ancestor.headcount_direct = COALESCE(ancestor.headcount_direct,
+                                                     COUNT {{ (:Person)-[:WORKS_IN]->(ancestor) }})
+            SET ancestor.headcount_total = ancestor.headcount_direct + COALESCE(COLLECT {{
+                MATCH (child:Department)-[:PART_OF]->(ancestor) WHERE child <> ancestor
+                RETURN sum(COALESCE(child.headcount_total, child.headcount_direct, 0))
+            }}[0], 0)
+        }}
+    """, {'ids': list(department_ids)})
+
+
+def refresh_headcounts():
+    """
+    Consistency pass for changes the hook cannot pin to a department (deleted
+    people or departments, bulk imports): finds every department whose direct
+    count or total no longer adds up and rolls the fixes up through its ancestors.
+    Returns the number of departments found out of date.
+    """
+    result, _ = db.cypher_query("""
+        MATCH (d:Department)
+        WITH d, COUNT { (:Person)-[:WORKS_IN]->(d) } AS direct,
+             COALESCE(COLLECT {
+                 MATCH (child:Department)-[:PART_OF]->(d) WHERE child <> d
+                 RETURN sum(COALESCE(child.headcount_total, 0))
+             }[0], 0) AS below
+        WHERE d.headcount_direct IS NULL OR d.headcount_direct <> direct
+           OR d.headcount_total IS NULL OR d.headcount_total <> direct + below
+        RETURN elementId(d)
+    """)
+    changed = [row[0] for row in result]
+    refresh_department_headcounts(changed)
+    return len(changed)
+
+
+def ensure_headcounts():
+    """
+    Compute headcounts once for departments created before they were maintained.
+    """
+    if cache.get(HEADCOUNT_READY_KEY):
+        return
+    refresh_headcounts()
+    cache.set(HEADCOUNT_READY_KEY, True, None)
+
+
+def department_headcount(department_id):
+    ensure_headcounts()
+    result, _ = db.cypher_query("""
+        MATCH (d:Department) WHERE elementId(d) = $eid
+        RETURN d.headcount_direct, d.headcount_total,
+               COUNT { (child:Department)-[:PART_OF]->(d) WHERE child <> d }
+    """, {'eid': department_id})
+    if not result:
+        return None
+    direct, total, sub_departments = result[0]
+    return {'direct': direct or 0, 'total': total or direct or 0, 'sub_departments': sub_departments}
+
+
+def department_members_page(department_id, offset=0, limit=MEMBER_PAGE_SIZE):
+    """
+    One page of the people who work in a department, ordered by name.
+    """
+    result, _ = db.cypher_query("""
+        MATCH (dept:Department) WHERE elementId(dept) = $eid
+        MATCH (person:Person)-[:WORKS_IN]->(dept)
+        WITH person, apoc.convert.fromJsonMap(person.custom_properties) AS person_props
+        ORDER BY person_props.name, elementId(person)
+        SKIP $offset
+        LIMIT $limit
+        RETURN
+            elementId(person) AS person_id,
+            labels(person)[0] AS person_label,
+            COALESCE(person_props.name, 'Unnamed') AS name,
+            COALESCE(person_props.title, '') AS title,
+            COALESCE(person_props.email, '') AS email,
+            COALESCE(person_props.status, 'Unknown') AS status
+    """, {
+        'eid': department_id,
+        'offset': offset,
+        # Fetch one extra row to know whether another page exists
+        'limit': limit + 1,
+    })
+    members = [
+        {
+            'id': row[0],
+            'label': row[1],
+            'name': row[2],
+            'title': row[3],
+            'email': row[4],
+            'status': row[5]
+        }
+        for row in result[:limit]
+    ]
+    return {
+        'team_members': members,
+        'has_more': len(result) > limit,
+        'next_offset': offset + limit,
+    }
@@ -0,0 +1,71 @@
+from .headcount import refresh_department_headcounts, refresh_headcounts
+from .locations import (
+    INVENTORY_LABELS,
+    INVENTORY_REL_TYPES,
+    LOCATION_LABELS,
+    invalidate_location_inventory,
+    orphaned_locations,
+    refresh_location_position,
+)
+from .orgchart import orphaned_reports, refresh_org_position
+
+
+def track_organization_changes(action, node_label, node_id, node_name=None, user=None, changes=None,
+                               relationship_type=None, target_label=None, target_id=None, **kwargs):
+    """
+    Keep the materialized REPORTS_TO paths current: re-place both ends of a
+    changed REPORTS_TO edge, place new people, and re-root the reports of a
+    deleted person. Recount department headcounts when WORKS_IN or
+    department PART_OF edges change, or a person or department is deleted.
+    Re-place locations whose LOCATED_IN / PART_OF edges change and drop the
+    cached inventory counts when anything moves between locations.
+    Each subsystem runs on its own, so one failing does not leave the others stale.
+    """
+    for name, step in (('headcounts', _track_headcounts), ('locations', _track_locations),
+                       ('org chart', _track_org_chart)):
+        try:
+            step(action, node_label, node_id, relationship_type, target_label, target_id)
+        except Exception as exc:
+            print(f"Error tracking organization change ({name}): {exc}")
+
+
+def _track_headcounts(action, node_label, node_id, relationship_type, target_label, target_id):
+    if relationship_type in ('WORKS_IN', 'PART_OF'):
+        refresh_department_headcounts([
+            element_id for element_id, element_label in ((node_id, node_label), (target_id, target_label))
+            if element_label == 'Department' and element_id
+        ])
+    elif node_label in ('Person', 'Department') and relationship_type is None and action == 'delete':
+        refresh_headcounts()
+
+
+def _track_locations(action, node_label, node_id, relationship_type, target_label, target_id):
+    if node_label in LOCATION_LABELS:
+        if relationship_type in ('LOCATED_IN', 'PART_OF'):
+            refresh_location_position(node_id)
+        elif relationship_type is None and action == 'delete':
+            for location_id in orphaned_locations(node_id):
+                refresh_location_position(location_id)
+        elif relationship_type is None and action == 'create':
+            refresh_location_position(node_id)
+    if node_label in INVENTORY_LABELS and (
+        relationship_type in INVENTORY_REL_TYPES or (relationship_type is None and action in ('create', 'delete'))
+    ):
+        invalidate_location_inventory()
+
+
+def _track_org_chart(action, node_label, node_id, relationship_type, target_label, target_id):
+    if relationship_type == 'REPORTS_TO':
+        for person_id in (node_id, target_id):
+            if person_id:
+                refresh_org_position(person_id)
+    elif node_label == 'Person' and relationship_type is None:
+        if action == 'delete':
+            for report_id in orphaned_reports(node_id):
+                refresh_org_position(report_id)
+        elif action == 'create':
+            refresh_org_position(node_id)
+
+
+def register_hooks(register_audit_hook):
+    register_audit_hook(track_organization_changes)
@@ -0,0 +1,323 @@
+# feature_packs/organization_pack/locations.py
+
+from django.core.cache import cache
+from neomodel import db
+
+
+LOCATION_INDEX_READY_KEY = 'organization_locations:ready'
+INVENTORY_GENERATION_KEY = 'organization_location_inventory:generation'
+INVENTORY_CACHE_PREFIX = 'organization_location_inventory'
+INVENTORY_CACHE_TIMEOUT = 3600
+WRITE_BATCH_SIZE = 5000
+DESCENDANT_PAGE_SIZE = 100
+
+# Location labels from the top of the hierarchy down; Row, Rack and Rack_Unit
+# come from data_center_pack. A location's parent is the nearest higher-ranked
+# location it is LOCATED_IN (or, for Rack_Unit, PART_OF), so the hierarchy can
+# skip levels (a Rack directly in a Room) but never forms a cycle.
+LOCATION_LABELS = ('Site', 'Building', 'Floor', 'Room', 'Row', 'Rack', 'Rack_Unit')
+LOCATION_RANKS = '{' + ', '.join(f'{label}: {rank}' for rank, label in enumerate(LOCATION_LABELS)) + '}'
+
+# Each location carries its chain as a materialized path of elementIds, site
+# first: location_path = "/<site>/<building>/.../<self>/". Everything inside a
+# location is an indexed prefix scan per label, and its ancestors are the path.
+
+# Relationships and labels whose changes alter inventory counts
+INVENTORY_REL_TYPES = ('LOCATED_IN', 'PART_OF')
+INVENTORY_LABELS = LOCATION_LABELS + ('Device', 'Person')
+
+
+def _rank(var):
+    return f"[label IN labels({var}) WHERE label IN keys({LOCATION_RANKS}) | {LOCATION_RANKS}[label]][0]"
+
+
+def _primary_parent(var):
+    return f"""head(COLLECT {{
+        MATCH ({var})-[:LOCATED_IN|PART_OF]->(parent)
+        WITH parent, {_rank('parent')} AS parent_rank
+        WHERE parent_rank < {_rank(var)}
+        RETURN elementId(parent) AS parent_id ORDER BY parent_rank DESC, parent_id
+    }})"""
+
+
+def _locations_where(where, labels=LOCATION_LABELS):
+    """
+    A CALL body returning every location node ``n`` matching ``where``, one
+    indexed lookup per label.
+    """
+    return '\nUNION\n'.join(f"MATCH (n:{label}) WHERE {where} RETURN n" for label in labels)
+
+
+def _location_label(var):
+    return f"[label IN labels({var}) WHERE label IN keys({LOCATION_RANKS})][0]"
+
+
+def _location_name(props):
+    return (f"COALESCE({props}.name, toString({props}.floor_number), "
+            f"toString({props}.unit_number), 'Unnamed')")
+
+
+def ensure_location_index():
+    """
+    Index the materialized location paths and build them for locations created
+    before the index existed. Runs once per cache lifetime; the audit hook keeps
+    paths current afterwards.
+    """
+    if cache.get(LOCATION_INDEX_READY_KEY):
+        return
+    missing = False
+    for label in LOCATION_LABELS:
+        name = label.lower()
+        db.cypher_query(f"CREATE INDEX organization_{name}_location_path IF NOT EXISTS "
+                        f"FOR (n:{label}) ON (n.location_path)")
+        db.cypher_query(f"CREATE INDEX organization_{name}_location_parent IF NOT EXISTS "
+                        f"FOR (n:{label}) ON (n.location_parent_id)")
+        result, _ = db.cypher_query(f"MATCH (n:{label}) WHERE n.location_path IS NULL RETURN count(n) > 0")
+        missing = missing or bool(result and result[0][0])
+    if missing:
+        rebuild_location_paths()
+    cache.set(LOCATION_INDEX_READY_KEY, True, None)
+
+
+def _write_paths(rows):
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        db.cypher_query("""
+            UNWIND $rows AS row
+            MATCH (n) WHERE elementId(n) = row.id
+            SET n.location_path = row.path, n.location_depth = row.depth, n.location_parent_id = row.parent
+        """, {'rows': rows[start:start + WRITE_BATCH_SIZE]})
+
+
+def rebuild_location_paths():
+    """
+    Recompute every location's path from the LOCATED_IN / PART_OF graph. Returns the number of locations written.
+    """
+    result, _ = db.cypher_query(f"""
+        CALL {{
+            {_locations_where('true')}
+        }}
+        RETURN elementId(n), {_rank('n')}, {_primary_parent('n')}
+    """)
+    paths = {}
+    rows = []
+    # A parent always ranks above its children, so it is placed first
+    for location_id, _, parent_id in sorted(result, key=lambda row: (row[1], row[0])):
+        parent_path = paths.get(parent_id)
+        path = f"{parent_path or '/'}{location_id}/"
+        paths[location_id] = path
+        rows.append({'id': location_id, 'path': path, 'depth': path.count('/') - 2,
+                     'parent': parent_id if parent_path else None})
+
+    _write_paths(rows)
+    invalidate_location_inventory()
+    return len(rows)
+
+
+def refresh_location_position(location_id, _depth=0):
+    """
+    Re-place one location after its LOCATED_IN / PART_OF edges changed: the paths
+    of the location and everything inside it move to the new prefix.
+    """
+    result, _ = db.cypher_query(f"""
+        MATCH (n) WHERE elementId(n) = $eid AND {_rank('n')} IS NOT NULL
+        WITH n, {_primary_parent('n')} AS parent_id
+        OPTIONAL MATCH (parent) WHERE elementId(parent) = parent_id
+        RETURN n.location_path, parent_id, parent.location_path
+    """, {'eid': location_id})
+    if not result:
+        return
+    old_path, parent_id, parent_path = result[0]
+
+    if parent_id and parent_path is None and _depth < len(LOCATION_LABELS):
+        refresh_location_position(parent_id, _depth + 1)
+        return refresh_location_position(location_id, _depth + 1)
+
+    new_path = f"{parent_path if parent_id and parent_path else '/'}{location_id}/"
+    parent_id = parent_id if parent_path else None
+    if old_path == new_path:
+        return
+    if old_path is None:
+        _write_paths([{'id': location_id, 'path': new_path, 'depth': new_path.count('/') - 2, 'parent': parent_id}])
+        # Anything already inside it was placed as a root; move it under the new path
+        children, _ = db.cypher_query("""
+            MATCH (child)-[:LOCATED_IN|PART_OF]->(n) WHERE elementId(n) = $eid
+            RETURN DISTINCT elementId(child)
+        """, {'eid': location_id})
+        for (child_id,) in children:
+            refresh_location_position(child_id, _depth + 1)
+        return
+    db.cypher_query(f"""
+        CALL {{
+            {_locations_where('n.location_path STARTS WITH $old_path')}
+        }}
+        WITH n, n.location_depth - $old_depth AS relative_depth
+        SET n.location_path = $new_path + substring(n.location_path, size($old_path)),
+            n.location_depth = $new_depth + relative_depth
+        WITH n WHERE elementId(n) = $eid
+        SET n.location_parent_id = $parent_id
+    """, {
+        'eid': location_id,
+        'old_path': old_path,
+        'old_depth': old_path.count('/') - 2,
+        'new_path': new_path,
+        'new_depth': new_path.count('/') - 2,
+        'parent_id': parent_id,
+    })
+
+
+def orphaned_locations(location_id):
+    """
+    Locations whose recorded parent is ``location_id`` (e.g. after that location was deleted).
+    """
+    result, _ = db.cypher_query(f"""
+        CALL {{
+            {_locations_where('n.location_parent_id = $eid')}
+        }}
+        RETURN elementId(n)
+    """, {'eid': location_id})
+    return [row[0] for row in result]
+
+
+def _location_path(location_id):
+    ensure_location_index()
+    result, _ = db.cypher_query("""
+        MATCH (n) WHERE elementId(n) = $eid
+        RETURN n.location_path
+    """, {'eid': location_id})
+    return result[0][0] if result else None
+
+
+def location_ancestors(location_id):
+    """
+    The locations containing this one, from its site down to its direct parent.
+    """
+    path = _location_path(location_id)
+    ids = path.strip('/').split('/')[:-1] if path else []
+    if not ids:
+        return []
+    result, _ = db.cypher_query(f"""
+        UNWIND range(0, size($ids) - 1) AS position
+        MATCH (n) WHERE elementId(n) = $ids[position]
+        WITH n, position, apoc.convert.fromJsonMap(n.custom_properties) AS props
+        RETURN elementId(n), {_location_label('n')}, {_location_name('props')}
+        ORDER BY position
+    """, {'ids': ids})
+    return [{'id': row[0], 'label': row[1], 'name': row[2]} for row in result]
+
+
+def location_descendants(location_id, label=None, offset=0, limit=DESCENDANT_PAGE_SIZE):
+    """
+    Everything inside a location (optionally only one label), depth first, one page at a time.
+    """
+    if label is not None and label not in LOCATION_LABELS:
+        raise ValueError(f"label must be one of: {', '.join(LOCATION_LABELS)}")
+    path = _location_path(location_id)
+    if not path:
+        return {'locations': [], 'has_more': False, 'next_offset': offset}
+    labels = (label,) if label else LOCATION_LABELS
+    result, _ = db.cypher_query(f"""
+        CALL {{
+            {_locations_where('n.location_path STARTS WITH $prefix AND n.location_path <> $prefix', labels)}
+        }}
+        WITH n ORDER BY n.location_path SKIP $offset LIMIT $limit
+        WITH n, apoc.convert.fromJsonMap(n.custom_properties) AS props
+        RETURN elementId(n), {_location_label('n')}, {_location_name('props')},
+               n.location_depth, n.location_parent_id
+        ORDER BY n.location_path
+    """, {'prefix': path, 'offset': offset, 'limit': limit + 1})
+    locations = [
+        {'id': row[0], 'label': row[1], 'name': row[2], 'depth': row[3], 'parent_id': row[4]}
+        for row in result[:limit]
+    ]
+    return {'locations': locations, 'has_more': len(result) > limit, 'next_offset': offset + limit}
+
+
+def _inventory(location_counts, devices, people):
+    counts = dict.fromkeys(LOCATION_LABELS[1:], 0)
+    counts.update(location_counts)
+    return {'locations': counts, 'devices': devices, 'people': people}
+
+
+def compute_location_inventory(location_id):
+    """
+    Counts of everything inside a location: locations by label, plus the distinct
+    devices and people LOCATED_IN any of them (or in the location itself).
+    """
+    path = _location_path(location_id)
+    if not path:
+        return None
+    result, _ = db.cypher_query(f"""
+        CALL {{
+            {_locations_where('n.location_path STARTS WITH $prefix')}
+        }}
+        WITH collect(n) AS nodes,
+             collect(CASE WHEN n.location_path <> $prefix THEN {_location_label('n')} END) AS labels
+        RETURN apoc.coll.frequenciesAsMap(labels),
+               size(COLLECT {{ UNWIND nodes AS n MATCH (device:Device)-[:LOCATED_IN]->(n) RETURN DISTINCT device }}),
+               size(COLLECT {{ UNWIND nodes AS n MATCH (person:Person)-[:LOCATED_IN]->(n) RETURN DISTINCT person }})
+    """, {'prefix': path})
+    if not result:
+        return _inventory({}, 0, 0)
+    counts, devices, people = result[0]
+    return _inventory(counts or {}, devices, people)
+
+
+def compute_site_inventories():
+    """
+    Inventory counts for every site, in one query grouped by the first element of each location path.
+    """
+    ensure_location_index()
+    result, _ = db.cypher_query(f"""
+        CALL {{
+            {_locations_where('n.location_path IS NOT NULL')}
+        }}
+        WITH split(n.location_path, '/')[1] AS site_id,
+             CASE WHEN n.location_depth > 0 THEN {_location_label('n')} END AS label,
+             COLLECT {{ MATCH (device:Device)-[:LOCATED_IN]->(n) RETURN elementId(device) }} AS device_ids,
+             COLLECT {{ MATCH (person:Person)-[:LOCATED_IN]->(n) RETURN elementId(person) }} AS person_ids
+        WITH site_id, collect(label) AS labels,
+             apoc.coll.toSet(apoc.coll.flatten(collect(device_ids))) AS devices,
+             apoc.coll.toSet(apoc.coll.flatten(collect(person_ids))) AS people
+        MATCH (site:Site) WHERE elementId(site) = site_id
+        WITH site, labels, devices, people, apoc.convert.fromJsonMap(site.custom_properties) AS props
+        RETURN elementId(site), COALESCE(props.name, 'Unnamed'), props.site_code,
+               apoc.coll.frequenciesAsMap(labels), size(devices), size(people)
+        ORDER BY props.name
+    """)
+    return [
+        dict(_inventory(row[3] or {}, row[4], row[5]), id=row[0], name=row[1], site_code=row[2])
+        for row in result
+    ]
+
+
+def _inventory_key(scope):
+    generation = cache.get(INVENTORY_GENERATION_KEY) or 0
+    return f'{INVENTORY_CACHE_PREFIX}:{generation}:{scope}'
+
+
+def get_location_inventory(location_id):
+    """
+    Cached inventory counts for one location; rebuilt after any location, device or person move.
+    """
+    key = _inventory_key(location_id)
+    inventory = cache.get(key)
+    if inventory is None:
+        inventory = compute_location_inventory(location_id)
+        cache.set(key, inventory, INVENTORY_CACHE_TIMEOUT)
+    return inventory
+
+
+def get_site_inventories():
+    key = _inventory_key('sites')
+    inventories = cache.get(key)
+    if inventories is None:
+        inventories = compute_site_inventories()
+        cache.set(key, inventories, INVENTORY_CACHE_TIMEOUT)
+    return inventories
+
+
+def invalidate_location_inventory():
+    try:
+        cache.incr(INVENTORY_GENERATION_KEY)
+    except ValueError:
+        cache.set(INVENTORY_GENERATION_KEY, 1, None)
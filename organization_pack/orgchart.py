@@ -0,0 +1,269 @@
+# feature_packs/organization_pack/orgchart.py
+
+from django.core.cache import cache
+from neomodel import db
+
+
+ORG_INDEX_READY_KEY = 'organization_org_chart:indexes_ready'
+WRITE_BATCH_SIZE = 5000
+CHART_LEVEL_LIMIT = 200
+SUBTREE_PAGE_SIZE = 100
+
+# Each Person carries its REPORTS_TO chain as a materialized path of elementIds,
+# root first: org_path = "/<root>/.../<manager>/<self>/". Everyone under a person
+# is then an indexed prefix scan, and the chain to the root is the path itself.
+# A person with several managers sits under the one with the smallest elementId;
+# a REPORTS_TO cycle is cut at its smallest member, which becomes a root.
+
+
+def _primary_manager(var):
+    return f"""head(COLLECT {{
+        MATCH ({var})-[:REPORTS_TO]->(primary:Person) WHERE primary <> {var}
+        RETURN elementId(primary) AS primary_id ORDER BY primary_id
+    }})"""
+
+
+def ensure_org_index():
+    """
+    Index the materialized REPORTS_TO paths and build them for people created
+    before the index existed. Runs once per cache lifetime; the audit hook keeps
+    paths current afterwards.
+    """
+    if cache.get(ORG_INDEX_READY_KEY):
+        return
+    db.cypher_query("CREATE INDEX organization_person_org_path IF NOT EXISTS FOR (p:Person) ON (p.org_path)")
+    db.cypher_query("CREATE INDEX organization_person_org_manager IF NOT EXISTS FOR (p:Person) ON (p.org_manager_id)")
+    # The top of the chart is looked up by depth
+    db.cypher_query("CREATE INDEX organization_person_org_depth IF NOT EXISTS FOR (p:Person) ON (p.org_depth)")
+    result, _ = db.cypher_query("MATCH (p:Person) WHERE p.org_path IS NULL RETURN count(p) > 0")
+    if result and result[0][0]:
+        rebuild_org_paths()
+    cache.set(ORG_INDEX_READY_KEY, True, None)
+
+
+def _write_paths(rows):
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        db.cypher_query("""
+            UNWIND $rows AS row
+            MATCH (p:Person) WHERE elementId(p) = row.id
+            SET p.org_path = row.path, p.org_depth = row.depth, p.org_manager_id = row.manager
+        """, {'rows': rows[start:start + WRITE_BATCH_SIZE]})
+
+
+def rebuild_org_paths():
+    """
+    Recompute every person's path from the REPORTS_TO graph. Returns the number of people written.
+    """
+    result, _ = db.cypher_query(f"""
+        MATCH (p:Person)
+        RETURN elementId(p), {_primary_manager('p')}
+    """)
+    managers = {row[0]: row[1] for row in result}
+    children = {}
+    for person_id, manager_id in managers.items():
+        if manager_id in managers:
+            children.setdefault(manager_id, []).append(person_id)
+        else:
+            managers[person_id] = None
+
+    rows = []
+    visited = set()
+
+    def walk(root_id):
+        stack = [(root_id, None, '/', 0)]
+        while stack:
+            person_id, manager_id, parent_path, depth = stack.pop()
+            if person_id in visited:
+                continue
+            visited.add(person_id)
+            path = f'{parent_path}{person_id}/'
+            rows.append({'id': person_id, 'path': path, 'depth': depth, 'manager': manager_id})
+            stack.extend((child, person_id, path, depth + 1) for child in children.get(person_id, []))
+
+    for person_id in sorted(managers):
+        if managers[person_id] is None:
+            walk(person_id)
+    # Whatever is left hangs off a REPORTS_TO cycle: climb to the cycle and cut it at its smallest member
+    for person_id in sorted(managers):
+        if person_id in visited:
+            continue
+        chain = []
+        node = person_id
+        while node not in chain:
+            chain.append(node)
+            node = managers[node]
+        walk(min(chain[chain.index(node):]))
+
+    _write_paths(rows)
+    return len(rows)
+
+
+def _rebuild_subtree(root_id, path, depth, manager_id):
+    """
+    Write paths for ``root_id`` and everyone under it, one REPORTS_TO level per query.
+    Used when a person had no path yet, so there is no old prefix to rewrite.
+    """
+    frontier = [{'id': root_id, 'path': path, 'depth': depth, 'manager': manager_id}]
+    visited = {root_id}
+    while frontier:
+        _write_paths(frontier)
+        result, _ = db.cypher_query(f"""
+            UNWIND $ids AS manager_id
+            MATCH (report:Person)-[:REPORTS_TO]->(manager:Person) WHERE elementId(manager) = manager_id
+            WITH DISTINCT report, manager_id
+            WHERE {_primary_manager('report')} = manager_id
+            RETURN manager_id, elementId(report)
+        """, {'ids': [row['id'] for row in frontier]})
+        parents = {row['id']: row for row in frontier}
+        frontier = []
+        for manager_id, report_id in result:
+            if report_id in visited:
+                continue
+            visited.add(report_id)
+            parent = parents[manager_id]
+            frontier.append({'id': report_id, 'path': f"{parent['path']}{report_id}/",
+                             'depth': parent['depth'] + 1, 'manager': manager_id})
+
+
+def refresh_org_position(person_id, _depth=0):
+    """
+    Re-place one person after its REPORTS_TO edges changed: the paths of the
+    person and everyone under it move to the new prefix in one indexed update.
+    """
+    result, _ = db.cypher_query(f"""
+        MATCH (p:Person) WHERE elementId(p) = $eid
+        WITH p, {_primary_manager('p')} AS manager_id
+        OPTIONAL MATCH (manager:Person) WHERE elementId(manager) = manager_id
+        RETURN p.org_path, manager_id, manager.org_path, manager.org_depth
+    """, {'eid': person_id})
+    if not result:
+        return
+    old_path, manager_id, manager_path, manager_depth = result[0]
+
+    if manager_id and manager_path is None and _depth < 64:
+        refresh_org_position(manager_id, _depth + 1)
+        return refresh_org_position(person_id, _depth + 1)
+    if manager_id and (manager_path is None or f'/{person_id}/' in manager_path):
+        manager_id = None  # would close a REPORTS_TO cycle: stay a root
+
+    new_path = f"{manager_path if manager_id else '/'}{person_id}/"
+    new_depth = manager_depth + 1 if manager_id else 0
+    if old_path is None:
+        _rebuild_subtree(person_id, new_path, new_depth, manager_id)
+        return
+    db.cypher_query("""
+        MATCH (p:Person) WHERE p.org_path STARTS WITH $old_path
+        WITH p, p.org_depth - $old_depth AS relative_depth
+        SET p.org_path = $new_path + substring(p.org_path, size($old_path)),
+            p.org_depth = $new_depth + relative_depth
+        WITH p WHERE elementId(p) = $eid
+        SET p.org_manager_id = $manager_id
+    """, {
+        'eid': person_id,
+        'old_path': old_path,
+        'old_depth': old_path.count('/') - 2,
+        'new_path': new_path,
+        'new_depth': new_depth,
+        'manager_id': manager_id,
+    })
+
+
+def orphaned_reports(person_id):
+    """
+    People whose recorded manager is ``person_id`` (e.g. after that person was deleted).
+    """
+    result, _ = db.cypher_query("""
+        MATCH (p:Person) WHERE p.org_manager_id = $eid
+        RETURN elementId(p)
+    """, {'eid': person_id})
+    return [row[0] for row in result]
+
+
+def _person_path(person_id):
+    ensure_org_index()
+    result, _ = db.cypher_query("""
+        MATCH (p:Person) WHERE elementId(p) = $eid
+        RETURN p.org_path
+    """, {'eid': person_id})
+    return result[0][0] if result else None
+
+
+def management_chain(person_id):
+    """
+    Managers from the root of the org chart down to this person's direct manager.
+    """
+    path = _person_path(person_id)
+    ids = path.strip('/').split('/')[:-1] if path else []
+    if not ids:
+        return []
+    result, _ = db.cypher_query("""
+        UNWIND range(0, size($ids) - 1) AS position
+        MATCH (p:Person) WHERE elementId(p) = $ids[position]
+        WITH p, position, apoc.convert.fromJsonMap(p.custom_properties) AS props
+        RETURN elementId(p), COALESCE(props.name, 'Unnamed'), COALESCE(props.title, '')
+        ORDER BY position
+    """, {'ids': ids})
+    return [{'id': row[0], 'label': 'Person', 'name': row[1], 'title': row[2]} for row in result]
+
+
+def headcount_under(person_id):
+    """
+    Number of people reporting to this person, directly or indirectly.
+    """
+    path = _person_path(person_id)
+    if not path:
+        return 0
+    result, _ = db.cypher_query("""
+        MATCH (p:Person) WHERE p.org_path STARTS WITH $prefix
+        RETURN count(p) - 1
+    """, {'prefix': path})
+    return result[0][0] if result else 0
+
+
+def subtree_page(person_id, offset=0, limit=SUBTREE_PAGE_SIZE):
+    """
+    Everyone under a person, depth first (the order of their paths), one page at a time.
+    """
+    path = _person_path(person_id)
+    if not path:
+        return {'people': [], 'has_more': False, 'next_offset': offset}
+    result, _ = db.cypher_query("""
+        MATCH (p:Person) WHERE p.org_path STARTS WITH $prefix AND p.org_path <> $prefix
+        WITH p ORDER BY p.org_path SKIP $offset LIMIT $limit
+        WITH p, apoc.convert.fromJsonMap(p.custom_properties) AS props
+        RETURN elementId(p), COALESCE(props.name, 'Unnamed'), COALESCE(props.title, ''),
+               p.org_depth, p.org_manager_id
+        ORDER BY p.org_path
+    """, {'prefix': path, 'offset': offset, 'limit': limit + 1})
+    people = [
+        {'id': row[0], 'name': row[1], 'title': row[2], 'depth': row[3], 'manager_id': row[4]}
+        for row in result[:limit]
+    ]
+    return {'people': people, 'has_more': len(result) > limit, 'next_offset': offset + limit}
+
+
+def org_chart_level(person_id=None, offset=0, limit=CHART_LEVEL_LIMIT):
+    """
+    One level of the org chart: the direct reports of ``person_id``, or the roots
+    that have reports when no person is given. Each entry carries its direct and
+    total headcount so a client can expand the chart lazily, one level per call.
+    """
+    ensure_org_index()
+    if person_id:
+        where, params = "p.org_manager_id = $eid", {'eid': person_id}
+    else:
+        where, params = "p.org_depth = 0 AND EXISTS { MATCH (r:Person) WHERE r.org_manager_id = elementId(p) }", {}
+    result, _ = db.cypher_query(f"""
+        MATCH (p:Person) WHERE {where}
+        WITH p, apoc.convert.fromJsonMap(p.custom_properties) AS props
+        ORDER BY props.name, elementId(p)
+        SKIP $offset LIMIT $limit
+        RETURN elementId(p), COALESCE(props.name, 'Unnamed'), COALESCE(props.title, ''),
+               COUNT {{ MATCH (r:Person) WHERE r.org_manager_id = elementId(p) }},
+               COUNT {{ MATCH (r:Person) WHERE r.org_path STARTS WITH p.org_path }} - 1
+    """, dict(params, offset=offset, limit=limit + 1))
+    people = [
+        {'id': row[0], 'name': row[1], 'title': row[2], 'direct_reports': row[3], 'headcount': row[4]}
+        for row in result[:limit]
+    ]
+    return {'manager_id': person_id, 'people': people, 'has_more': len(result) > limit, 'next_offset': offset + limit}
@@ -0,0 +1,19 @@
+from django.urls import path
+from . import views
+
+app_name = 'organization_pack'
+
+urlpatterns = [
+    path('organization/org-chart/', views.organization_org_chart, name='organization_org_chart'),
+    path('organization/org-chart/rebuild/', views.organization_org_chart_rebuild, name='organization_org_chart_rebuild'),
+    path('organization/people/<str:element_id>/subtree/', views.organization_person_subtree,
+         name='organization_person_subtree'),
+    path('organization/departments/<str:element_id>/members/', views.organization_department_members,
+         name='organization_department_members'),
+    path('organization/departments/headcount/refresh/', views.organization_headcount_refresh,
+         name='organization_headcount_refresh'),
+    path('organization/locations/<str:element_id>/descendants/', views.organization_location_descendants,
+         name='organization_location_descendants'),
+    path('organization/locations/rebuild/', views.organization_locations_rebuild, name='organization_locations_rebuild'),
+    path('organization/sites/inventory/', views.organization_site_inventory, name='organization_site_inventory'),
+]
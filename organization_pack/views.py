@@ -1,15 +1,29 @@
 # feature_packs/organization_pack/views.py
 
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_http_methods
 from neomodel import db
 from cmdb.models import DynamicNode
+from .headcount import department_headcount, department_members_page, refresh_headcounts
+from .locations import (
+    LOCATION_LABELS,
+    get_location_inventory,
+    get_site_inventories,
+    location_ancestors,
+    location_descendants,
+    rebuild_location_paths,
+)
+from .orgchart import headcount_under, management_chain, org_chart_level, rebuild_org_paths, subtree_page
 
 
 def person_details_tab(request, label, element_id):
     """
     Context builder for Person Details tab.
     Shows department (WORKS_IN outgoing), managed departments (MANAGES outgoing),
-    reports to (REPORTS_TO outgoing), and located in room (LOCATED_IN outgoing).
+    reports to (REPORTS_TO outgoing) with the chain up to the top of the org chart,
+    direct reports with the headcount under them, and located in room (LOCATED_IN outgoing).
     Returns context dictionary rather than rendering template directly.
     """
     context = {
@@ -20,6 +34,10 @@ def person_details_tab(request, label, element_id):
             'department': None,
             'managed_departments': [],
             'reports_to': None,
+            'management_chain': [],
+            'direct_reports': [],
+            'direct_reports_more': False,
+            'headcount_under': 0,
             'room': None
         },
         'error': None,
@@ -133,6 +151,13 @@ def person_details_tab(request, label, element_id):
                 'floor': row[4]
             }
 
+        # Reporting line from the materialized REPORTS_TO paths (indexed lookups, no traversal)
+        context['custom_data']['management_chain'] = management_chain(element_id)
+        context['custom_data']['headcount_under'] = headcount_under(element_id)
+        reports = org_chart_level(element_id, limit=50)
+        context['custom_data']['direct_reports'] = reports['people']
+        context['custom_data']['direct_reports_more'] = reports['has_more']
+
     except Exception as e:
         context['error'] = str(e)
 
@@ -143,7 +168,8 @@ def department_details_tab(request, label, element_id):
     """
     Context builder for Department Details tab.
     Shows parent organization (PART_OF outgoing), managed by person (MANAGED_BY outgoing),
-    located at building (LOCATED_AT outgoing), and team members (WORKS_IN incoming).
+    located at building (LOCATED_AT outgoing), the first page of team members
+    (WORKS_IN incoming) and the maintained headcount, direct and with sub-departments.
     Returns context dictionary rather than rendering template directly.
     """
     context = {
@@ -154,7 +180,10 @@ def department_details_tab(request, label, element_id):
             'organization': None,
             'manager': None,
             'building': None,
-            'team_members': []
+            'team_members': [],
+            'has_more': False,
+            'next_offset': 0,
+            'headcount': None
         },
         'error': None,
     }
@@ -244,30 +273,9 @@ def department_details_tab(request, label, element_id):
                 'floors': row[4]
             }
 
-        # Fetch team members (incoming WORKS_IN relationships)
-        team_members_query = """
-            MATCH (dept:Department) WHERE elementId(dept) = $eid
-            MATCH (person:Person)-[:WORKS_IN]->(dept)
-            WITH person, apoc.convert.fromJsonMap(person.custom_properties) AS person_props
-            RETURN 
-                elementId(person) AS person_id,
-                labels(person)[0] AS person_label,
-                COALESCE(person_props.name, 'Unnamed') AS name,
-                COALESCE(person_props.title, '') AS title,
-                COALESCE(person_props.email, '') AS email,
-                COALESCE(person_props.status, 'Unknown') AS status
-            ORDER BY person_props.name
-        """
-        team_members_result, _ = db.cypher_query(team_members_query, {'eid': element_id})
-        for row in team_members_result:
-            context['custom_data']['team_members'].append({
-                'id': row[0],
-                'label': row[1],
-                'name': row[2],
-                'title': row[3],
-                'email': row[4],
-                'status': row[5]
-            })
+        # First page of team members (incoming WORKS_IN relationships) and the computed headcount
+        context['custom_data'].update(department_members_page(element_id))
+        context['custom_data']['headcount'] = department_headcount(element_id)
 
     except Exception as e:
         context['error'] = str(e)
@@ -278,7 +286,8 @@ def department_details_tab(request, label, element_id):
 def site_details_tab(request, label, element_id):
     """
     Context builder for Site Details tab.
-    Shows managed by person (MANAGED_BY outgoing), and buildings at site (LOCATED_IN incoming from Building).
+    Shows managed by person (MANAGED_BY outgoing), buildings at site (LOCATED_IN incoming from Building),
+    and inventory counts for everything in the site from the location hierarchy.
     Returns context dictionary rather than rendering template directly.
     """
     context = {
@@ -287,7 +296,8 @@ def site_details_tab(request, label, element_id):
         'node': None,
         'custom_data': {
             'manager': None,
-            'buildings': []
+            'buildings': [],
+            'inventory': None
         },
         'error': None,
     }
@@ -358,6 +368,8 @@ def site_details_tab(request, label, element_id):
                 'status': row[6]
             })
 
+        context['custom_data']['inventory'] = get_location_inventory(element_id)
+
     except Exception as e:
         context['error'] = str(e)
 
@@ -368,7 +380,8 @@ def building_details_tab(request, label, element_id):
     """
     Context builder for Building Details tab.
     Shows parent site (LOCATED_IN outgoing), managed by (MANAGED_BY outgoing),
-    and floors (LOCATED_IN incoming from Floor).
+    floors (LOCATED_IN incoming from Floor), and inventory counts for everything
+    in the building from the location hierarchy.
     Returns context dictionary rather than rendering template directly.
     """
     context = {
@@ -378,7 +391,8 @@ def building_details_tab(request, label, element_id):
         'custom_data': {
             'site': None,
             'manager': None,
-            'floors': []
+            'floors': [],
+            'inventory': None
         },
         'error': None,
     }
@@ -468,7 +482,145 @@ def building_details_tab(request, label, element_id):
                 'square_footage': row[4]
             })
 
+        context['custom_data']['inventory'] = get_location_inventory(element_id)
+
     except Exception as e:
         context['error'] = str(e)
 
     return context
+
+
+@require_http_methods(["GET"])
+def organization_org_chart(request):
+    """
+    One level of the org chart: direct reports of ?person= (or the top-level
+    managers without it), each with direct and total headcount. Expand a node by
+    requesting it as ?person=; page with ?offset=.
+    """
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        return JsonResponse({'error': 'offset must be an integer.'}, status=400)
+
+    try:
+        level = org_chart_level(request.GET.get('person') or None, offset=offset)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse(level)
+
+
+@require_http_methods(["GET"])
+def organization_person_subtree(request, element_id):
+    """
+    Everyone under a person, depth first, with the total headcount (?offset= to page).
+    """
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        return JsonResponse({'error': 'offset must be an integer.'}, status=400)
+
+    try:
+        page = subtree_page(element_id, offset=offset)
+        page['headcount'] = headcount_under(element_id)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse(page)
+
+
+@require_http_methods(["POST"])
+@login_required
+def organization_org_chart_rebuild(request):
+    """
+    Recompute every REPORTS_TO path from scratch (after bulk imports that bypass the audit hook).
+    """
+    try:
+        written = rebuild_org_paths()
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse({'people': written})
+
+
+@require_http_methods(["GET"])
+def organization_department_members(request, element_id):
+    """
+    HTMX endpoint returning a page of team member rows for the Department tab.
+    """
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        offset = 0
+
+    context = {
+        'element_id': element_id,
+        'team_members': [],
+        'has_more': False,
+        'next_offset': 0,
+        'first_page': offset == 0,
+        'error': None,
+    }
+    try:
+        context.update(department_members_page(element_id, offset=offset))
+    except Exception as exc:
+        context['error'] = str(exc)
+
+    return render(request, 'organization_pack/partials/department_member_rows.html', context)
+
+
+@require_http_methods(["POST"])
+@login_required
+def organization_headcount_refresh(request):
+    """
+    Recount every department whose headcount no longer adds up (after bulk imports that bypass the audit hook).
+    """
+    try:
+        changed = refresh_headcounts()
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse({'departments': changed})
+
+
+@require_http_methods(["GET"])
+def organization_location_descendants(request, element_id):
+    """
+    Everything inside a location, depth first (?label= to restrict to one level, ?offset= to page).
+    """
+    label = request.GET.get('label') or None
+    if label is not None and label not in LOCATION_LABELS:
+        return JsonResponse({'error': f"label must be one of: {', '.join(LOCATION_LABELS)}"}, status=400)
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        return JsonResponse({'error': 'offset must be an integer.'}, status=400)
+
+    try:
+        page = location_descendants(element_id, label=label, offset=offset)
+        page['ancestors'] = location_ancestors(element_id)
+        page['inventory'] = get_location_inventory(element_id)
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse(page)
+
+
+@require_http_methods(["GET"])
+def organization_site_inventory(request):
+    """
+    Inventory counts (locations by label, devices and people) for every site.
+    """
+    try:
+        sites = get_site_inventories()
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse({'sites': sites})
+
+
+@require_http_methods(["POST"])
+@login_required
+def organization_locations_rebuild(request):
+    """
+    Recompute every location path from scratch (after bulk imports that bypass the audit hook).
+    """
+    try:
+        written = rebuild_location_paths()
+    except Exception as exc:
+        return JsonResponse({'error': str(exc)}, status=500)
+    return JsonResponse({'locations': written})
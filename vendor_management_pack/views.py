@@ -5,10 +5,15 @@ from neomodel import db
 from cmdb.models import DynamicNode
 
 
+def _mbps(value):
+    return int(value) if float(value).is_integer() else round(value, 2)
+
+
 def vendor_details_tab(request, label, element_id):
     """
     Context builder for Vendor Details tab.
-    Shows all contracts provided by this vendor and circuits (if network_pack exists).
+    Shows all contracts provided by this vendor and circuits (if network_pack exists),
+    with a summary of committed circuit bandwidth by type.
     Returns context dictionary rather than rendering template directly.
     """
     context = {
@@ -17,7 +22,8 @@ def vendor_details_tab(request, label, element_id):
         'node': None,
         'custom_data': {
             'contracts': [],
-            'circuits': []
+            'circuits': [],
+            'capacity': None
         },
         'error': None,
     }
@@ -103,6 +109,37 @@ def vendor_details_tab(request, label, element_id):
                 'status': row[5]
             })
 
+        # Committed circuit bandwidth by type, grouped in the database
+        capacity_query = """
+            MATCH (vendor:Vendor) WHERE elementId(vendor) = $eid
+            MATCH (circuit:Circuit)-[:PROVIDED_BY]->(vendor)
+            WITH apoc.convert.fromJsonMap(circuit.custom_properties) AS circuit_props
+            WITH COALESCE(circuit_props.type, 'Unspecified') AS type,
+                 toLower(COALESCE(circuit_props.status, '')) AS status,
+                 COALESCE(toFloatOrNull(toString(circuit_props.bandwidth_mbps)), 0) AS bandwidth
+            RETURN type,
+                   count(*) AS circuits,
+                   sum(CASE WHEN status <> 'decommissioned' THEN bandwidth ELSE 0 END) AS committed_mbps,
+                   sum(CASE WHEN status = 'active' THEN bandwidth ELSE 0 END) AS active_mbps
+            ORDER BY committed_mbps DESC, type
+        """
+        capacity_result, _ = db.cypher_query(capacity_query, {'eid': element_id})
+        if capacity_result:
+            by_type = [
+                {
+                    'type': row[0],
+                    'circuits': row[1],
+                    'committed_mbps': _mbps(row[2]),
+                    'active_mbps': _mbps(row[3])
+                }
+                for row in capacity_result
+            ]
+            context['custom_data']['capacity'] = {
+                'by_type': by_type,
+                'committed_mbps': _mbps(sum(row[2] for row in capacity_result)),
+                'active_mbps': _mbps(sum(row[3] for row in capacity_result)),
+            }
+
     except Exception as e:
         context['error'] = str(e)
 
@@ -73,7 +73,8 @@ def virtual_host_details_tab(request, label, element_id):
     Context builder for Virtual Host Details tab.
     Shows physical device (HOSTED_ON outgoing to Device).
     Note: Virtual_Machine nodes connect to Virtual_Cluster, not Virtual_Host,
-    so VM hosting relationships are shown at the cluster level.
+    so VM hosting relationships are shown at the cluster level (hosts join
+    clusters via MEMBER_OF).
     Returns context dictionary rather than rendering template directly.
     """
     context = {